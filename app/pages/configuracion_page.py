@@ -1,6 +1,8 @@
+import os
 import flet as ft
 from .base_page import BasePage
 from app.utils.config_manager import config_manager
+from app.utils.recursos import cpus_efectivas, limite_memoria
 
 
 class ConfiguracionPage(BasePage):
@@ -69,6 +71,32 @@ class ConfiguracionPage(BasePage):
 
     def _create_advanced_config(self):
         """Crea una sección de configuración avanzada adicional"""
+        self.controls["zip_compression"] = ft.Dropdown(
+            label="Algoritmo de compresión",
+            options=[
+                ft.dropdown.Option("ZIP_DEFLATED", "Deflate (recomendado)"),
+                ft.dropdown.Option("ZIP_STORED", "Sin compresión"),
+                ft.dropdown.Option("ZIP_BZIP2", "BZip2"),
+                ft.dropdown.Option("ZIP_LZMA", "LZMA"),
+            ],
+            value=config_manager.get("pdf", "zip_compression", "ZIP_DEFLATED"),
+            on_change=self._mark_changes
+        )
+
+        # Tope de procesos: el número real se ajusta a las CPUs y la memoria disponibles.
+        # Sin tope guardado el control parte de las CPUs efectivas y, si no se mueve,
+        # se sigue guardando sin tope
+        max_procesos = max(8, os.cpu_count() or 1)
+        max_workers = self._tope_workers(max_procesos)
+        self.controls["max_workers"] = ft.Slider(
+            min=1,
+            max=max_procesos,
+            divisions=max_procesos - 1,
+            value=max_workers,
+            label="{value} procesos",
+            on_change=self._mark_changes
+        )
+
         return ft.Card(
             content=ft.Container(
                 content=ft.Column([
@@ -80,26 +108,11 @@ class ConfiguracionPage(BasePage):
                         helper_text="Prefijo que se agregará a todos los archivos generados"
                     ),
 
-                    ft.Dropdown(
-                        label="Algoritmo de compresión",
-                        options=[
-                            ft.dropdown.Option("ZIP_DEFLATED", "Deflate (recomendado)"),
-                            ft.dropdown.Option("ZIP_STORED", "Sin compresión"),
-                            ft.dropdown.Option("ZIP_BZIP2", "BZip2"),
-                            ft.dropdown.Option("ZIP_LZMA", "LZMA"),
-                        ],
-                        value="ZIP_DEFLATED"
-                    ),
+                    self.controls["zip_compression"],
 
                     ft.Row([
-                        ft.Text("Número de hilos para procesamiento:"),
-                        ft.Slider(
-                            min=1,
-                            max=8,
-                            divisions=7,
-                            value=4,
-                            label="4 hilos"
-                        )
+                        ft.Text("Procesos máximos para procesamiento:"),
+                        self.controls["max_workers"]
                     ]),
 
                     ft.Switch(label="Modo debug habilitado", value=False),
@@ -111,10 +124,17 @@ class ConfiguracionPage(BasePage):
             )
         )
 
+    @staticmethod
+    def _tope_workers(max_procesos):
+        """Valor del control de procesos: el tope guardado o, sin tope, las CPUs efectivas"""
+        tope = config_manager.get("pdf", "max_workers", None) or cpus_efectivas()
+        return max(1, min(tope, max_procesos))
+
     def _create_system_info(self):
         """Crea una sección con información del sistema"""
         import platform
-        import os
+
+        memoria = limite_memoria()
 
         return ft.Card(
             content=ft.Container(
@@ -141,6 +161,16 @@ class ConfiguracionPage(BasePage):
                         ft.Text(os.getenv('USERNAME') or os.getenv('USER') or 'Desconocido')
                     ]),
 
+                    ft.Row([
+                        ft.Text("CPUs disponibles:", weight=ft.FontWeight.W_500),
+                        ft.Text(f"{cpus_efectivas()} de {os.cpu_count()}")
+                    ]),
+
+                    ft.Row([
+                        ft.Text("Memoria disponible:", weight=ft.FontWeight.W_500),
+                        ft.Text(f"{memoria / 1024 ** 3:.1f} GB" if memoria else "Desconocida")
+                    ]),
+
                     ft.Divider(),
 
                     ft.Text("📁 Rutas del sistema:", weight=ft.FontWeight.W_500),
@@ -234,6 +264,7 @@ class ConfiguracionPage(BasePage):
         self.controls["max_size"] = ft.TextField(
             label="Tamaño máximo de archivo (MB)",
             value=str(config_manager.get("pdf", "max_file_size_mb", 100)),
+            helper_text="Límite de cada archivo al dividir por tamaño",
             keyboard_type=ft.KeyboardType.NUMBER,
             on_change=self._mark_changes
         )
@@ -431,6 +462,8 @@ class ConfiguracionPage(BasePage):
         self.controls["default_format"].value = config_manager.get("pdf", "default_output_format", "pagina_{:03d}")
         self.controls["create_zip"].value = config_manager.get("pdf", "create_zip_by_default", True)
         self.controls["max_size"].value = str(config_manager.get("pdf", "max_file_size_mb", 100))
+        self.controls["zip_compression"].value = config_manager.get("pdf", "zip_compression", "ZIP_DEFLATED")
+        self.controls["max_workers"].value = self._tope_workers(self.controls["max_workers"].max)
 
         self.controls["default_output"].value = config_manager.get("paths", "default_output_folder", "")
 
@@ -514,6 +547,12 @@ class ConfiguracionPage(BasePage):
             config_manager.set("pdf", "default_output_format", self.controls["default_format"].value)
             config_manager.set("pdf", "create_zip_by_default", self.controls["create_zip"].value)
             config_manager.set("pdf", "max_file_size_mb", max_size)
+            config_manager.set("pdf", "zip_compression", self.controls["zip_compression"].value)
+            max_workers = int(self.controls["max_workers"].value)
+            if (config_manager.get("pdf", "max_workers", None) is None
+                    and max_workers == self._tope_workers(self.controls["max_workers"].max)):
+                max_workers = None
+            config_manager.set("pdf", "max_workers", max_workers)
 
             # Actualizar rutas
             config_manager.set("paths", "default_output_folder", self.controls["default_output"].value)
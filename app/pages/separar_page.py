@@ -2,7 +2,19 @@ import os
 import threading
 import flet as ft
 from app.utils.config_manager import config_manager
-from app.utils.pdf_processor import dividir_pdf_optimizado, estimar_tiempo_procesamiento
+from app.utils.control_trabajo import ControlTrabajo
+from app.utils.pdf_processor import (
+    calibrar_tiempos, dividir_pdf_optimizado, elegir_backend, estimar_tiempo_procesamiento,
+    formatear_paginas, parsear_paginas, reanudar_division, trabajo_pendiente,
+    MOTOR_PYPDF2, MOTOR_CRUDO
+)
+from app.utils.pdf_raw import contar_paginas_rapido
+from app.utils.indice_paginas import indice_paginas
+from app.utils.pool_manager import (
+    BACKEND_AUTO, BACKEND_HILOS, BACKEND_PROCESOS, BACKEND_SECUENCIAL, pool_manager
+)
+from app.utils.progreso import FASE_PROCESANDO
+from app.utils.recursos import workers_por_defecto
 from .base_page import BasePage
 
 
@@ -15,23 +27,41 @@ class SepararPage(BasePage):
         self.output_folder = None
         self.is_processing = False
         self.total_pages = 0
+        self._analysis_cancel = None
+        self.job_control = None
+        self.calibration = None
+        self.current_estimation = None
 
         # Referencias a controles
         self.file_text = None
+        self.analysis_spinner = None
         self.folder_text = None
         self.progress_bar = None
         self.progress_text = None
         self.format_field = None
+        self.pages_per_file_field = None
+        self.size_limit_switch = None
+        self.prune_resources_switch = None
+        self.deduplicate_switch = None
+        self.output_cache_switch = None
         self.create_zip_switch = None
+        self.zip_only_switch = None
         self.separate_button = None
+        self.resume_button = None
+        self.pause_button = None
+        self.cancel_button = None
         self.result_container = None
 
         # Nuevos controles para optimización
         self.batch_size_field = None
         self.workers_field = None
+        self.engine_dropdown = None
+        self.backend_dropdown = None
         self.page_range_start = None
         self.page_range_end = None
         self.use_page_range = None
+        self.use_page_selection = None
+        self.page_selection_field = None
         self.estimation_text = None
 
     def build(self):
@@ -49,6 +79,8 @@ class SepararPage(BasePage):
             color=ft.Colors.ON_SURFACE_VARIANT
         )
 
+        self.analysis_spinner = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+
         file_section = ft.Card(
             content=ft.Container(
                 content=ft.Column([
@@ -63,7 +95,8 @@ class SepararPage(BasePage):
                             content=self.file_text,
                             expand=True,
                             padding=ft.padding.only(left=10)
-                        )
+                        ),
+                        self.analysis_spinner
                     ]),
                     # Información del archivo
                     ft.Container(
@@ -94,7 +127,8 @@ class SepararPage(BasePage):
             hint_text="1",
             width=150,
             keyboard_type=ft.KeyboardType.NUMBER,
-            disabled=True
+            disabled=True,
+            on_change=self.update_estimation
         )
 
         self.page_range_end = ft.TextField(
@@ -102,7 +136,25 @@ class SepararPage(BasePage):
             hint_text="Última",
             width=150,
             keyboard_type=ft.KeyboardType.NUMBER,
-            disabled=True
+            disabled=True,
+            on_change=self.update_estimation
+        )
+
+        # Páginas sueltas: en cualquier orden y con repeticiones
+        self.use_page_selection = ft.Checkbox(
+            label="Extraer solo páginas seleccionadas",
+            value=False,
+            on_change=self.toggle_page_selection
+        )
+
+        self.page_selection_field = ft.TextField(
+            label="Páginas",
+            hint_text="1-5, 9, 20-12",
+            helper_text="Números y rangos separados por comas; se extraen en ese orden",
+            multiline=True,
+            max_lines=4,
+            disabled=True,
+            on_change=self.update_estimation
         )
 
         page_range_section = ft.Card(
@@ -115,6 +167,8 @@ class SepararPage(BasePage):
                         ft.Text("hasta", size=14),
                         self.page_range_end,
                     ], spacing=10),
+                    self.use_page_selection,
+                    self.page_selection_field,
                     ft.Text(
                         " Útil para archivos muy grandes. Deja vacío para procesar todas.",
                         size=12,
@@ -140,18 +194,67 @@ class SepararPage(BasePage):
             expand=True
         )
 
+        # Archivos de varias páginas: se numeran 1, 2, 3... en lugar de por página
+        self.pages_per_file_field = ft.TextField(
+            label="Páginas por archivo",
+            hint_text="1",
+            value="",
+            helper_text="Vacío = un archivo por página",
+            width=200,
+            keyboard_type=ft.KeyboardType.NUMBER
+        )
+
+        # Agrupa páginas consecutivas sin pasar del tamaño máximo de la configuración
+        max_file_size_mb = config_manager.get("pdf", "max_file_size_mb", 100)
+        self.size_limit_switch = ft.Switch(
+            label=f"Agrupar páginas en archivos de hasta {max_file_size_mb} MB",
+            value=False,
+            on_change=self.toggle_size_limit
+        )
+
         self.create_zip_switch = ft.Switch(
             label="Crear archivo ZIP",
             value=default_zip,
-            on_change=self.update_estimation
+            on_change=self.toggle_zip
+        )
+
+        self.zip_only_switch = ft.Switch(
+            label="Solo ZIP (no guardar las páginas sueltas en la carpeta)",
+            value=False,
+            disabled=not default_zip
+        )
+
+        pages_per_shard = config_manager.get("pdf", "pages_per_shard", 1000)
+        self.shard_switch = ft.Switch(
+            label=f"Organizar en subcarpetas de {pages_per_shard:,} páginas",
+            value=config_manager.get("pdf", "shard_output_folders", False)
+        )
+
+        # Cada archivo lleva solo las fuentes e imágenes que usan sus páginas
+        self.prune_resources_switch = ft.Switch(
+            label="Quitar de cada archivo los recursos que sus páginas no usan",
+            value=config_manager.get("pdf", "prune_resources", True),
+            on_change=self.change_engine
+        )
+
+        # Las páginas idénticas se escriben una vez y el resto son enlaces a ella
+        self.deduplicate_switch = ft.Switch(
+            label="Escribir una sola vez las páginas repetidas (enlaces al primer archivo)",
+            value=config_manager.get("pdf", "deduplicate_pages", True)
+        )
+
+        # Repetir una división del mismo PDF reutiliza los archivos ya generados
+        self.output_cache_switch = ft.Switch(
+            label="Reutilizar los archivos de divisiones anteriores del mismo PDF (caché)",
+            value=config_manager.get("pdf", "output_cache", True)
         )
 
         # Campos de optimización (NUEVO)
         self.batch_size_field = ft.TextField(
             label="Tamaño de lote",
-            hint_text="1000",
-            value="1000",
-            helper_text="Páginas por lote (mayor = más memoria, menor = más lento)",
+            hint_text="Auto",
+            value="",
+            helper_text="Páginas que se planifican juntas (vacío = automático)",
             width=200,
             keyboard_type=ft.KeyboardType.NUMBER
         )
@@ -160,9 +263,34 @@ class SepararPage(BasePage):
             label="Procesos paralelos",
             hint_text="Auto",
             value="",
-            helper_text="Dejar vacío para detección automática (CPU cores - 1)",
+            helper_text="Vacío = automático (según las CPUs y la memoria disponibles)",
             width=200,
-            keyboard_type=ft.KeyboardType.NUMBER
+            keyboard_type=ft.KeyboardType.NUMBER,
+            on_change=self.update_estimation
+        )
+
+        self.engine_dropdown = ft.Dropdown(
+            label="Motor de extracción",
+            options=[
+                ft.dropdown.Option(MOTOR_PYPDF2, "PyPDF2 (compatible)"),
+                ft.dropdown.Option(MOTOR_CRUDO, "Copia directa (más rápido)"),
+            ],
+            value=MOTOR_PYPDF2,
+            width=250,
+            on_change=self.change_engine
+        )
+
+        self.backend_dropdown = ft.Dropdown(
+            label="Ejecución",
+            options=[
+                ft.dropdown.Option(BACKEND_AUTO, "Automática"),
+                ft.dropdown.Option(BACKEND_PROCESOS, "Procesos"),
+                ft.dropdown.Option(BACKEND_HILOS, "Hilos"),
+                ft.dropdown.Option(BACKEND_SECUENCIAL, "Secuencial"),
+            ],
+            value=BACKEND_AUTO,
+            width=200,
+            on_change=self.update_estimation
         )
 
         config_section = ft.Card(
@@ -189,7 +317,10 @@ class SepararPage(BasePage):
 
                     # Formato de nombre
                     ft.Text("Formato de nombres:", weight=ft.FontWeight.W_500),
-                    self.format_field,
+                    ft.Row([
+                        self.format_field,
+                        self.pages_per_file_field,
+                    ], spacing=15),
 
                     ft.Divider(),
 
@@ -199,6 +330,8 @@ class SepararPage(BasePage):
                     ft.Row([
                         self.batch_size_field,
                         self.workers_field,
+                        self.engine_dropdown,
+                        self.backend_dropdown,
                     ], spacing=15),
 
                     ft.Divider(),
@@ -206,6 +339,12 @@ class SepararPage(BasePage):
                     # Opciones adicionales
                     ft.Text("Opciones:", weight=ft.FontWeight.W_500),
                     self.create_zip_switch,
+                    self.zip_only_switch,
+                    self.shard_switch,
+                    self.size_limit_switch,
+                    self.prune_resources_switch,
+                    self.deduplicate_switch,
+                    self.output_cache_switch,
 
                     # Advertencia para archivos grandes
                     ft.Container(
@@ -289,12 +428,38 @@ class SepararPage(BasePage):
             disabled=True
         )
 
+        # Solo visible si la carpeta de destino tiene un trabajo interrumpido de este PDF
+        self.resume_button = ft.ElevatedButton(
+            "Reanudar",
+            icon=ft.Icons.PLAY_ARROW,
+            on_click=self.resume_pdf,
+            visible=False
+        )
+
+        # Controles del trabajo en curso
+        self.pause_button = ft.OutlinedButton(
+            "Pausar",
+            icon=ft.Icons.PAUSE,
+            on_click=self.toggle_pause,
+            visible=False
+        )
+
+        self.cancel_button = ft.OutlinedButton(
+            "Cancelar",
+            icon=ft.Icons.STOP,
+            on_click=self.cancel_job,
+            visible=False
+        )
+
         action_buttons = ft.Card(
             content=ft.Container(
                 content=ft.Column([
                     ft.Text("🚀 Acciones", size=16, weight=ft.FontWeight.BOLD),
                     ft.Row([
                         self.separate_button,
+                        self.resume_button,
+                        self.pause_button,
+                        self.cancel_button,
                         ft.OutlinedButton(
                             "Limpiar",
                             icon=ft.Icons.CLEAR,
@@ -332,6 +497,51 @@ class SepararPage(BasePage):
         enabled = self.use_page_range.value
         self.page_range_start.disabled = not enabled
         self.page_range_end.disabled = not enabled
+        # El rango y la selección de páginas no se pueden combinar
+        if enabled:
+            self.use_page_selection.value = False
+            self.page_selection_field.disabled = True
+        self.page.update()
+        self.update_estimation(None)
+
+    def toggle_size_limit(self, e):
+        """Con tamaño máximo el número de páginas de cada archivo se calcula solo"""
+        self.pages_per_file_field.disabled = self.size_limit_switch.value
+        self.page.update()
+
+    def toggle_page_selection(self, e):
+        """Activa/desactiva el campo de páginas seleccionadas"""
+        enabled = self.use_page_selection.value
+        self.page_selection_field.disabled = not enabled
+        if enabled:
+            self.use_page_range.value = False
+            self.page_range_start.disabled = True
+            self.page_range_end.disabled = True
+        self.page.update()
+        self.update_estimation(None)
+
+    def _get_page_selection(self):
+        """
+        Páginas seleccionadas (1-based) o None si no se usa la selección.
+
+        Raises:
+            ValueError: Si el texto no es válido o alguna página no existe
+        """
+        if not self.use_page_selection.value:
+            return None
+        paginas = parsear_paginas(self.page_selection_field.value or "")
+        if not paginas:
+            raise ValueError("Indica al menos una página")
+        fuera = [pagina for pagina in paginas if pagina < 1 or pagina > self.total_pages]
+        if fuera:
+            raise ValueError(f"La página {fuera[0]} no existe (el PDF tiene {self.total_pages:,})")
+        return paginas
+
+    def toggle_zip(self, e):
+        """Activa/desactiva la opción de solo ZIP según el switch de ZIP"""
+        self.zip_only_switch.disabled = not self.create_zip_switch.value
+        if not self.create_zip_switch.value:
+            self.zip_only_switch.value = False
         self.page.update()
         self.update_estimation(None)
 
@@ -346,17 +556,20 @@ class SepararPage(BasePage):
 
                     if not self.selected_file.lower().endswith('.pdf'):
                         self._show_error_message("Selecciona un archivo PDF válido")
+                        self._cancel_analysis()
+                        self.analysis_spinner.visible = False
                         self.selected_file = None
                         self.file_text.value = "Ningún archivo seleccionado"
                         self.separate_button.disabled = True
                         self.page.update()
                         return
 
-                    # Leer información del PDF
-                    self.analyze_pdf_file()
+                    config_manager.set("paths", "last_input_folder",
+                                       os.path.dirname(self.selected_file))
 
-                    self.separate_button.disabled = False
-                    self.page.update()
+                    # Leer información del PDF (en segundo plano); si el trabajo irá
+                    # a procesos, el pool se arranca al tener la estimación
+                    self.analyze_pdf_file()
 
             except Exception as ex:
                 self._show_error_message(f"Error: {str(ex)}")
@@ -377,54 +590,137 @@ class SepararPage(BasePage):
             self._show_error_message(f"Error: {str(ex)}")
 
     def analyze_pdf_file(self):
-        """Analiza el archivo PDF y muestra información"""
-        try:
-            import PyPDF2
-
-            with open(self.selected_file, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                self.total_pages = len(reader.pages)
+        """Lanza el análisis del PDF en segundo plano, cancelando el anterior si seguía en curso"""
+        self._cancel_analysis()
+        cancelado = threading.Event()
+        self._analysis_cancel = cancelado
 
-            file_size = os.path.getsize(self.selected_file) / (1024 * 1024)
+        self.total_pages = 0
+        self.calibration = None
+        self.current_estimation = None
+        self.separate_button.disabled = True
+        self.resume_button.visible = False
+        self.analysis_spinner.visible = True
+        self.estimation_text.visible = False
+        for control in self.page.controls:
+            if hasattr(control, 'content'):
+                self._find_and_update_control(control, "file_info", "Analizando PDF...")
+                self._find_and_update_control(control, "info_container", None, visible=True)
+                self._find_and_update_control(control, "large_file_warning", None, visible=False)
+                self._find_and_update_control(control, "estimation_container", None, visible=False)
+        self.page.update()
 
-            # Mostrar información
-            info_text = f"Total de páginas: {self.total_pages:,} | Tamaño: {file_size:.1f} MB"
+        thread = threading.Thread(target=self._analyze_pdf_thread, args=(self.selected_file, cancelado))
+        thread.daemon = True
+        thread.start()
 
-            # Buscar el contenedor de información
-            for control in self.page.controls:
-                if hasattr(control, 'content'):
-                    self._find_and_update_control(control, "file_info", info_text)
-                    self._find_and_update_control(control, "info_container", None, visible=True)
+    def _cancel_analysis(self):
+        """Descarta el análisis en curso (sus resultados ya no se mostrarán)"""
+        if self._analysis_cancel is not None:
+            self._analysis_cancel.set()
+            self._analysis_cancel = None
 
-            # Mostrar advertencia si es archivo grande
-            if self.total_pages > 50000:
-                self._show_large_file_warning()
+    def _analyze_pdf_thread(self, ruta_pdf, cancelado):
+        """Analiza el PDF: primero el número de páginas del trailer y después el índice completo"""
+        try:
+            # Paso 1: número de páginas sin recorrer el documento (o del índice guardado)
+            indice = indice_paginas.buscar(ruta_pdf)
+            total_pages = indice['total_paginas'] if indice else contar_paginas_rapido(ruta_pdf)
+            if cancelado.is_set():
+                return
 
-            # Actualizar estimación
-            self.update_estimation(None)
+            self.total_pages = total_pages
+            self._show_file_info(ruta_pdf, "analizando...")
 
             # Auto-configurar carpeta
             if not self.output_folder:
                 default_output = config_manager.get("paths", "default_output_folder", "")
-                base_name = os.path.splitext(os.path.basename(self.selected_file))[0]
+                base_name = os.path.splitext(os.path.basename(ruta_pdf))[0]
 
                 if default_output and os.path.exists(default_output):
                     self.output_folder = os.path.join(default_output, f"{base_name}_pages")
                 else:
                     self.output_folder = os.path.join(
-                        os.path.dirname(self.selected_file),
+                        os.path.dirname(ruta_pdf),
                         f"{base_name}_pages"
                     )
 
                 self.folder_text.value = self.output_folder
 
-            config_manager.set("paths", "last_input_folder",
-                               os.path.dirname(self.selected_file))
-
+            self.separate_button.disabled = self.is_processing
+            self._check_pending_job()
             self.page.update()
 
+            # Paso 2: índice completo (confirma el número de páginas y queda guardado)
+            avisos_indice = []
+            if indice is None:
+                indice = indice_paginas.obtener(ruta_pdf, avisos=avisos_indice)
+            if cancelado.is_set():
+                return
+            for aviso in avisos_indice:
+                self._show_info_message(aviso, duration=5000)
+
+            self.total_pages = indice['total_paginas']
+            self._show_file_info(ruta_pdf)
+
+            # Mostrar advertencia si es archivo grande
+            if self.total_pages > 50000:
+                self._show_large_file_warning()
+                # Decenas de miles de archivos en una carpeta bloquean el explorador
+                self.shard_switch.value = True
+
+            # Estimación provisional mientras se mide una muestra del archivo
+            self.update_estimation(None)
+
+            # Paso 3: medir unas páginas de muestra para calibrar la estimación
+            self._calibrate(ruta_pdf, cancelado)
+
         except Exception as e:
-            self._show_error_message(f"Error al analizar PDF: {str(e)}")
+            if not cancelado.is_set():
+                self._show_error_message(f"Error al analizar PDF: {str(e)}")
+        finally:
+            if not cancelado.is_set():
+                self.analysis_spinner.visible = False
+                if self.page:
+                    self.page.update()
+
+    def _calibrate(self, ruta_pdf, cancelado=None):
+        """Mide una muestra del PDF con el motor elegido y actualiza la estimación"""
+        calibration = calibrar_tiempos(
+            ruta_pdf,
+            motor=self.engine_dropdown.value or MOTOR_PYPDF2,
+            compresion_zip=config_manager.get("pdf", "zip_compression", "ZIP_DEFLATED"),
+            podar_recursos=self.prune_resources_switch.value
+        )
+        if (cancelado is not None and cancelado.is_set()) or ruta_pdf != self.selected_file:
+            return
+
+        self.calibration = calibration
+        self.update_estimation(None)
+
+    def change_engine(self, e):
+        """Vuelve a calibrar la estimación con el motor y la poda de recursos seleccionados"""
+        if not self.selected_file or self.total_pages == 0:
+            return
+
+        def calibrate():
+            try:
+                self._calibrate(self.selected_file)
+            except Exception as ex:
+                print(f"Error en estimación: {ex}")
+
+        threading.Thread(target=calibrate, daemon=True).start()
+
+    def _show_file_info(self, ruta_pdf, estado=None):
+        """Muestra el número de páginas y el tamaño del archivo"""
+        file_size = os.path.getsize(ruta_pdf) / (1024 * 1024)
+        info_text = f"Total de páginas: {self.total_pages:,} | Tamaño: {file_size:.1f} MB"
+        if estado:
+            info_text += f" ({estado})"
+
+        for control in self.page.controls:
+            if hasattr(control, 'content'):
+                self._find_and_update_control(control, "file_info", info_text)
 
     def _find_and_update_control(self, container, key, value=None, visible=None):
         """Busca y actualiza un control por su key"""
@@ -458,24 +754,69 @@ class SepararPage(BasePage):
 
         try:
             # Obtener rango de páginas
-            if self.use_page_range.value:
+            rango_paginas = None
+            try:
+                paginas_seleccionadas = self._get_page_selection()
+            except ValueError as ex:
+                self.estimation_text.value = f"Selección de páginas: {ex}"
+                self.estimation_text.visible = True
+                self.page.update()
+                return
+
+            if paginas_seleccionadas is not None:
+                pages_to_process = len(paginas_seleccionadas)
+            elif self.use_page_range.value:
                 try:
                     start = int(self.page_range_start.value) if self.page_range_start.value else 1
                     end = int(self.page_range_end.value) if self.page_range_end.value else self.total_pages
-                    pages_to_process = end - start + 1
+                    start = max(1, start)
+                    end = min(end, self.total_pages)
+                    pages_to_process = max(0, end - start + 1)
+                    rango_paginas = (start, end)
                 except:
                     pages_to_process = self.total_pages
             else:
                 pages_to_process = self.total_pages
 
+            try:
+                max_workers = int(self.workers_field.value) if self.workers_field.value else None
+            except:
+                max_workers = None
+
+            # Los mismos workers que usará la división (con el tope de la configuración)
+            limite_workers = config_manager.get("pdf", "max_workers", None)
+            if max_workers:
+                max_workers = min(max_workers, limite_workers or max_workers)
+            else:
+                max_workers, _ = workers_por_defecto(limite_workers, os.path.getsize(self.selected_file))
+
+            # Con la muestra ya medida el cálculo es inmediato; sin ella, valores por defecto
             crear_zip = self.create_zip_switch.value
-            estimacion = estimar_tiempo_procesamiento(pages_to_process, crear_zip)
+            estimacion = estimar_tiempo_procesamiento(
+                pages_to_process, crear_zip,
+                ruta_pdf=self.selected_file if self.calibration else None,
+                rango_paginas=rango_paginas,
+                max_workers=max_workers,
+                calibracion=self.calibration,
+                paginas_seleccionadas=paginas_seleccionadas
+            )
+            self.current_estimation = estimacion
+
+            # Arrancar el pool mientras el usuario configura la división, solo si se usará
+            backend = self.backend_dropdown.value or BACKEND_AUTO
+            if backend == BACKEND_AUTO:
+                backend = elegir_backend(pages_to_process, os.path.getsize(self.selected_file),
+                                         max_workers, estimacion, crear_zip)
+            if backend == BACKEND_PROCESOS:
+                threading.Thread(target=pool_manager.warm_up, args=(max_workers,), daemon=True).start()
 
             # Construir mensaje de estimación
-            if estimacion['horas'] > 0:
-                tiempo_str = f"~{estimacion['horas']}h {estimacion['minutos'] % 60}min"
+            tiempo_str = f"~{self._format_duration(estimacion['segundos'])}"
+            if estimacion['calibrado']:
+                tiempo_str += (f" (entre {self._format_duration(estimacion['segundos_min'])}"
+                               f" y {self._format_duration(estimacion['segundos_max'])})")
             else:
-                tiempo_str = f"~{estimacion['minutos']}min"
+                tiempo_str += " (midiendo el archivo...)"
 
             mensaje = f"Tiempo estimado: {tiempo_str} para {pages_to_process:,} páginas"
 
@@ -509,6 +850,7 @@ class SepararPage(BasePage):
 
                     self.folder_text.value = self.output_folder
                     config_manager.set("paths", "last_output_folder", e.path)
+                    self._check_pending_job()
                     self._show_success_message("Carpeta actualizada")
                     self.page.update()
             except Exception as ex:
@@ -527,6 +869,19 @@ class SepararPage(BasePage):
         except Exception as ex:
             self._show_error_message(f"Error: {str(ex)}")
 
+    def _check_pending_job(self):
+        """Muestra el botón Reanudar si hay un trabajo interrumpido en la carpeta de destino"""
+        pendiente = None
+        if self.selected_file and not self.is_processing:
+            try:
+                pendiente = trabajo_pendiente(self.output_folder, self.selected_file)
+            except Exception:
+                pendiente = None
+
+        self.resume_button.visible = pendiente is not None
+        if pendiente:
+            self.resume_button.text = f"Reanudar ({pendiente['paginas_completadas']:,} páginas listas)"
+
     def update_progress(self, progress, message):
         """Actualiza la barra de progreso"""
         if progress == -1:
@@ -547,11 +902,38 @@ class SepararPage(BasePage):
 
         self.page.update()
 
+    def update_progress_event(self, evento):
+        """Muestra un EventoProgreso (llega unas 5 veces por segundo como máximo)"""
+        if evento.fase != FASE_PROCESANDO:
+            self.update_progress(evento.porcentaje, evento.mensaje)
+            return
+
+        detalles = [evento.mensaje]
+        if evento.paginas_por_segundo:
+            detalles.append(f"{evento.paginas_por_segundo:,.0f} pág/s")
+        if evento.bytes_generados:
+            detalles.append(f"{evento.bytes_generados / (1024 * 1024):,.1f} MB")
+        if evento.eta_segundos is not None:
+            detalles.append(f"quedan {self._format_duration(evento.eta_segundos)}")
+
+        self.update_progress(evento.porcentaje, " · ".join(detalles))
+
+    @staticmethod
+    def _format_duration(segundos):
+        """Formatea una duración en segundos como '1h 05min', '3min 20s' o '45s'"""
+        segundos = int(round(segundos))
+        if segundos >= 3600:
+            return f"{segundos // 3600}h {(segundos % 3600) // 60:02d}min"
+        if segundos >= 60:
+            return f"{segundos // 60}min {segundos % 60:02d}s"
+        return f"{segundos}s"
+
     def separate_pdf_thread(self):
         """Ejecuta la separación optimizada del PDF"""
         try:
             formato_nombre = self.format_field.value or "pagina_{:03d}"
             crear_zip = self.create_zip_switch.value
+            solo_zip = crear_zip and self.zip_only_switch.value
 
             # Validar formato
             try:
@@ -564,16 +946,31 @@ class SepararPage(BasePage):
 
             # Obtener parámetros de optimización
             try:
-                batch_size = int(self.batch_size_field.value) if self.batch_size_field.value else 1000
-                batch_size = max(100, min(batch_size, 10000))  # Limitar entre 100 y 10000
+                # Vacío: el tamaño de los bloques se ajusta solo al rendimiento
+                batch_size = int(self.batch_size_field.value) if self.batch_size_field.value else None
+                if batch_size is not None:
+                    batch_size = max(100, min(batch_size, 10000))  # Limitar entre 100 y 10000
             except:
-                batch_size = 1000
+                batch_size = None
 
             try:
                 max_workers = int(self.workers_field.value) if self.workers_field.value else None
             except:
                 max_workers = None
 
+            try:
+                paginas_por_archivo = max(1, int(self.pages_per_file_field.value or 1))
+            except ValueError:
+                self.update_progress(-1, "Páginas por archivo inválido")
+                return
+
+            tamano_max_archivo = None
+            if self.size_limit_switch.value:
+                paginas_por_archivo = 1
+                tamano_max_archivo = int(
+                    float(config_manager.get("pdf", "max_file_size_mb", 100)) * 1024 * 1024
+                )
+
             # Obtener rango de páginas
             rango_paginas = None
             if self.use_page_range.value:
@@ -584,16 +981,44 @@ class SepararPage(BasePage):
                 except:
                     pass
 
+            try:
+                paginas_seleccionadas = self._get_page_selection()
+            except ValueError as ex:
+                self.update_progress(-1, f"Selección de páginas inválida: {ex}")
+                return
+
+            formato_carpeta = None
+            if self.shard_switch.value:
+                formato_carpeta = config_manager.get("pdf", "shard_folder_format", "{:04d}")
+
             # Ejecutar división optimizada
             resultado = dividir_pdf_optimizado(
                 ruta_pdf=self.selected_file,
                 carpeta_salida=self.output_folder,
                 formato_nombre=formato_nombre,
                 crear_zip=crear_zip,
-                callback_progreso=self.update_progress,
+                callback_eventos=self.update_progress_event,
                 batch_size=batch_size,
                 max_workers=max_workers,
-                rango_paginas=rango_paginas
+                rango_paginas=rango_paginas,
+                paginas_seleccionadas=paginas_seleccionadas,
+                paginas_por_archivo=paginas_por_archivo,
+                tamano_max_archivo=tamano_max_archivo,
+                podar_recursos=self.prune_resources_switch.value,
+                deduplicar=self.deduplicate_switch.value,
+                usar_cache=self.output_cache_switch.value,
+                limite_cache_mb=config_manager.get("pdf", "output_cache_mb", 2048),
+                solo_zip=solo_zip,
+                compresion_zip=config_manager.get("pdf", "zip_compression", "ZIP_DEFLATED"),
+                motor=self.engine_dropdown.value or MOTOR_PYPDF2,
+                control=self.job_control,
+                formato_carpeta=formato_carpeta,
+                paginas_por_carpeta=config_manager.get("pdf", "pages_per_shard", 1000),
+                hilos_escritura=config_manager.get("pdf", "writer_threads", 2),
+                backend=self.backend_dropdown.value or BACKEND_AUTO,
+                limite_workers=config_manager.get("pdf", "max_workers", None),
+                estimacion=self.current_estimation if self.current_estimation
+                and self.current_estimation['calibrado'] else None
             )
 
             self.show_results(resultado)
@@ -601,55 +1026,196 @@ class SepararPage(BasePage):
         except Exception as e:
             self.update_progress(-1, f"Error: {str(e)}")
         finally:
-            self.is_processing = False
-            self.separate_button.disabled = False
-            if self.page:
-                self.page.update()
+            self._finish_job()
+
+    def resume_pdf_thread(self):
+        """Continúa el trabajo interrumpido con los parámetros con los que empezó"""
+        try:
+            try:
+                batch_size = int(self.batch_size_field.value) if self.batch_size_field.value else None
+                if batch_size is not None:
+                    batch_size = max(100, min(batch_size, 10000))
+            except:
+                batch_size = None
+
+            try:
+                max_workers = int(self.workers_field.value) if self.workers_field.value else None
+            except:
+                max_workers = None
+
+            resultado = reanudar_division(
+                self.output_folder,
+                callback_eventos=self.update_progress_event,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                control=self.job_control,
+                hilos_escritura=config_manager.get("pdf", "writer_threads", 2),
+                backend=self.backend_dropdown.value or BACKEND_AUTO,
+                limite_workers=config_manager.get("pdf", "max_workers", None),
+                deduplicar=self.deduplicate_switch.value,
+                usar_cache=self.output_cache_switch.value,
+                limite_cache_mb=config_manager.get("pdf", "output_cache_mb", 2048)
+            )
+
+            self.show_results(resultado)
+
+        except Exception as e:
+            self.update_progress(-1, f"Error: {str(e)}")
+        finally:
+            self._finish_job()
 
     def separate_pdf(self, e):
         """Inicia la separación"""
         if not self.selected_file or self.is_processing:
             return
 
+        self._start_job()
+
+        thread = threading.Thread(target=self.separate_pdf_thread)
+        thread.daemon = True
+        thread.start()
+
+    def resume_pdf(self, e):
+        """Inicia la reanudación del trabajo interrumpido"""
+        if not self.selected_file or self.is_processing:
+            return
+
+        self._start_job()
+
+        thread = threading.Thread(target=self.resume_pdf_thread)
+        thread.daemon = True
+        thread.start()
+
+    def _start_job(self):
+        """Prepara la interfaz para un trabajo nuevo"""
         self.is_processing = True
+        self.job_control = ControlTrabajo()
         self.separate_button.disabled = True
+        self.resume_button.visible = False
+        self.pause_button.text = "Pausar"
+        self.pause_button.icon = ft.Icons.PAUSE
+        self.pause_button.disabled = False
+        self.pause_button.visible = True
+        self.cancel_button.disabled = False
+        self.cancel_button.visible = True
         self.progress_bar.visible = True
         self.progress_text.visible = True
         self.result_container.visible = False
         self.page.update()
 
-        thread = threading.Thread(target=self.separate_pdf_thread)
-        thread.daemon = True
-        thread.start()
+    def _finish_job(self):
+        """Restaura la interfaz al terminar (o cancelar) un trabajo"""
+        self.is_processing = False
+        self.job_control = None
+        self.separate_button.disabled = False
+        self.pause_button.visible = False
+        self.cancel_button.visible = False
+        self._check_pending_job()
+        if self.page:
+            self.page.update()
+
+    def toggle_pause(self, e):
+        """Pausa o continúa el trabajo en curso"""
+        control = self.job_control
+        if control is None:
+            return
+
+        if control.pausado:
+            control.continuar()
+            self.pause_button.text = "Pausar"
+            self.pause_button.icon = ft.Icons.PAUSE
+            self.progress_text.value = "⏳ Continuando..."
+        else:
+            control.pausar()
+            self.pause_button.text = "Continuar"
+            self.pause_button.icon = ft.Icons.PLAY_ARROW
+            self.progress_text.value = "⏸️ En pausa"
+        self.page.update()
+
+    def cancel_job(self, e):
+        """Cancela el trabajo en curso conservando lo ya generado"""
+        control = self.job_control
+        if control is None:
+            return
+
+        control.cancelar()
+        self.pause_button.disabled = True
+        self.cancel_button.disabled = True
+        self.progress_text.value = "⏳ Cancelando..."
+        self.page.update()
 
     def show_results(self, resultado):
         """Muestra resultados"""
+        cancelado = resultado.get('cancelado', False)
+        paginas_con_error = resultado.get('paginas_con_error') or []
+
+        # En modo solo ZIP no existe la carpeta de páginas: abrir la que contiene el ZIP
+        carpeta_resultado = resultado['carpeta']
+        duplicados = resultado.get('duplicados') or []
+        if not os.path.isdir(carpeta_resultado) and resultado['zip']:
+            carpeta_resultado = os.path.dirname(os.path.abspath(resultado['zip']))
+
         result_card = ft.Card(
             content=ft.Container(
                 content=ft.Column([
                     ft.Row([
-                        ft.Icon(ft.Icons.CHECK_CIRCLE, color=ft.Colors.GREEN, size=30),
-                        ft.Text("División completada", size=18, weight=ft.FontWeight.BOLD)
+                        ft.Icon(ft.Icons.CANCEL if cancelado
+                                else ft.Icons.ERROR if paginas_con_error else ft.Icons.CHECK_CIRCLE,
+                                color=ft.Colors.ORANGE if cancelado
+                                else ft.Colors.RED if paginas_con_error else ft.Colors.GREEN, size=30),
+                        ft.Text("División cancelada" if cancelado
+                                else "División con errores" if paginas_con_error else "División completada",
+                                size=18, weight=ft.FontWeight.BOLD)
                     ]),
                     ft.Divider(),
                     ft.Row([
                         ft.Icon(ft.Icons.PAGES, color=ft.Colors.BLUE),
-                        ft.Text(f"Páginas: {resultado['total_paginas']:,}")
+                        ft.Text(
+                            f"Páginas: {resultado['paginas_procesadas']:,} de {resultado['total_paginas']:,}"
+                            " (puedes reanudar el trabajo)"
+                            if cancelado or paginas_con_error else f"Páginas: {resultado['total_paginas']:,}"
+                        )
                     ]),
+                    ft.Row([
+                        ft.Icon(ft.Icons.ERROR_OUTLINE, color=ft.Colors.RED),
+                        ft.Text(
+                            f"Sin generar: {len(paginas_con_error):,} páginas "
+                            f"({formatear_paginas(paginas_con_error[:20])}"
+                            f"{'...' if len(paginas_con_error) > 20 else ''})"
+                        )
+                    ]) if paginas_con_error else ft.Container(),
                     ft.Row([
                         ft.Icon(ft.Icons.FOLDER, color=ft.Colors.ORANGE),
-                        ft.Text(f"Carpeta: {os.path.basename(resultado['carpeta'])}")
+                        ft.Text(f"Carpeta: {os.path.basename(carpeta_resultado)}")
                     ]),
                     ft.Row([
                         ft.Icon(ft.Icons.ARCHIVE, color=ft.Colors.PURPLE),
                         ft.Text(f"ZIP: {'Sí' if resultado['zip'] else 'No'}")
                     ]) if resultado['zip'] else ft.Container(),
+                    ft.Row([
+                        ft.Icon(ft.Icons.CONTENT_COPY, color=ft.Colors.TEAL),
+                        ft.Text(
+                            f"Repetidos: {sum(len(grupo) - 1 for grupo in duplicados):,} archivos "
+                            f"iguales a otros ({len(duplicados):,} grupos), escritos una sola vez"
+                        )
+                    ]) if duplicados else ft.Container(),
+                    ft.Row([
+                        ft.Icon(ft.Icons.CACHED, color=ft.Colors.INDIGO),
+                        ft.Text(
+                            f"Desde caché: {resultado['archivos_desde_cache']:,} archivos "
+                            f"reutilizados de divisiones anteriores"
+                        )
+                    ]) if resultado.get('archivos_desde_cache') else ft.Container(),
+                    ft.Row([
+                        ft.Icon(ft.Icons.WARNING_AMBER, color=ft.Colors.ORANGE),
+                        ft.Text(f"Avisos: {'; '.join(resultado['avisos'][:3])}")
+                    ]) if resultado.get('avisos') else ft.Container(),
                     ft.Divider(),
                     ft.Row([
                         ft.ElevatedButton(
                             "Abrir carpeta",
                             icon=ft.Icons.FOLDER_OPEN,
-                            on_click=lambda _: self.open_folder(resultado['carpeta'])
+                            on_click=lambda _: self.open_folder(carpeta_resultado)
                         ),
                         ft.ElevatedButton(
                             "Nueva división",
@@ -666,8 +1232,8 @@ class SepararPage(BasePage):
         self.result_container.visible = True
         self.page.update()
 
-        if config_manager.get("general", "open_folder_after_process", True):
-            self.open_folder(resultado['carpeta'])
+        if config_manager.get("general", "open_folder_after_process", True) and not cancelado:
+            self.open_folder(carpeta_resultado)
 
     def open_folder(self, folder_path):
         """Abre la carpeta de resultados"""
@@ -688,7 +1254,11 @@ class SepararPage(BasePage):
 
     def clear_form(self, e):
         """Limpia el formulario"""
+        self._cancel_analysis()
+        self.analysis_spinner.visible = False
         self.selected_file = None
+        self.calibration = None
+        self.current_estimation = None
         self.output_folder = None
         self.total_pages = 0
         self.file_text.value = "Ningún archivo seleccionado"
@@ -697,17 +1267,34 @@ class SepararPage(BasePage):
         self.folder_text.value = default_output or "Se creará automáticamente"
 
         self.format_field.value = config_manager.get("pdf", "default_output_format", "pagina_{:03d}")
+        self.pages_per_file_field.value = ""
+        self.pages_per_file_field.disabled = False
+        self.size_limit_switch.value = False
         self.create_zip_switch.value = config_manager.get("pdf", "create_zip_by_default", True)
-        self.batch_size_field.value = "1000"
+        self.zip_only_switch.value = False
+        self.zip_only_switch.disabled = not self.create_zip_switch.value
+        self.shard_switch.value = config_manager.get("pdf", "shard_output_folders", False)
+        self.prune_resources_switch.value = config_manager.get("pdf", "prune_resources", True)
+        self.deduplicate_switch.value = config_manager.get("pdf", "deduplicate_pages", True)
+        self.output_cache_switch.value = config_manager.get("pdf", "output_cache", True)
+        self.batch_size_field.value = ""
         self.workers_field.value = ""
+        self.engine_dropdown.value = MOTOR_PYPDF2
+        self.backend_dropdown.value = BACKEND_AUTO
 
         self.use_page_range.value = False
         self.page_range_start.value = ""
         self.page_range_start.disabled = True
         self.page_range_end.value = ""
         self.page_range_end.disabled = True
+        self.use_page_selection.value = False
+        self.page_selection_field.value = ""
+        self.page_selection_field.disabled = True
 
         self.separate_button.disabled = True
+        self.resume_button.visible = False
+        self.pause_button.visible = False
+        self.cancel_button.visible = False
         self.progress_bar.visible = False
         self.progress_text.visible = False
         self.result_container.visible = False
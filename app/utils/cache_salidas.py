@@ -0,0 +1,260 @@
+# utils/cache_salidas.py - Caché por contenido de los archivos generados al dividir
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import PyPDF2
+
+from app.utils.duplicados import huella_datos
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+VERSION_CACHE = 1
+
+# Tamaño máximo de la caché en disco antes de borrar los archivos menos usados
+LIMITE_CACHE_MB = 2048
+
+# ioctl de Linux que clona un archivo compartiendo sus bloques (Btrfs, XFS, bcachefs...)
+_FICLONE = 0x40049409
+
+# Formas de llevar un archivo de la caché a su destino, de la más barata a la más cara
+_MODOS = ('clon', 'enlace', 'copia')
+
+# Primer modo que funcionó entre cada par de carpetas: no se reintentan los que fallan
+_modo_carpetas = {}
+
+
+def _clonar(origen, destino):
+    """Copia origen en destino compartiendo los bloques (reflink); solo Linux"""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError("El sistema no admite clonar archivos")
+    with open(origen, 'rb') as archivo_origen, open(destino, 'wb') as archivo_destino:
+        fcntl.ioctl(archivo_destino.fileno(), _FICLONE, archivo_origen.fileno())
+
+
+def copiar_contenido(origen, destino):
+    """
+    Hace que destino tenga el contenido de origen sin volver a generarlo.
+
+    Prueba por orden un clon (reflink: no ocupa espacio y cada archivo se
+    puede modificar por separado), un enlace duro y una copia. Si destino ya
+    existe se sustituye de forma atómica.
+
+    Args:
+        origen (str): Archivo existente
+        destino (str): Ruta a crear
+
+    Returns:
+        str: 'clon', 'enlace' o 'copia'
+    """
+    carpetas = (os.path.dirname(origen), os.path.dirname(destino))
+    temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.cache"
+    for posicion in range(_modo_carpetas.get(carpetas, 0), len(_MODOS)):
+        modo = _MODOS[posicion]
+        try:
+            if modo == 'clon':
+                _clonar(origen, temporal)
+            elif modo == 'enlace':
+                os.link(origen, temporal)
+            else:
+                shutil.copyfile(origen, temporal)
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            if modo == 'copia':
+                raise
+            continue
+        _modo_carpetas[carpetas] = posicion
+        os.replace(temporal, destino)
+        return modo
+
+
+class CacheSalidas:
+    """
+    Caché en disco de los archivos que genera la división, direccionada por contenido.
+
+    Cada archivo generado se identifica por el resumen del PDF de origen (su
+    contenido, no su ruta), las páginas que lleva y los ajustes que cambian
+    sus bytes (motor, poda de recursos, versión de PyPDF2). Repetir una
+    división cambiando solo la carpeta, el nombre de los archivos o el ZIP
+    encuentra aquí todos sus archivos y los lleva al destino con un clon, un
+    enlace duro o una copia, sin volver a extraerlos.
+
+    En disco hay dos carpetas: 'objetos', con un archivo por contenido
+    (nombrado por su huella, así las páginas idénticas se guardan una vez), y
+    'claves', con la huella del objeto de cada clave. Al leer un objeto se
+    comprueba su huella: si alguien modificó un archivo enlazado a él, se
+    descarta. Cuando la caché supera el límite se borran los archivos usados
+    hace más tiempo.
+    """
+
+    def __init__(self, carpeta=None, limite_mb=LIMITE_CACHE_MB):
+        self.carpeta = Path(carpeta) if carpeta else Path(__file__).parent.parent / "cache" / "salidas"
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Claves y archivos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def clave(digest, indices, motor, podar_recursos):
+        """
+        Clave de un archivo generado.
+
+        Args:
+            digest (str): Resumen del PDF de origen (ver CacheIndicePaginas.digest_contenido)
+            indices (list): Páginas (0-based) del archivo, en orden
+            motor (str): Motor con el que se extrae
+            podar_recursos (bool): Si se podan los recursos de las páginas
+
+        Returns:
+            str: Clave en hexadecimal
+        """
+        texto = json.dumps([VERSION_CACHE, PyPDF2.__version__, digest, motor, bool(podar_recursos),
+                            list(indices)], separators=(',', ':'))
+        return hashlib.blake2b(texto.encode('utf-8'), digest_size=20).hexdigest()
+
+    def _ruta_clave(self, clave):
+        return os.path.join(self.carpeta, "claves", clave[:2], f"{clave}.ref")
+
+    def _ruta_objeto(self, huella_hex):
+        return os.path.join(self.carpeta, "objetos", huella_hex[:2], f"{huella_hex}.pdf")
+
+    @staticmethod
+    def _escribir_atomico(ruta, datos):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(datos)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _descartar(*rutas):
+        for ruta in rutas:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def buscar(self, clave):
+        """
+        Devuelve el archivo guardado con esa clave.
+
+        Returns:
+            tuple | None: (datos, huella) o None si no está o su contenido cambió
+        """
+        ruta_clave = self._ruta_clave(clave)
+        try:
+            with open(ruta_clave, 'rb') as archivo:
+                huella_hex = archivo.read().decode('ascii')
+            ruta_objeto = self._ruta_objeto(huella_hex)
+            with open(ruta_objeto, 'rb') as archivo:
+                datos = archivo.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+        huella = huella_datos(datos)
+        if huella.hex() != huella_hex:
+            # Un archivo enlazado al objeto se modificó después de generarse
+            self._descartar(ruta_clave, ruta_objeto)
+            return None
+
+        # Marcar como usados recientemente (la fecha de modificación ordena el LRU)
+        try:
+            os.utime(ruta_clave)
+            os.utime(ruta_objeto)
+        except OSError:
+            pass
+        return datos, huella
+
+    def guardar(self, clave, huella, datos=None, origen=None):
+        """
+        Guarda un archivo generado con su clave.
+
+        Args:
+            clave (str): Resultado de clave()
+            huella (bytes): huella_datos() del contenido
+            datos (bytes, optional): Contenido, si no está en disco
+            origen (str, optional): Archivo ya escrito con ese contenido; se
+                                    clona o enlaza en lugar de escribirlo otra vez
+        """
+        ruta_objeto = self._ruta_objeto(huella.hex())
+        if not os.path.exists(ruta_objeto):
+            if origen is not None:
+                os.makedirs(os.path.dirname(ruta_objeto), exist_ok=True)
+                copiar_contenido(origen, ruta_objeto)
+            else:
+                self._escribir_atomico(ruta_objeto, datos)
+        self._escribir_atomico(self._ruta_clave(clave), huella.hex().encode('ascii'))
+
+    def materializar(self, huella, destino):
+        """
+        Lleva el objeto con esa huella a destino (clon, enlace duro o copia).
+
+        Returns:
+            bool: False si no se pudo (el llamador escribe los datos)
+        """
+        try:
+            copiar_contenido(self._ruta_objeto(huella.hex()), destino)
+        except OSError:
+            return False
+        return True
+
+    def aplicar_limite(self, limite_bytes=None):
+        """Borra los archivos menos usados hasta quedar por debajo del límite"""
+        limite_bytes = self.limite_bytes if limite_bytes is None else limite_bytes
+        with self._lock:
+            archivos = []
+            for ruta in self._archivos():
+                try:
+                    info = os.stat(ruta)
+                except OSError:
+                    continue
+                archivos.append((info.st_mtime_ns, info.st_size, ruta))
+
+            # Las claves sin objeto se descartan al buscarlas
+            total = sum(tamano for _, tamano, _ in archivos)
+            for _, tamano, ruta in sorted(archivos):
+                if total <= limite_bytes:
+                    break
+                try:
+                    os.remove(ruta)
+                    total -= tamano
+                except OSError:
+                    pass
+
+    def _archivos(self):
+        """Objetos y claves guardados (sin los temporales de escrituras en curso)"""
+        for subcarpeta, extension in (("objetos", ".pdf"), ("claves", ".ref")):
+            try:
+                prefijos = list(os.scandir(os.path.join(self.carpeta, subcarpeta)))
+            except OSError:
+                continue
+            for prefijo in prefijos:
+                if not prefijo.is_dir():
+                    continue
+                with os.scandir(prefijo.path) as entradas:
+                    for entrada in entradas:
+                        if entrada.name.endswith(extension):
+                            yield entrada.path
+
+    def limpiar(self):
+        """Borra todos los archivos guardados"""
+        with self._lock:
+            for subcarpeta in ("objetos", "claves"):
+                shutil.rmtree(os.path.join(self.carpeta, subcarpeta), ignore_errors=True)
+
+
+cache_salidas = CacheSalidas()
@@ -32,7 +32,17 @@ class ConfigManager:
                 "optimize_for_web": False,
                 "default_output_format": "pagina_{:03d}",
                 "create_zip_by_default": True,
-                "max_file_size_mb": 100
+                "max_file_size_mb": 100,
+                "zip_compression": "ZIP_DEFLATED",
+                "shard_output_folders": False,
+                "shard_folder_format": "{:04d}",
+                "pages_per_shard": 1000,
+                "writer_threads": 2,
+                "max_workers": None,
+                "prune_resources": True,
+                "deduplicate_pages": True,
+                "output_cache": True,
+                "output_cache_mb": 2048
             },
             "paths": {
                 "last_input_folder": "",
@@ -0,0 +1,77 @@
+# utils/control_trabajo.py - Cancelación y pausa de trabajos en curso
+import threading
+
+from app.utils.pool_manager import ESTADO_CANCELADO, ESTADO_EN_CURSO, ESTADO_PAUSADO
+
+
+class ControlTrabajo:
+    """
+    Token para cancelar o pausar un trabajo de división desde otro hilo (p. ej. la UI).
+
+    El proceso principal lo consulta entre bloques y, mientras el trabajo está
+    registrado en el pool (PoolManager.registrar_trabajo), su estado se copia
+    a memoria compartida para que los workers lo vean entre página y página.
+    """
+
+    def __init__(self):
+        self._estado = ESTADO_EN_CURSO
+        self._lock = threading.Lock()
+        self._en_curso = threading.Event()
+        self._en_curso.set()
+        self._estados = None
+        self._slot = None
+
+    def _cambiar_estado(self, estado):
+        with self._lock:
+            self._estado = estado
+            if self._estados is not None:
+                self._estados[self._slot] = estado
+
+        if estado == ESTADO_PAUSADO:
+            self._en_curso.clear()
+        else:
+            self._en_curso.set()
+
+    def cancelar(self):
+        """Pide que el trabajo termine cuanto antes conservando lo ya generado"""
+        self._cambiar_estado(ESTADO_CANCELADO)
+
+    def pausar(self):
+        """Detiene el trabajo hasta llamar a continuar() (los workers dejan de usar CPU)"""
+        if not self.cancelado:
+            self._cambiar_estado(ESTADO_PAUSADO)
+
+    def continuar(self):
+        """Reanuda un trabajo en pausa"""
+        if self.pausado:
+            self._cambiar_estado(ESTADO_EN_CURSO)
+
+    @property
+    def cancelado(self):
+        return self._estado == ESTADO_CANCELADO
+
+    @property
+    def pausado(self):
+        return self._estado == ESTADO_PAUSADO
+
+    def esperar_si_pausado(self):
+        """
+        Bloquea mientras el trabajo está en pausa.
+
+        Returns:
+            bool: True para seguir, False si el trabajo se canceló
+        """
+        self._en_curso.wait()
+        return not self.cancelado
+
+    def _vincular(self, estados, slot):
+        """Publica el estado en el slot compartido que leen los workers"""
+        with self._lock:
+            self._estados = estados
+            self._slot = slot
+            estados[slot] = self._estado
+
+    def _desvincular(self):
+        with self._lock:
+            self._estados = None
+            self._slot = None
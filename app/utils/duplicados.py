@@ -0,0 +1,129 @@
+# utils/duplicados.py - Detección de archivos idénticos y enlaces duros entre ellos
+import hashlib
+import os
+import shutil
+
+# Huellas de archivos distintos que recuerda el proceso principal; pasado el
+# límite solo se siguen detectando copias de los ya registrados
+MAX_HUELLAS = 100_000
+
+# Huellas repetidas que se envían a los workers con cada bloque para que no
+# vuelvan a escribir ni comprimir esos archivos
+MAX_HUELLAS_REPETIDAS = 1024
+
+
+def huella_datos(datos):
+    """
+    Huella del contenido de un archivo generado.
+
+    La salida de ambos motores es determinista: dos páginas con el mismo
+    contenido y los mismos recursos producen los mismos bytes, así que la
+    huella de los bytes identifica las páginas repetidas.
+
+    Args:
+        datos (bytes): Contenido del PDF generado
+
+    Returns:
+        bytes: Resumen BLAKE2b de 16 bytes
+    """
+    return hashlib.blake2b(datos, digest_size=16).digest()
+
+
+def enlazar_archivo(origen, destino):
+    """
+    Hace que destino sea un enlace duro a origen, sustituyéndolo si ya existe.
+
+    Si el sistema de archivos no admite enlaces duros (FAT, exFAT, algunas
+    unidades de red) se copia el archivo.
+
+    Args:
+        origen (str): Archivo ya escrito
+        destino (str): Ruta del duplicado
+
+    Returns:
+        bool: True si se creó un enlace, False si hubo que copiar
+    """
+    temporal = destino + ".enlace"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+    try:
+        os.link(origen, temporal)
+        enlazado = True
+    except OSError:
+        shutil.copyfile(origen, temporal)
+        enlazado = False
+    os.replace(temporal, destino)
+    return enlazado
+
+
+class RegistroDuplicados:
+    """
+    Huellas de los archivos de un trabajo, en el proceso principal.
+
+    Recuerda dónde quedó el primer archivo con cada contenido (ruta y entrada
+    del ZIP) para enlazar o copiar ahí los que se repiten, y agrupa los
+    duplicados para el resultado. Las huellas que ya se repitieron se publican
+    en 'repetidas' para que los workers las reconozcan sin generar el archivo
+    dos veces.
+    """
+
+    def __init__(self, carpeta_salida, max_huellas=MAX_HUELLAS, max_repetidas=MAX_HUELLAS_REPETIDAS):
+        self.carpeta_salida = carpeta_salida
+        self.max_huellas = max_huellas
+        self.max_repetidas = max_repetidas
+
+        # huella -> (ruta relativa o None, entrada del ZIP o None)
+        self._originales = {}
+        # huella -> nombres de los duplicados, en orden de llegada
+        self._grupos = {}
+        # huella -> ruta relativa del original (None en modo solo ZIP); se sustituye
+        # (no se modifica) al crecer, así cada bloque se lleva una versión estable
+        self.repetidas = {}
+        self.archivos_duplicados = 0
+        self.bytes_duplicados = 0
+
+    def original(self, huella):
+        """(ruta relativa, entrada del ZIP) del primer archivo con esa huella, o None"""
+        return self._originales.get(huella)
+
+    def registrar(self, huella, ruta_relativa, entrada_zip):
+        """Anota un archivo nuevo como original de su contenido (si cabe en el registro)"""
+        if huella not in self._originales and len(self._originales) < self.max_huellas:
+            self._originales[huella] = (ruta_relativa, entrada_zip)
+
+    def registrar_duplicado(self, huella, nombre, tamano, original):
+        """
+        Anota un duplicado del archivo original.
+
+        Args:
+            huella (bytes): Huella del contenido
+            nombre (str): Ruta relativa (o nombre en el ZIP) del duplicado
+            tamano (int): Bytes del archivo
+            original (tuple): (ruta relativa, entrada del ZIP) del original
+        """
+        self.archivos_duplicados += 1
+        self.bytes_duplicados += tamano
+        grupo = self._grupos.get(huella)
+        if grupo is None:
+            ruta_original, entrada_zip = original
+            grupo = self._grupos[huella] = [ruta_original or entrada_zip[0]]
+            if len(self.repetidas) < self.max_repetidas:
+                # Los workers darán por escrito el original: debe quedar registrado
+                self._originales.setdefault(huella, original)
+                self.repetidas = {**self.repetidas, huella: ruta_original}
+        grupo.append(nombre)
+
+    def enlazar(self, ruta_original, ruta_relativa):
+        """Sustituye un archivo ya escrito por un enlace duro a su original"""
+        return enlazar_archivo(os.path.join(self.carpeta_salida, ruta_original),
+                               os.path.join(self.carpeta_salida, ruta_relativa))
+
+    def grupos(self):
+        """
+        Grupos de archivos idénticos.
+
+        Returns:
+            list: Listas [original, duplicado, ...] con rutas relativas (o nombres del
+                  ZIP en modo solo ZIP), en orden de llegada
+        """
+        return list(self._grupos.values())
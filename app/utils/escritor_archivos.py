@@ -0,0 +1,110 @@
+# utils/escritor_archivos.py - Escritura de archivos en segundo plano con memoria acotada
+import collections
+import os
+import threading
+
+# Bytes que pueden esperar a escribirse en cada proceso antes de frenar a quien genera las páginas
+BYTES_PENDIENTES_MAX = 32 * 1024 * 1024
+
+# Archivos que toma cada hilo de la cola de una vez
+_ARCHIVOS_POR_LOTE = 16
+
+
+def escribir_archivo(ruta, datos):
+    """
+    Escribe datos en ruta. Si el archivo ya existe se sustituye por uno nuevo
+    en lugar de sobrescribirlo: puede ser un enlace duro (páginas repetidas,
+    caché de salidas) y el contenido que comparte con otros no debe cambiar.
+    """
+    try:
+        archivo = open(ruta, 'xb')
+    except FileExistsError:
+        os.remove(ruta)
+        archivo = open(ruta, 'xb')
+    with archivo:
+        archivo.write(datos)
+
+
+class EscritorArchivos:
+    """
+    Etapa de escritura desacoplada de la generación de las páginas.
+
+    Quien genera los PDFs deja los bytes en una cola y sigue trabajando; unos
+    hilos los escriben en disco (la escritura libera el GIL, así CPU y disco
+    trabajan a la vez). Si el disco va más lento que la CPU (unidades de red,
+    USB) la cola se llena hasta max_bytes_pendientes y escribir() espera: la
+    memoria queda acotada.
+
+    Varios hilos pueden compartir el mismo escritor: cada uno agrupa sus
+    archivos (p. ej. por bloque) y espera solo a los de su grupo.
+    """
+
+    def __init__(self, hilos=2, max_bytes_pendientes=BYTES_PENDIENTES_MAX):
+        self.hilos = max(1, int(hilos))
+        self.max_bytes_pendientes = max_bytes_pendientes
+
+        self._cola = collections.deque()
+        self._condicion = threading.Condition()
+        self._bytes_pendientes = 0
+        self._pendientes_grupo = collections.Counter()
+        self._errores = {}
+
+        for _ in range(self.hilos):
+            threading.Thread(target=self._bucle, daemon=True).start()
+
+    def escribir(self, ruta, datos, clave=None, grupo=None):
+        """
+        Encola un archivo para escribirlo. Espera si hay demasiados bytes pendientes.
+
+        Args:
+            ruta (str): Ruta del archivo
+            datos (bytes): Contenido
+            clave (hashable, optional): Identifica el archivo en los errores de esperar()
+            grupo (hashable, optional): Grupo al que pertenece el archivo
+        """
+        with self._condicion:
+            # Un archivo mayor que el límite entra igualmente cuando la cola está vacía
+            while (self._bytes_pendientes
+                   and self._bytes_pendientes + len(datos) > self.max_bytes_pendientes):
+                self._condicion.wait()
+            self._cola.append((grupo, clave if clave is not None else ruta, ruta, datos))
+            self._bytes_pendientes += len(datos)
+            self._pendientes_grupo[grupo] += 1
+            self._condicion.notify_all()
+
+    def esperar(self, grupo=None):
+        """
+        Espera a que se escriban todos los archivos encolados del grupo.
+
+        Returns:
+            dict: {clave: excepción} de los archivos del grupo que no se pudieron escribir
+        """
+        with self._condicion:
+            while self._pendientes_grupo[grupo]:
+                self._condicion.wait()
+            del self._pendientes_grupo[grupo]
+            return self._errores.pop(grupo, {})
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._cola:
+                    self._condicion.wait()
+                # Con mucha cola cada hilo toma varios archivos para reducir esperas en el lock
+                cantidad = min(_ARCHIVOS_POR_LOTE, max(1, len(self._cola) // self.hilos))
+                lote = [self._cola.popleft() for _ in range(cantidad)]
+
+            errores = []
+            for grupo, clave, ruta, datos in lote:
+                try:
+                    escribir_archivo(ruta, datos)
+                except OSError as e:
+                    errores.append((grupo, clave, e))
+
+            with self._condicion:
+                self._bytes_pendientes -= sum(len(datos) for _, _, _, datos in lote)
+                for grupo, _, _, _ in lote:
+                    self._pendientes_grupo[grupo] -= 1
+                for grupo, clave, error in errores:
+                    self._errores.setdefault(grupo, {})[clave] = error
+                self._condicion.notify_all()
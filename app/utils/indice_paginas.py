@@ -0,0 +1,272 @@
+# utils/indice_paginas.py - Índice persistente de páginas para no volver a analizar el mismo PDF
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import PyPDF2
+
+from app.utils.pdf_raw import DocumentoCrudo
+
+VERSION_INDICE = 1
+
+# Tamaño máximo de la caché en disco antes de borrar los índices menos usados
+LIMITE_CACHE_MB = 256
+
+# Bytes que se leen de cada vez al calcular el resumen del contenido
+_BYTES_LECTURA_DIGEST = 8 * 1024 * 1024
+
+
+class CacheIndicePaginas:
+    """
+    Caché en disco con el índice de páginas de cada PDF analizado.
+
+    Cada índice guarda el número de páginas, el offset del objeto de cada
+    página y (bajo demanda) los bytes que necesita cada página. La clave es
+    la ruta más el tamaño y la fecha de modificación: si el archivo cambia,
+    el índice se reconstruye. Cuando la caché supera el límite se borran los
+    índices usados hace más tiempo.
+    """
+
+    def __init__(self, carpeta=None, limite_mb=LIMITE_CACHE_MB):
+        self.carpeta = Path(carpeta) if carpeta else Path(__file__).parent.parent / "cache" / "indices"
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        # Últimos índices leídos en esta sesión, para no ir al disco cada vez
+        self._memoria = {}
+
+    # ------------------------------------------------------------------
+    # Claves y archivos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _clave(ruta_pdf):
+        """Clave del archivo: ruta absoluta, tamaño y fecha de modificación"""
+        info = os.stat(ruta_pdf)
+        return {
+            'ruta': os.path.abspath(ruta_pdf),
+            'tamano': info.st_size,
+            'mtime_ns': info.st_mtime_ns,
+        }
+
+    def _ruta_indice(self, ruta_absoluta):
+        nombre = hashlib.sha1(ruta_absoluta.encode('utf-8')).hexdigest()
+        return self.carpeta / f"{nombre}.json"
+
+    def _leer(self, clave):
+        """Devuelve el índice guardado si sigue correspondiendo al archivo"""
+        indice = self._memoria.get(clave['ruta'])
+        if indice is not None and indice['clave'] == clave:
+            return indice
+
+        ruta = self._ruta_indice(clave['ruta'])
+        try:
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                indice = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+
+        if indice.get('version') != VERSION_INDICE or indice.get('clave') != clave:
+            return None
+
+        # Marcar como usado recientemente (la fecha de modificación ordena el LRU)
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+
+        self._memoria[clave['ruta']] = indice
+        return indice
+
+    def _guardar(self, indice):
+        """Escribe el índice de forma atómica y aplica el límite de tamaño"""
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        ruta = self._ruta_indice(indice['clave']['ruta'])
+        temporal = ruta.with_suffix('.tmp')
+
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(indice, archivo, separators=(',', ':'))
+        os.replace(temporal, ruta)
+
+        self._memoria[indice['clave']['ruta']] = indice
+        self._aplicar_limite(conservar=ruta)
+
+    def _aplicar_limite(self, conservar=None):
+        """Borra los índices menos usados hasta quedar por debajo del límite"""
+        archivos = []
+        for ruta in self.carpeta.glob("*.json"):
+            try:
+                info = ruta.stat()
+            except OSError:
+                continue
+            archivos.append((info.st_mtime_ns, info.st_size, ruta))
+
+        total = sum(tamano for _, tamano, _ in archivos)
+        for _, tamano, ruta in sorted(archivos):
+            if total <= self.limite_bytes:
+                break
+            if ruta == conservar:
+                continue
+            try:
+                ruta.unlink()
+                total -= tamano
+            except OSError:
+                pass
+
+    def _guardar_sin_fallar(self, indice, avisos=None):
+        """
+        Guarda el índice; si el disco falla lo conserva solo en memoria (esta
+        sesión no vuelve a analizar el PDF) y anota el motivo en avisos.
+        """
+        with self._lock:
+            try:
+                self._guardar(indice)
+            except OSError as e:
+                self._memoria[indice['clave']['ruta']] = indice
+                if avisos is not None:
+                    avisos.append(f"No se pudo guardar el índice de páginas: {e}")
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _construir(ruta_pdf, clave, con_bytes):
+        """Analiza el PDF y genera su índice"""
+        indice = {
+            'version': VERSION_INDICE,
+            'clave': clave,
+            'total_paginas': 0,
+            'offsets': None,
+            'bytes_paginas': None,
+        }
+
+        try:
+            documento = DocumentoCrudo(ruta_pdf)
+        except Exception:
+            # PDFs que el motor crudo no admite: solo el número de páginas
+            with open(ruta_pdf, 'rb') as archivo:
+                indice['total_paginas'] = len(PyPDF2.PdfReader(archivo, strict=False).pages)
+            return indice
+
+        try:
+            total = documento.total_paginas
+            indice['total_paginas'] = total
+            indice['offsets'] = [
+                documento.offset_objeto(documento.numero_objeto_pagina(i)) for i in range(total)
+            ]
+            if con_bytes:
+                indice['bytes_paginas'] = [documento.bytes_pagina(i) for i in range(total)]
+        finally:
+            documento.cerrar()
+
+        return indice
+
+    @staticmethod
+    def _completar_bytes(ruta_pdf, indice):
+        """Añade los bytes por página a un índice que no los tenía"""
+        documento = DocumentoCrudo(ruta_pdf)
+        try:
+            indice['bytes_paginas'] = [documento.bytes_pagina(i) for i in range(documento.total_paginas)]
+        finally:
+            documento.cerrar()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def buscar(self, ruta_pdf):
+        """
+        Devuelve el índice guardado sin analizar el PDF.
+
+        Returns:
+            dict | None: El índice o None si no existe o el archivo cambió
+        """
+        try:
+            clave = self._clave(ruta_pdf)
+        except OSError:
+            return None
+        with self._lock:
+            return self._leer(clave)
+
+    def obtener(self, ruta_pdf, con_bytes=False, avisos=None):
+        """
+        Devuelve el índice del PDF, construyéndolo si hace falta.
+
+        Args:
+            ruta_pdf (str): Ruta del PDF
+            con_bytes (bool): Calcular también los bytes por página (más lento la primera vez)
+            avisos (list, optional): Recibe el motivo si el índice no se pudo guardar
+                                     en disco (el índice se devuelve igualmente)
+
+        Returns:
+            dict: {'total_paginas', 'offsets', 'bytes_paginas', ...}. offsets y
+                  bytes_paginas pueden ser None si el PDF no admite el motor crudo
+        """
+        clave = self._clave(ruta_pdf)
+        with self._lock:
+            indice = self._leer(clave)
+
+        if indice is None:
+            indice = self._construir(ruta_pdf, clave, con_bytes)
+        elif con_bytes and indice['bytes_paginas'] is None and indice['offsets'] is not None:
+            indice = dict(indice)
+            self._completar_bytes(ruta_pdf, indice)
+        else:
+            return indice
+
+        self._guardar_sin_fallar(indice, avisos)
+        return indice
+
+    def total_paginas(self, ruta_pdf, avisos=None):
+        """Número de páginas del PDF usando el índice (avisos como en obtener)"""
+        return self.obtener(ruta_pdf, avisos=avisos)['total_paginas']
+
+    def bytes_paginas(self, ruta_pdf):
+        """
+        Bytes que necesita cada página (lista 0-based), o None si no se pueden calcular.
+        """
+        return self.obtener(ruta_pdf, con_bytes=True)['bytes_paginas']
+
+    def digest_contenido(self, ruta_pdf, avisos=None):
+        """
+        Resumen SHA-256 del contenido completo del PDF.
+
+        Se calcula una vez por versión del archivo y se guarda en su índice;
+        identifica el contenido aunque el archivo se copie o se mueva (ver
+        CacheSalidas).
+
+        Args:
+            ruta_pdf (str): Ruta del PDF
+            avisos (list, optional): Como en obtener
+
+        Returns:
+            str: Resumen en hexadecimal
+        """
+        indice = self.obtener(ruta_pdf, avisos=avisos)
+        if indice.get('digest'):
+            return indice['digest']
+
+        resumen = hashlib.sha256()
+        with open(ruta_pdf, 'rb') as archivo:
+            for trozo in iter(lambda: archivo.read(_BYTES_LECTURA_DIGEST), b''):
+                resumen.update(trozo)
+
+        indice = dict(indice)
+        indice['digest'] = resumen.hexdigest()
+        self._guardar_sin_fallar(indice, avisos)
+        return indice['digest']
+
+    def limpiar(self):
+        """Borra todos los índices guardados"""
+        with self._lock:
+            self._memoria.clear()
+            for ruta in self.carpeta.glob("*.json"):
+                try:
+                    ruta.unlink()
+                except OSError:
+                    pass
+
+
+indice_paginas = CacheIndicePaginas()
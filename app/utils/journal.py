@@ -0,0 +1,271 @@
+# utils/journal.py - Diario de trabajos de división para poder reanudarlos
+import hashlib
+import json
+import os
+
+NOMBRE_JOURNAL = ".division_journal.jsonl"
+VERSION_JOURNAL = 1
+
+# Bytes del principio y del final del archivo que entran en la huella
+_BYTES_MUESTRA_HUELLA = 1024 * 1024
+
+
+def ruta_journal(carpeta_salida):
+    """Ruta del diario dentro de la carpeta de salida"""
+    return os.path.join(carpeta_salida, NOMBRE_JOURNAL)
+
+
+def huella_archivo(ruta):
+    """
+    Calcula una huella del archivo de origen para detectar si cambió.
+
+    Usa tamaño, fecha de modificación y un hash del primer y último MB,
+    así no hay que leer archivos de varios GB completos.
+
+    Args:
+        ruta (str): Ruta del archivo
+
+    Returns:
+        dict: Huella serializable en JSON
+    """
+    info = os.stat(ruta)
+    resumen = hashlib.sha1()
+
+    with open(ruta, 'rb') as archivo:
+        resumen.update(archivo.read(_BYTES_MUESTRA_HUELLA))
+        if info.st_size > _BYTES_MUESTRA_HUELLA:
+            archivo.seek(max(_BYTES_MUESTRA_HUELLA, info.st_size - _BYTES_MUESTRA_HUELLA))
+            resumen.update(archivo.read())
+
+    return {
+        'tamano': info.st_size,
+        'mtime_ns': info.st_mtime_ns,
+        'sha1_muestra': resumen.hexdigest(),
+    }
+
+
+class JournalDivision:
+    """
+    Diario en formato JSONL de un trabajo de división.
+
+    La primera línea guarda la huella del PDF y los parámetros; después se
+    añade una línea por cada bloque terminado con sus archivos y entradas ZIP.
+    Una línea incompleta al final (por un corte a mitad de escritura) se ignora.
+
+    Mientras está abierto para escribir no guarda los bloques en memoria, solo
+    cuenta sus páginas: la memoria no crece con el tamaño del trabajo.
+    """
+
+    def __init__(self, ruta, cabecera, bloques):
+        self.ruta = ruta
+        self.cabecera = cabecera
+        self.bloques = bloques
+        self.paginas_registradas = 0
+        self._archivo = None
+
+    @classmethod
+    def crear(cls, carpeta_salida, ruta_pdf, huella, parametros, fecha_zip=None, cortes=None):
+        """
+        Crea un diario nuevo (sustituyendo al anterior si existía).
+
+        cortes guarda el reparto de páginas en archivos cuando se calculó al
+        empezar (división por tamaño), para reanudar con el mismo reparto.
+        """
+        cabecera = {
+            'tipo': 'cabecera',
+            'version': VERSION_JOURNAL,
+            'ruta_pdf': os.path.abspath(ruta_pdf),
+            'huella': huella,
+            'parametros': parametros,
+            'fecha_zip': list(fecha_zip) if fecha_zip else None,
+        }
+        if cortes is not None:
+            cabecera['cortes'] = list(cortes)
+        journal = cls(ruta_journal(carpeta_salida), cabecera, [])
+        journal._archivo = open(journal.ruta, 'w', encoding='utf-8')
+        journal._escribir(cabecera)
+        return journal
+
+    @classmethod
+    def cargar(cls, carpeta_salida):
+        """
+        Lee un diario existente.
+
+        Returns:
+            JournalDivision | None: El diario o None si no existe o no es válido
+        """
+        ruta = ruta_journal(carpeta_salida)
+        if not os.path.exists(ruta):
+            return None
+
+        cabecera = None
+        bloques = []
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            for linea in archivo:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    break
+                if registro.get('tipo') == 'cabecera':
+                    cabecera = registro
+                elif registro.get('tipo') == 'bloque':
+                    bloques.append(registro)
+
+        if not cabecera or cabecera.get('version') != VERSION_JOURNAL:
+            return None
+        return cls(ruta, cabecera, bloques)
+
+    def abrir_para_continuar(self, bloques_validos):
+        """
+        Reescribe el diario con solo los bloques verificados y lo deja abierto
+        para seguir añadiendo los nuevos.
+        """
+        temporal = self.ruta + ".tmp"
+        self.bloques = []
+        self.paginas_registradas = 0
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(json.dumps(self.cabecera, ensure_ascii=False) + "\n")
+            for registro in bloques_validos:
+                archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                self.paginas_registradas += paginas_bloque(registro)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self.ruta)
+        self._archivo = open(self.ruta, 'a', encoding='utf-8')
+
+    @property
+    def huella(self):
+        return self.cabecera['huella']
+
+    @property
+    def parametros(self):
+        return self.cabecera['parametros']
+
+    @property
+    def paginas_completadas(self):
+        """Páginas de los bloques cargados y de los registrados desde que se abrió"""
+        return sum(paginas_bloque(bloque) for bloque in self.bloques) + self.paginas_registradas
+
+    def _escribir(self, registro):
+        # Una línea por bloque: el fsync se paga una vez por bloque, no por archivo
+        self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def registrar_bloque(self, inicio, fin, archivos, zip_fin=None, entradas_zip=None, paginas=None):
+        """
+        Marca un bloque como terminado. Debe llamarse después de escribir y
+        vaciar (flush) sus archivos y entradas ZIP; la línea queda en disco
+        (fsync) antes de volver.
+
+        Args:
+            inicio (int): Primera página del bloque (0-based)
+            fin (int): Página final (exclusiva)
+            archivos (list): [numero_pagina, ruta relativa a la carpeta, tamano o None] por página
+            zip_fin (int, optional): Offset del ZIP tras añadir el bloque
+            entradas_zip (list, optional): [nombre, crc, tamano_comprimido, tamano, metodo, offset]
+            paginas (int, optional): Páginas del PDF que cubre el bloque, si [inicio, fin)
+                                     son archivos de varias páginas (default: fin - inicio)
+        """
+        registro = {
+            'tipo': 'bloque',
+            'inicio': inicio,
+            'fin': fin,
+            'archivos': archivos,
+            'zip_fin': zip_fin,
+            'entradas_zip': entradas_zip or [],
+        }
+        # Solo se anota si difiere, así los diarios de una página por archivo no cambian
+        if paginas is not None and paginas != fin - inicio:
+            registro['paginas'] = paginas
+        self._escribir(registro)
+        self.paginas_registradas += paginas_bloque(registro)
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def eliminar(self):
+        """Borra el diario cuando el trabajo terminó correctamente"""
+        self.cerrar()
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+
+def paginas_bloque(bloque):
+    """Páginas del PDF de un bloque del diario (con archivos de varias páginas, no son fin - inicio)"""
+    return bloque.get('paginas', bloque['fin'] - bloque['inicio'])
+
+
+def bloques_verificados(journal, carpeta_salida, ruta_zip=None):
+    """
+    Comprueba en disco los bloques que el diario da por terminados.
+
+    Un bloque es válido si todos sus archivos existen con el tamaño anotado y,
+    cuando hay ZIP, si sus entradas siguen en el archivo. Como el ZIP se escribe
+    de forma secuencial solo se conserva el prefijo de bloques válidos.
+
+    Args:
+        journal (JournalDivision): Diario cargado
+        carpeta_salida (str): Carpeta con los archivos sueltos
+        ruta_zip (str, optional): ZIP que se estaba generando
+
+    Returns:
+        list: Registros de los bloques verificados, en orden de escritura
+    """
+    tamano_zip = None
+    archivo_zip = None
+    if ruta_zip:
+        if not os.path.exists(ruta_zip):
+            return []
+        tamano_zip = os.path.getsize(ruta_zip)
+        archivo_zip = open(ruta_zip, 'rb')
+
+    validos = []
+    try:
+        for bloque in journal.bloques:
+            if not _archivos_validos(bloque, carpeta_salida):
+                # Sin ZIP cada bloque es independiente; con ZIP se corta el prefijo
+                if archivo_zip is None:
+                    continue
+                break
+            if archivo_zip is not None and not _entradas_zip_validas(bloque, archivo_zip, tamano_zip):
+                break
+            validos.append(bloque)
+    finally:
+        if archivo_zip is not None:
+            archivo_zip.close()
+
+    return validos
+
+
+def _archivos_validos(bloque, carpeta_salida):
+    """Todos los archivos sueltos del bloque existen con su tamaño"""
+    for _, nombre_archivo, tamano in bloque['archivos']:
+        if tamano is None:
+            continue
+        ruta = os.path.join(carpeta_salida, nombre_archivo)
+        try:
+            if os.path.getsize(ruta) != tamano:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def _entradas_zip_validas(bloque, archivo_zip, tamano_zip):
+    """Las cabeceras locales de las entradas del bloque siguen en el ZIP"""
+    if bloque['zip_fin'] is None or bloque['zip_fin'] > tamano_zip:
+        return False
+
+    for nombre, _, _, _, _, offset in bloque['entradas_zip']:
+        archivo_zip.seek(offset)
+        cabecera = archivo_zip.read(30)
+        if len(cabecera) < 30 or cabecera[:4] != b'PK\x03\x04':
+            return False
+        longitud_nombre = int.from_bytes(cabecera[26:28], 'little')
+        # EscritorZipStream guarda los nombres en ASCII o UTF-8
+        if archivo_zip.read(longitud_nombre) != nombre.encode('utf-8'):
+            return False
+    return True
@@ -0,0 +1,109 @@
+# utils/manifiesto.py - Manifiesto en disco de los archivos generados por una división
+import json
+import os
+
+NOMBRE_MANIFIESTO = "manifiesto.jsonl"
+
+
+def ruta_manifiesto(carpeta_salida):
+    """Ruta del manifiesto dentro de la carpeta de salida"""
+    return os.path.join(carpeta_salida, NOMBRE_MANIFIESTO)
+
+
+class ManifiestoDivision:
+    """
+    Manifiesto JSONL con los archivos sueltos que genera un trabajo.
+
+    Se añade una línea por bloque terminado, en el orden en que llegan:
+    {"inicio": 0, "fin": 84, "archivos": [[1, "pagina_001.pdf", 10321], ...]}
+    con las páginas en base 1 y la ruta relativa a la carpeta de salida (con la
+    subcarpeta delante si se usa formato_carpeta, p. ej. "0003/pagina_3001.pdf").
+    Así el proceso principal no tiene que guardar en memoria la lista de
+    archivos, sea cual sea el tamaño del documento.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.total_archivos = 0
+        self._archivo = None
+
+    @classmethod
+    def crear(cls, carpeta_salida, bloques_previos=None):
+        """
+        Crea el manifiesto del trabajo (sustituyendo al anterior si existía).
+
+        Args:
+            carpeta_salida (str): Carpeta de salida
+            bloques_previos (list, optional): Bloques del diario ya verificados al
+                                              reanudar, que se copian al manifiesto nuevo
+        """
+        manifiesto = cls(ruta_manifiesto(carpeta_salida))
+        manifiesto._archivo = open(manifiesto.ruta, 'w', encoding='utf-8')
+        for bloque in bloques_previos or []:
+            manifiesto.registrar_bloque(bloque['inicio'], bloque['fin'], bloque['archivos'])
+        return manifiesto
+
+    def registrar_bloque(self, inicio, fin, archivos):
+        """
+        Añade los archivos de un bloque.
+
+        Args:
+            inicio (int): Primera página del bloque (0-based)
+            fin (int): Página final (exclusiva)
+            archivos (list): [numero_pagina (0-based), ruta_relativa, tamano o None];
+                             las entradas sin tamaño no se guardaron en disco y se omiten
+        """
+        guardados = [[numero_pagina + 1, nombre, tamano]
+                     for numero_pagina, nombre, tamano in archivos if tamano is not None]
+        if not guardados:
+            return
+        self._archivo.write(json.dumps(
+            {'inicio': inicio, 'fin': fin, 'archivos': guardados}, ensure_ascii=False
+        ) + "\n")
+        self.total_archivos += len(guardados)
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+
+class ArchivosManifiesto:
+    """
+    Vista perezosa de las rutas de un manifiesto, en el orden del documento.
+
+    Se puede recorrer varias veces; cada recorrido lee el archivo de nuevo y
+    solo guarda en memoria el offset de cada bloque.
+    """
+
+    def __init__(self, ruta, carpeta, total):
+        self.ruta = ruta
+        self.carpeta = carpeta
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        if not self.ruta or not os.path.exists(self.ruta):
+            return
+
+        # Los bloques llegan desordenados: primero se localiza cada uno
+        posiciones = []
+        with open(self.ruta, 'rb') as archivo:
+            offset = 0
+            for linea in archivo:
+                try:
+                    posiciones.append((json.loads(linea)['inicio'], offset))
+                except (ValueError, KeyError):
+                    break
+                offset += len(linea)
+
+            for _, offset in sorted(posiciones):
+                archivo.seek(offset)
+                bloque = json.loads(archivo.readline())
+                for _, nombre, _ in bloque['archivos']:
+                    yield os.path.join(self.carpeta, nombre)
+
+    def __repr__(self):
+        return f"ArchivosManifiesto({self.ruta!r}, {self.total} archivos)"
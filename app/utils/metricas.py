@@ -0,0 +1,213 @@
+# utils/metricas.py - Tiempos por fase, memoria y rendimiento por worker de un trabajo de división
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    # Windows no tiene el módulo resource: la memoria máxima queda como None
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    # Sin psutil la memoria libre se lee de /proc/meminfo (solo Linux)
+    psutil = None
+
+# Límites (segundos por página) de los intervalos del histograma de cada worker
+LIMITES_HISTOGRAMA = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+_SIN_MEDIR = nullcontext()
+
+
+def memoria_maxima():
+    """Memoria residente máxima (bytes) de este proceso desde que arrancó, o None"""
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    factor = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor
+
+
+def memoria_disponible():
+    """Memoria que el sistema puede dar sin recurrir al swap (bytes), o None"""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open('/proc/meminfo', encoding='ascii') as archivo:
+            for linea in archivo:
+                if linea.startswith('MemAvailable:'):
+                    return int(linea.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class Cronometro:
+    """
+    Acumula tiempo real y de CPU por nombre de fase.
+
+    Desactivado, medir() devuelve un contexto vacío compartido, así el coste
+    de dejar las mediciones en el código es prácticamente nulo.
+    """
+
+    def __init__(self, activo=True):
+        self.activo = activo
+        self.tiempos = {}
+
+    def medir(self, nombre):
+        if not self.activo:
+            return _SIN_MEDIR
+        return self._medir(nombre)
+
+    @contextmanager
+    def _medir(self, nombre):
+        inicio = time.perf_counter()
+        inicio_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            acumulado = self.tiempos.setdefault(nombre, [0.0, 0.0])
+            acumulado[0] += time.perf_counter() - inicio
+            acumulado[1] += time.process_time() - inicio_cpu
+
+    def sumar(self, tiempos):
+        """Añade los tiempos de otro cronómetro ({nombre: [segundos, cpu]})"""
+        for nombre, (segundos, cpu) in tiempos.items():
+            acumulado = self.tiempos.setdefault(nombre, [0.0, 0.0])
+            acumulado[0] += segundos
+            acumulado[1] += cpu
+
+    def como_dict(self):
+        return {
+            nombre: {'segundos': segundos, 'cpu_segundos': cpu}
+            for nombre, (segundos, cpu) in self.tiempos.items()
+        }
+
+
+class MedicionBloque:
+    """
+    Mediciones de un bloque de páginas dentro de un worker.
+
+    Viaja de vuelta al proceso principal junto con los resultados del bloque.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        # Con el backend de hilos todos los bloques llevan el mismo pid
+        self.hilo = threading.current_thread().name
+        self.cronometro = Cronometro()
+        self.histograma = [0] * (len(LIMITES_HISTOGRAMA) + 1)
+        self.paginas = 0
+        self.segundos = 0.0
+        self.memoria_max = None
+
+    def registrar_pagina(self, segundos):
+        """Anota la duración de una página en el histograma"""
+        intervalo = 0
+        while intervalo < len(LIMITES_HISTOGRAMA) and segundos > LIMITES_HISTOGRAMA[intervalo]:
+            intervalo += 1
+        self.histograma[intervalo] += 1
+        self.paginas += 1
+        self.segundos += segundos
+
+    def terminar(self):
+        self.memoria_max = memoria_maxima()
+        return self
+
+    def __getstate__(self):
+        return (self.pid, self.hilo, self.cronometro.tiempos, self.histograma,
+                self.paginas, self.segundos, self.memoria_max)
+
+    def __setstate__(self, estado):
+        (self.pid, self.hilo, tiempos, self.histograma,
+         self.paginas, self.segundos, self.memoria_max) = estado
+        self.cronometro = Cronometro()
+        self.cronometro.tiempos = tiempos
+
+
+class MetricasDivision:
+    """
+    Recoge las métricas de un trabajo de división en el proceso principal.
+
+    Las fases del proceso principal se miden con fase(); las de los workers
+    (análisis del PDF, serialización, escritura en disco y compresión ZIP)
+    llegan con cada bloque en una MedicionBloque y se suman por worker.
+    """
+
+    def __init__(self, activo=True):
+        self.activo = activo
+        self.cronometro = Cronometro(activo)
+        self._workers = Cronometro(activo)
+        self._por_worker = {}
+        self._recursos = None
+        self._avisos = []
+        self._inicio = time.perf_counter()
+
+    def fase(self, nombre):
+        """Contexto que mide una fase del proceso principal"""
+        return self.cronometro.medir(nombre)
+
+    def agregar_bloque(self, medicion):
+        """Suma las mediciones de un bloque procesado por un worker"""
+        if not self.activo or medicion is None:
+            return
+
+        self._workers.sumar(medicion.cronometro.tiempos)
+        worker = self._por_worker.setdefault((medicion.pid, medicion.hilo), {
+            'paginas': 0,
+            'segundos': 0.0,
+            'memoria_max': None,
+            'histograma': [0] * (len(LIMITES_HISTOGRAMA) + 1),
+        })
+        worker['paginas'] += medicion.paginas
+        worker['segundos'] += medicion.segundos
+        if medicion.memoria_max is not None:
+            worker['memoria_max'] = max(worker['memoria_max'] or 0, medicion.memoria_max)
+        for intervalo, cantidad in enumerate(medicion.histograma):
+            worker['histograma'][intervalo] += cantidad
+
+    def registrar_recursos(self, **datos):
+        """Anota los límites de CPU y memoria del trabajo y cómo se decidieron los workers"""
+        if self.activo:
+            self._recursos = datos
+
+    def registrar_aviso(self, mensaje):
+        """Anota un problema que no detuvo el trabajo (caché o índice sin guardar...)"""
+        if self.activo:
+            self._avisos.append(mensaje)
+
+    def como_dict(self):
+        """
+        Resultado que se devuelve bajo la clave 'metricas'.
+
+        Returns:
+            dict | None: None si las métricas están desactivadas
+        """
+        if not self.activo:
+            return None
+
+        por_worker = []
+        for (pid, hilo), worker in sorted(self._por_worker.items()):
+            por_worker.append(dict(
+                worker,
+                pid=pid,
+                hilo=hilo,
+                paginas_por_segundo=worker['paginas'] / worker['segundos'] if worker['segundos'] else None,
+            ))
+
+        memorias_workers = [w['memoria_max'] for w in por_worker if w['memoria_max'] is not None]
+        return {
+            'segundos_total': time.perf_counter() - self._inicio,
+            'fases': self.cronometro.como_dict(),
+            'fases_workers': self._workers.como_dict(),
+            'memoria_max_padre': memoria_maxima(),
+            'memoria_max_workers': max(memorias_workers) if memorias_workers else None,
+            'por_worker': por_worker,
+            'limites_histograma': list(LIMITES_HISTOGRAMA),
+            'recursos': self._recursos,
+            'avisos': list(self._avisos),
+        }
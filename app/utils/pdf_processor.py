@@ -6,111 +6,6 @@
 # import PyPDF2
 #
 #
-# def dividir_pdf_paginas_seleccionadas(ruta_pdf, carpeta_salida=None, paginas_seleccionadas=None,
-#                                       formato_nombre="pagina_{:03d}", crear_zip=True, callback_progreso=None):
-#     """
-#     Divide un PDF extrayendo solo las páginas seleccionadas.
-#
-#     Args:
-#         ruta_pdf (str): Ruta del archivo PDF de entrada
-#         carpeta_salida (str, optional): Carpeta donde guardar los archivos
-#         paginas_seleccionadas (list): Lista de números de página a extraer (base 1)
-#         formato_nombre (str): Formato para nombrar las páginas
-#         crear_zip (bool): Si crear un ZIP además de los archivos individuales
-#         callback_progreso (callable): Función callback para reportar progreso
-#
-#     Returns:
-#         dict: Información sobre los archivos creados
-#     """
-#
-#     if not os.path.exists(ruta_pdf):
-#         raise FileNotFoundError(f"El archivo PDF no existe: {ruta_pdf}")
-#
-#     if not paginas_seleccionadas:
-#         raise ValueError("Debe especificar al menos una página para extraer")
-#
-#     # Configurar carpeta de salida
-#     if carpeta_salida is None:
-#         carpeta_salida = Path(ruta_pdf).stem + "_selected_pages"
-#
-#     # Crear carpeta si no existe
-#     Path(carpeta_salida).mkdir(exist_ok=True)
-#
-#     archivos_creados = []
-#
-#     try:
-#         with open(ruta_pdf, 'rb') as archivo_pdf:
-#             lector_pdf = PyPDF2.PdfReader(archivo_pdf)
-#             total_paginas_pdf = len(lector_pdf.pages)
-#             total_paginas_extraer = len(paginas_seleccionadas)
-#
-#             if callback_progreso:
-#                 callback_progreso(0, f"Iniciando extracción de {total_paginas_extraer} páginas seleccionadas...")
-#
-#             # Validar que las páginas seleccionadas existen
-#             paginas_invalidas = [p for p in paginas_seleccionadas if p < 1 or p > total_paginas_pdf]
-#             if paginas_invalidas:
-#                 raise ValueError(f"Páginas inválidas: {paginas_invalidas}. El PDF tiene {total_paginas_pdf} páginas.")
-#
-#             # Crear archivos individuales para páginas seleccionadas
-#             for i, numero_pagina in enumerate(paginas_seleccionadas):
-#                 escritor_pdf = PyPDF2.PdfWriter()
-#                 # PyPDF2 usa índice base 0
-#                 pagina_index = numero_pagina - 1
-#                 escritor_pdf.add_page(lector_pdf.pages[pagina_index])
-#
-#                 # Nombre del archivo usando numeración secuencial
-#                 nombre_archivo = formato_nombre.format(i + 1) + ".pdf"
-#                 ruta_archivo = os.path.join(carpeta_salida, nombre_archivo)
-#
-#                 # Guardar archivo individual
-#                 with open(ruta_archivo, 'wb') as archivo_pagina:
-#                     escritor_pdf.write(archivo_pagina)
-#
-#                 archivos_creados.append(ruta_archivo)
-#
-#                 # Reportar progreso
-#                 progreso = int(((i + 1) / total_paginas_extraer) * 80)  # 80% para archivos individuales
-#                 if callback_progreso:
-#                     callback_progreso(progreso, f"Extraída página {numero_pagina} ({i + 1} de {total_paginas_extraer})")
-#
-#                 # Pequeña pausa para permitir actualización de UI
-#                 time.sleep(0.01)
-#
-#             # Crear ZIP si se solicita
-#             ruta_zip = None
-#             if crear_zip:
-#                 if callback_progreso:
-#                     callback_progreso(85, "Creando archivo ZIP...")
-#
-#                 ruta_zip = f"{carpeta_salida}.zip"
-#                 with zipfile.ZipFile(ruta_zip, 'w', zipfile.ZIP_DEFLATED) as archivo_zip:
-#                     for i, archivo in enumerate(archivos_creados):
-#                         nombre_en_zip = os.path.basename(archivo)
-#                         archivo_zip.write(archivo, nombre_en_zip)
-#
-#                         # Progreso del ZIP (15% restante)
-#                         progreso_zip = 85 + int((i / len(archivos_creados)) * 15)
-#                         if callback_progreso:
-#                             callback_progreso(progreso_zip, f"Comprimiendo archivo {i + 1} de {len(archivos_creados)}")
-#
-#             if callback_progreso:
-#                 callback_progreso(100, f"¡Extracción completada! {total_paginas_extraer} páginas procesadas.")
-#
-#     except Exception as e:
-#         if callback_progreso:
-#             callback_progreso(-1, f"Error: {str(e)}")
-#         raise Exception(f"Error al procesar el PDF: {str(e)}")
-#
-#     return {
-#         'archivos_individuales': archivos_creados,
-#         'carpeta': carpeta_salida,
-#         'zip': ruta_zip,
-#         'total_paginas': total_paginas_extraer,
-#         'paginas_seleccionadas': paginas_seleccionadas
-#     }
-#
-#
 # # Función original dividir_pdf_avanzado ya existente (sin cambios)
 # def dividir_pdf_avanzado(ruta_pdf, carpeta_salida=None, formato_nombre="pagina_{:03d}", crear_zip=True,
 #                          callback_progreso=None):
@@ -204,220 +99,1892 @@
 #     }
 
 
+import io
 import os
+import re
+import statistics
+import threading
 import time
-import zipfile
+from array import array
 from pathlib import Path
-from multiprocessing import Pool, cpu_count
 import PyPDF2
 
+from app.utils.cache_salidas import cache_salidas
+from app.utils.duplicados import RegistroDuplicados, enlazar_archivo, huella_datos
+from app.utils.escritor_archivos import EscritorArchivos, escribir_archivo
+from app.utils.indice_paginas import indice_paginas
+from app.utils.journal import JournalDivision, bloques_verificados, huella_archivo
+from app.utils.manifiesto import ArchivosManifiesto, ManifiestoDivision
+from app.utils.metricas import Cronometro, MedicionBloque, MetricasDivision
+from app.utils.pdf_raw import DocumentoCrudo
+from app.utils.planificador import PlanificadorBloques, costes_paginas
+from app.utils.poda_recursos import datos_contenido, podar_pagina
+from app.utils.pool_manager import (
+    BACKEND_AUTO, BACKEND_HILOS, BACKEND_PROCESOS, BACKEND_SECUENCIAL,
+    esperar_turno, pool_manager, registrar_avance
+)
+from app.utils.progreso import (
+    FASE_CANCELADO, FASE_CERRANDO_ZIP, FASE_COMPLETADO, FASE_ERROR, FASE_PREPARANDO,
+    FASE_PROCESANDO, MonitorProgreso
+)
+from app.utils.recursos import (
+    GobernadorMemoria, cpus_efectivas, cuota_cpu, limite_memoria, workers_por_defecto
+)
+from app.utils.zip_stream import EscritorZipStream, comprimir_entrada, resolver_metodo_zip
+
+# Motores de extracción disponibles
+MOTOR_PYPDF2 = "pypdf2"
+MOTOR_CRUDO = "crudo"
+
+# Valores por defecto de la estimación cuando no hay archivo que medir
+_SEGUNDOS_POR_PAGINA = 0.05
+_SEGUNDOS_ZIP_POR_PAGINA = 0.02
+
+# Fracción del trabajo ideal que rinde cada proceso (reparto, escritura en disco, ZIP)
+_EFICIENCIA_PARALELA = 0.8
+
+# Apertura aproximada del PDF por MB cuando no se ha medido (lectura de la tabla xref)
+_SEGUNDOS_APERTURA_POR_MB = 0.01
+
+# Fracción del trabajo de una página que retiene el GIL (análisis y serialización
+# en Python); el resto (escritura, compresión zlib) avanza en paralelo entre hilos
+_FRACCION_GIL = 0.85
+
+# Por debajo de esto no compensa repartir: se procesa en el propio hilo
+_SEGUNDOS_TRABAJO_SECUENCIAL = 0.5
+
+# Por encima de esto el trabajo va siempre a procesos: el proceso de la
+# interfaz no carga con la memoria del análisis ni compite por el GIL
+_SEGUNDOS_TRABAJO_PROCESOS = 30.0
+
+# División por tamaño: se planifica por debajo del límite porque el tamaño de
+# cada página es una estimación
+_FRACCION_TAMANO_OBJETIVO = 0.9
+
+# Cabecera, tabla xref y trailer de cada archivo generado, y lo mínimo que
+# añade cada página (objeto, contenido, entrada xref)
+_BYTES_BASE_ARCHIVO = 2048
+_BYTES_MIN_PAGINA = 256
+
+# Páginas que se serializan para ajustar la estimación del tamaño
+_PAGINAS_MUESTRA_TAMANO = 8
+
 
 def dividir_pdf_optimizado(ruta_pdf, carpeta_salida=None, formato_nombre="pagina_{:03d}",
                            crear_zip=True, callback_progreso=None,
-                           batch_size=1000, max_workers=None, rango_paginas=None):
+                           batch_size=None, max_workers=None, rango_paginas=None,
+                           solo_zip=False, compresion_zip="ZIP_DEFLATED", motor=MOTOR_PYPDF2,
+                           reanudar=False, control=None, callback_eventos=None, estimacion=None,
+                           metricas=True, formato_carpeta=None, paginas_por_carpeta=1000,
+                           hilos_escritura=2, backend=BACKEND_AUTO, limite_workers=None,
+                           limite_rss=None, paginas_seleccionadas=None, paginas_por_archivo=1,
+                           rangos_archivos=None, tamano_max_archivo=None, podar_recursos=True,
+                           deduplicar=True, usar_cache=True, limite_cache_mb=None):
     """
     Versión optimizada para dividir PDFs grandes (incluso 400k+ páginas).
 
     Mejoras:
     - Procesamiento por lotes para gestionar memoria
     - Multiprocessing para paralelizar operaciones
+    - Pool de procesos persistente compartido entre lotes y trabajos
+    - Cada proceso analiza el PDF una sola vez y recibe bloques contiguos
+    - ZIP alimentado en streaming por los workers (sin releer los archivos)
+    - Compresión de las entradas del ZIP en paralelo dentro de los workers
+    - Motor opcional de copia directa de bytes (sin decodificar los objetos)
+    - Diario en la carpeta de salida para reanudar trabajos interrumpidos
+    - Cancelación y pausa durante el proceso (ControlTrabajo)
+    - Progreso muestreado a frecuencia fija con velocidad y tiempo restante
+    - Métricas de tiempo por fase, memoria y rendimiento de cada worker
     - Opción de rango de páginas específicas
-    - Gestión eficiente de memoria
+    - Memoria constante: plan de páginas perezoso y manifiesto de archivos en disco
+    - Subcarpetas opcionales por bloques de páginas para no llenar un único directorio
+    - Escritura en disco en hilos aparte, solapada con la generación de las páginas
+    - Ejecución secuencial, con hilos o con procesos según el tamaño del trabajo
+    - Bloques de tamaño adaptativo, los más caros primero (ver PlanificadorBloques)
+    - Workers según las CPUs y la memoria reales (cuotas de contenedor, afinidad) y
+      reparto frenado si la memoria del trabajo se acerca al límite
+    - Selección de páginas sueltas (en cualquier orden, con repeticiones): solo esas
+      páginas se reparten entre los workers
+    - Archivos de varias páginas (cada N páginas o por rangos); cada worker genera
+      archivos completos
+    - Archivos de varias páginas por debajo de un tamaño máximo, planificados de antemano
+    - Cada archivo lleva solo los recursos (fuentes, imágenes...) que usan sus páginas
+    - Páginas repetidas escritas una sola vez: el resto son enlaces duros y en el ZIP
+      se copia la entrada ya comprimida
+    - Caché local por contenido: repetir una división del mismo PDF con los mismos
+      ajustes clona o enlaza los archivos ya generados en lugar de extraerlos
 
     Args:
         ruta_pdf (str): Ruta del archivo PDF
         carpeta_salida (str): Carpeta destino
         formato_nombre (str): Formato para nombres
         crear_zip (bool): Crear archivo ZIP
-        callback_progreso (callable): Callback para progreso
-        batch_size (int): Páginas por lote (default: 1000)
-        max_workers (int): Procesos paralelos (default: CPU cores - 1)
+        callback_progreso (callable): Callback para progreso, recibe (porcentaje, mensaje)
+        batch_size (int, optional): Páginas que se planifican juntas (default: 2000); el
+                                    tamaño de cada bloque se ajusta solo al rendimiento
+        max_workers (int): Procesos paralelos (default: CPUs efectivas - 1, menos si
+                           la memoria no alcanza; ver workers_por_defecto)
         rango_paginas (tuple): (inicio, fin) o None para todas
+        solo_zip (bool): Generar solo el ZIP, sin escribir archivos sueltos
+        compresion_zip (str): Algoritmo del ZIP (ZIP_DEFLATED, ZIP_STORED, ZIP_BZIP2, ZIP_LZMA)
+        motor (str): MOTOR_PYPDF2 (por defecto) o MOTOR_CRUDO para copiar los bytes de los objetos
+        reanudar (bool): Continuar el trabajo interrumpido de carpeta_salida (ver reanudar_division)
+        control (ControlTrabajo, optional): Token para cancelar o pausar el trabajo
+        callback_eventos (callable, optional): Recibe un EventoProgreso (páginas, bytes,
+                                               velocidad y tiempo restante) unas 5 veces por segundo
+        estimacion (dict, optional): Resultado de estimar_tiempo_procesamiento; el tiempo
+                                     restante parte de él y se corrige con la velocidad real
+        metricas (bool): Medir tiempos por fase y memoria (ver MetricasDivision); desactivado
+                         el coste es prácticamente nulo y 'metricas' es None
+        formato_carpeta (str, optional): Formato de las subcarpetas (p. ej. "{:04d}"); si se
+                                         indica, la página N va a la subcarpeta
+                                         (N - 1) // paginas_por_carpeta. Los nombres del ZIP
+                                         siguen siendo solo formato_nombre
+        paginas_por_carpeta (int): Páginas por subcarpeta (default: 1000)
+        hilos_escritura (int): Hilos de escritura en disco por worker (default: 2); con 0
+                               cada worker escribe sus archivos de forma síncrona
+        backend (str): BACKEND_AUTO (por defecto, ver elegir_backend), BACKEND_PROCESOS,
+                       BACKEND_HILOS o BACKEND_SECUENCIAL
+        limite_workers (int, optional): Tope de workers (ajuste "Procesos máximos"),
+                                        también si se indica max_workers
+        limite_rss (int, optional): Bytes de memoria residente del trabajo (proceso
+                                    principal y workers) a partir de los cuales se
+                                    frena el reparto (default: 80% del límite de
+                                    memoria del sistema o del contenedor)
+        paginas_seleccionadas (list | str, optional): Páginas a extraer (1-based) en el
+                                                      orden de salida; admite el texto de
+                                                      parsear_paginas ("1-5, 9"). Los
+                                                      archivos se numeran según su posición
+                                                      en la selección (1, 2, 3...). No se
+                                                      puede combinar con rango_paginas
+        paginas_por_archivo (int): Páginas de cada archivo de salida (default: 1). Con
+                                   más de una, los archivos se numeran 1, 2, 3... y el
+                                   último puede quedar más corto; se combina con
+                                   rango_paginas o paginas_seleccionadas
+        rangos_archivos (list | str, optional): Un archivo por cada rango (inicio, fin),
+                                                1-based e inclusivo, o el texto de
+                                                parsear_rangos ("1-10, 11-50"). No se
+                                                combina con las demás formas de elegir páginas
+        tamano_max_archivo (int, optional): Bytes máximos de cada archivo (ajuste
+                                            pdf.max_file_size_mb). Agrupa páginas
+                                            consecutivas según su tamaño estimado; un
+                                            archivo que aun así lo supera se parte en
+                                            pagina_N_1.pdf, pagina_N_2.pdf... Una página
+                                            sola mayor que el límite queda en su archivo.
+                                            Se combina con rango_paginas o
+                                            paginas_seleccionadas
+        podar_recursos (bool): Quitar de cada página los recursos que su contenido no
+                               usa (default: True). Los PDFs que comparten un único
+                               /Resources entre todas las páginas generan así archivos
+                               mucho más pequeños (ver poda_recursos)
+        deduplicar (bool): Detectar archivos idénticos por la huella de sus bytes
+                           (default: True). Cada contenido se escribe y comprime una
+                           vez; sus repeticiones son enlaces duros al primero (una
+                           copia si el disco no los admite) y en el ZIP reutilizan
+                           los datos ya comprimidos. Los grupos van en 'duplicados'
+        usar_cache (bool): Tomar de la caché de salidas los archivos ya generados en
+                           divisiones anteriores del mismo contenido, páginas, motor y
+                           poda, y guardar en ella los nuevos (default: True). Ver
+                           CacheSalidas
+        limite_cache_mb (float, optional): Tamaño máximo de la caché de salidas (ajuste
+                                           pdf.output_cache_mb; default: LIMITE_CACHE_MB).
+                                           Al terminar se borran los archivos usados hace
+                                           más tiempo hasta quedar por debajo
 
     Returns:
-        dict: Información de archivos creados
+        dict: Información de archivos creados. 'archivos_individuales' es un
+              ArchivosManifiesto que recorre bajo demanda el manifiesto de la carpeta
+              ('manifiesto', None en modo solo ZIP) en el orden del documento.
+              'backend' indica cómo se ejecutó y 'motor' con qué motor (PyPDF2 si el crudo
+              no superó la comprobación o no pudo con ninguna página); 'paginas_respaldo'
+              cuenta las páginas que el motor crudo no pudo copiar y se extrajeron con
+              PyPDF2. 'total_paginas' y 'paginas_procesadas' cuentan páginas del PDF,
+              también con archivos de varias páginas. 'duplicados' lista los
+              grupos de archivos idénticos generados en esta ejecución ([original, copia, ...]).
+              'archivos_desde_cache' cuenta los archivos tomados de la caché de salidas.
+              'avisos' lista los problemas que no detuvieron el trabajo (p. ej. un índice o
+              una caché que no se pudo guardar); también se publican en el progreso.
+              'paginas_con_error' lista las páginas (1-based) cuyos archivos no se pudieron
+              generar o escribir (p. ej. disco lleno): el trabajo termina en FASE_ERROR, no
+              las cuenta en 'paginas_procesadas' y conserva el diario sin sus bloques, así
+              reanudar el trabajo las vuelve a generar. Si se cancela, 'cancelado' es True y solo incluye lo generado hasta
+              entonces (el trabajo se puede reanudar)
     """
 
     if not os.path.exists(ruta_pdf):
         raise FileNotFoundError(f"El archivo PDF no existe: {ruta_pdf}")
 
+    if solo_zip and not crear_zip:
+        raise ValueError("El modo solo ZIP requiere crear_zip=True")
+
+    if backend not in (BACKEND_AUTO, BACKEND_PROCESOS, BACKEND_HILOS, BACKEND_SECUENCIAL):
+        raise ValueError(f"Backend no soportado: {backend}")
+
+    # Páginas de origen de cada archivo de salida (None = rango contiguo)
+    seleccion = None
+    if paginas_seleccionadas is not None:
+        if rango_paginas:
+            raise ValueError("No se puede indicar a la vez un rango y una selección de páginas")
+        if isinstance(paginas_seleccionadas, str):
+            seleccion = parsear_paginas(paginas_seleccionadas)
+        else:
+            seleccion = array('q', paginas_seleccionadas)
+        if not seleccion:
+            raise ValueError("Debe especificar al menos una página para extraer")
+
+    if paginas_por_archivo < 1:
+        raise ValueError("paginas_por_archivo debe ser al menos 1")
+
+    if tamano_max_archivo is not None:
+        if tamano_max_archivo <= 0:
+            raise ValueError("tamano_max_archivo debe ser mayor que 0")
+        if paginas_por_archivo > 1 or rangos_archivos is not None:
+            raise ValueError("El tamaño máximo no se puede combinar con paginas_por_archivo "
+                             "ni rangos_archivos")
+
+    # Archivos de tamaño libre: un archivo por rango
+    rangos = None
+    if rangos_archivos is not None:
+        if rango_paginas or seleccion is not None or paginas_por_archivo > 1:
+            raise ValueError("Los rangos por archivo no se pueden combinar con rango_paginas, "
+                             "paginas_seleccionadas ni paginas_por_archivo")
+        if isinstance(rangos_archivos, str):
+            rangos = parsear_rangos(rangos_archivos)
+        else:
+            rangos = [(int(inicio), int(fin)) for inicio, fin in rangos_archivos]
+        if not rangos:
+            raise ValueError("Debe especificar al menos un rango de páginas")
+
+    if formato_carpeta:
+        if paginas_por_carpeta < 1:
+            raise ValueError("paginas_por_carpeta debe ser al menos 1")
+        try:
+            formato_carpeta.format(0)
+        except (IndexError, KeyError, ValueError) as e:
+            raise ValueError(f"Formato de subcarpeta inválido: {formato_carpeta}") from e
+
     # Configurar carpeta de salida
     if carpeta_salida is None:
         carpeta_salida = Path(ruta_pdf).stem + "_pages"
 
-    Path(carpeta_salida).mkdir(exist_ok=True)
+    # La carpeta se crea también en modo solo ZIP porque guarda el diario del trabajo
+    Path(carpeta_salida).mkdir(parents=True, exist_ok=True)
 
     # Determinar número de workers
     if max_workers is None:
-        max_workers = max(1, cpu_count() - 1)
+        max_workers, motivo_workers = workers_por_defecto(
+            limite_workers, os.path.getsize(ruta_pdf), limite_rss
+        )
+    elif limite_workers and max_workers > limite_workers:
+        max_workers, motivo_workers = limite_workers, "maximo"
+    else:
+        motivo_workers = "indicado"
+
+    motor_solicitado = motor
+    medidor = MetricasDivision(metricas)
+
+    # Problemas que no detienen el trabajo: se muestran en el progreso y van al resultado
+    avisos = []
+
+    def anotar_aviso(mensaje):
+        avisos.append(mensaje)
+        medidor.registrar_aviso(mensaje)
 
-    archivos_creados = []
+    def avisar(mensaje, fase=FASE_PREPARANDO, porcentaje=0):
+        anotar_aviso(mensaje)
+        monitor.fase(fase, porcentaje, mensaje)
+
+    # Un callback de progreso que falla solo se anota: publicarlo volvería a llamarlo
+    monitor = MonitorProgreso(callback_progreso, callback_eventos, al_fallar=anotar_aviso)
 
     try:
-        # Obtener información básica del PDF
-        with open(ruta_pdf, 'rb') as archivo_pdf:
-            lector_pdf = PyPDF2.PdfReader(archivo_pdf)
-            total_paginas = len(lector_pdf.pages)
+        # Apertura: análisis del PDF, diario y plan de tareas
+        with medidor.fase('apertura'):
+            # Obtener información básica del PDF (del índice si ya se analizó antes)
+            avisos_indice = []
+            total_paginas = indice_paginas.total_paginas(ruta_pdf, avisos_indice)
+            for aviso in avisos_indice:
+                avisar(f"{aviso} (se volverá a analizar el PDF en la próxima sesión)")
 
-        # Validar rango de páginas
-        if rango_paginas:
-            inicio, fin = rango_paginas
-            inicio = max(0, inicio - 1)  # Convertir a índice 0-based
-            fin = min(total_paginas, fin)
-            paginas_a_procesar = list(range(inicio, fin))
-        else:
-            paginas_a_procesar = list(range(total_paginas))
-
-        total_a_procesar = len(paginas_a_procesar)
-
-        if callback_progreso:
-            callback_progreso(0, f"Preparando división de {total_a_procesar} páginas...")
-
-        # Dividir en lotes para procesamiento
-        lotes = [paginas_a_procesar[i:i + batch_size]
-                 for i in range(0, total_a_procesar, batch_size)]
-
-        total_lotes = len(lotes)
-
-        # Procesar cada lote
-        for idx_lote, lote in enumerate(lotes):
-            # Preparar argumentos para procesamiento paralelo
-            args_lote = [
-                (ruta_pdf, num_pagina, carpeta_salida, formato_nombre)
-                for num_pagina in lote
-            ]
-
-            # Procesar lote en paralelo
-            with Pool(processes=max_workers) as pool:
-                resultados_lote = pool.map(procesar_pagina_individual, args_lote)
-
-            # Agregar archivos creados
-            archivos_creados.extend([r for r in resultados_lote if r])
-
-            # Calcular progreso (80% para extracción de páginas)
-            progreso = int(((idx_lote + 1) / total_lotes) * 80)
-            if callback_progreso:
-                paginas_completadas = (idx_lote + 1) * batch_size
-                paginas_completadas = min(paginas_completadas, total_a_procesar)
-                callback_progreso(
-                    progreso,
-                    f"Procesadas {paginas_completadas:,} de {total_a_procesar:,} páginas"
+            # Validar rango de páginas
+            if rangos is not None:
+                invalidos = [(inicio, fin) for inicio, fin in rangos
+                             if not (1 <= inicio <= total_paginas and 1 <= fin <= total_paginas)]
+                if invalidos:
+                    raise ValueError(f"Rangos inválidos: {invalidos[:10]}. "
+                                     f"El PDF tiene {total_paginas} páginas.")
+                origen, cortes = array('q'), array('q')
+                for inicio, fin in rangos:
+                    paso = 1 if fin >= inicio else -1
+                    origen.extend(range(inicio - 1, fin - 1 + paso, paso))
+                    cortes.append(len(origen))
+                unidades = _UnidadesSalida(origen, cortes=cortes)
+            elif seleccion is not None:
+                invalidas = [pagina for pagina in seleccion if pagina < 1 or pagina > total_paginas]
+                if invalidas:
+                    raise ValueError(f"Páginas inválidas: {invalidas[:10]}. "
+                                     f"El PDF tiene {total_paginas} páginas.")
+                seleccion = array('q', (pagina - 1 for pagina in seleccion))
+                unidades = _UnidadesSalida(seleccion, paginas_por_archivo)
+            elif rango_paginas:
+                inicio, fin = rango_paginas
+                inicio = max(0, inicio - 1)  # Convertir a índice 0-based
+                fin = min(total_paginas, fin)
+                unidades = _UnidadesSalida(range(inicio, fin), paginas_por_archivo)
+            else:
+                unidades = _UnidadesSalida(range(total_paginas), paginas_por_archivo)
+
+            # El trabajo recorre los archivos de salida; el progreso cuenta páginas
+            total_a_procesar = unidades.total_paginas
+
+            if backend == BACKEND_AUTO:
+                backend = elegir_backend(total_a_procesar, os.path.getsize(ruta_pdf),
+                                         max_workers, estimacion)
+            # En secuencial no tiene sentido partir cada lote en varios bloques
+            workers_bloques = 1 if backend == BACKEND_SECUENCIAL else max_workers
+
+            # Frena el reparto si la memoria del trabajo se acerca al límite
+            gobernador = GobernadorMemoria(
+                limite_rss, pool_manager.pids_workers if backend == BACKEND_PROCESOS else None
+            )
+
+            monitor.fase(FASE_PREPARANDO, 0, f"Preparando división de {total_a_procesar} páginas...")
+
+            # Antes de usar el motor crudo, comprobar con unas páginas de muestra que su
+            # salida es equivalente a la de PyPDF2; si no, usar PyPDF2 para todo
+            if motor == MOTOR_CRUDO and total_a_procesar:
+                origen = unidades.origen
+                muestra = sorted({origen[0], origen[total_a_procesar // 2], origen[-1]})
+                try:
+                    diferencias = verificar_motor_crudo(ruta_pdf, muestra, podar_recursos)
+                    motivo = f"no compatible con este PDF ({diferencias[0]})" if diferencias else None
+                except Exception as e:
+                    # Un fallo de la comprobación no es una diferencia: se indica como tal
+                    motivo = f"no comprobado ({type(e).__name__}: {e})"
+
+                if motivo:
+                    motor = MOTOR_PYPDF2
+                    monitor.fase(FASE_PREPARANDO, 0, f"Motor de copia directa {motivo}, usando PyPDF2")
+
+            # Resumen del contenido del PDF: identifica sus archivos en la caché de salidas
+            digest_cache = None
+            if usar_cache and total_a_procesar:
+                monitor.fase(FASE_PREPARANDO, 0, "Buscando archivos de divisiones anteriores...")
+                avisos_indice = []
+                try:
+                    digest_cache = indice_paginas.digest_contenido(ruta_pdf, avisos_indice)
+                except OSError as e:
+                    avisar(f"Caché de salidas no disponible: {e}")
+                for aviso in avisos_indice:
+                    aviso = f"{aviso} (se volverá a analizar el PDF en la próxima sesión)"
+                    if aviso not in avisos:
+                        avisar(aviso)
+
+            # Opciones comunes para todos los workers
+            opciones = {
+                'carpeta_salida': carpeta_salida,
+                'formato_nombre': formato_nombre,
+                'guardar_archivos': not solo_zip,
+                'devolver_datos': crear_zip,
+                'compresion_zip': resolver_metodo_zip(compresion_zip),
+                'motor': motor,
+                'metricas': medidor.activo,
+                'formato_carpeta': formato_carpeta,
+                'paginas_por_carpeta': paginas_por_carpeta,
+                'hilos_escritura': hilos_escritura,
+                'tamano_max_archivo': tamano_max_archivo,
+                'podar_recursos': podar_recursos,
+                'deduplicar': deduplicar,
+                'huellas_repetidas': {},
+                'digest_cache': digest_cache,
+                'guardar_en_cache': True,
+            }
+
+            ruta_zip = f"{carpeta_salida}.zip" if crear_zip else None
+
+            # Diario del trabajo: permite reanudarlo si se interrumpe
+            huella = huella_archivo(ruta_pdf)
+            parametros = {
+                'formato_nombre': formato_nombre,
+                'crear_zip': crear_zip,
+                'solo_zip': solo_zip,
+                'compresion_zip': compresion_zip,
+                'motor': motor_solicitado,
+                'rango_paginas': list(rango_paginas) if rango_paginas else None,
+            }
+            # Solo se anota si se usa, así los diarios sin subcarpetas siguen siendo válidos
+            if formato_carpeta:
+                parametros['formato_carpeta'] = formato_carpeta
+                parametros['paginas_por_carpeta'] = paginas_por_carpeta
+            if seleccion is not None:
+                parametros['paginas_seleccionadas'] = formatear_paginas(
+                    pagina + 1 for pagina in seleccion
+                )
+            if paginas_por_archivo > 1:
+                parametros['paginas_por_archivo'] = paginas_por_archivo
+            if rangos is not None:
+                parametros['rangos_archivos'] = ",".join(
+                    f"{inicio}-{fin}" if inicio != fin else str(inicio) for inicio, fin in rangos
                 )
+            if tamano_max_archivo:
+                parametros['tamano_max_archivo'] = tamano_max_archivo
+            if not podar_recursos:
+                parametros['podar_recursos'] = False
 
-            # Pequeña pausa para actualización de UI
-            time.sleep(0.01)
-
-        # Crear ZIP si se solicita (y el total no es excesivo)
-        ruta_zip = None
-        if crear_zip:
-            # Advertencia para archivos muy grandes
-            if total_a_procesar > 50000:
-                if callback_progreso:
-                    callback_progreso(
-                        85,
-                        f"⚠️ Comprimiendo {total_a_procesar:,} archivos. Esto puede tomar mucho tiempo..."
-                    )
+            bloques_previos = []
+            if reanudar:
+                journal = JournalDivision.cargar(carpeta_salida)
+                if journal is None:
+                    raise ValueError(f"No hay ningún trabajo que reanudar en {carpeta_salida}")
+                if journal.huella != huella:
+                    raise ValueError("El PDF cambió desde que empezó el trabajo, no se puede reanudar")
+                if journal.parametros != parametros:
+                    raise ValueError("Los parámetros no coinciden con los del trabajo interrumpido")
+
+                monitor.fase(FASE_PREPARANDO, 0, "Verificando los archivos ya generados...")
+                bloques_previos = bloques_verificados(journal, carpeta_salida, ruta_zip)
+                journal.abrir_para_continuar(bloques_previos)
+                fecha_zip = journal.cabecera['fecha_zip']
             else:
-                if callback_progreso:
-                    callback_progreso(85, "Creando archivo ZIP...")
+                fecha_zip = time.localtime()[:6]
+                cortes = None
+                if tamano_max_archivo and total_a_procesar:
+                    monitor.fase(FASE_PREPARANDO, 0,
+                                 f"Planificando archivos de hasta {tamano_max_archivo / (1024 * 1024):,.1f} MB...")
+                    cortes = _planificar_por_tamano(ruta_pdf, unidades.origen, tamano_max_archivo, motor,
+                                                   podar_recursos)
+                journal = JournalDivision.crear(carpeta_salida, ruta_pdf, huella, parametros, fecha_zip,
+                                                cortes=cortes)
+
+            # Con tamaño máximo, el reparto en archivos es el que se planificó al empezar
+            if tamano_max_archivo and total_a_procesar:
+                unidades = _UnidadesSalida(unidades.origen, cortes=array('q', journal.cabecera['cortes']))
 
-            ruta_zip = f"{carpeta_salida}.zip"
+            # Páginas que faltan por procesar (todas, salvo al reanudar)
+            intervalos_pendientes = _intervalos_pendientes(
+                unidades.inicio, unidades.fin,
+                [(bloque['inicio'], bloque['fin']) for bloque in bloques_previos]
+            )
 
-            # Crear ZIP con compresión por lotes para mejor rendimiento
-            with zipfile.ZipFile(ruta_zip, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as archivo_zip:
-                total_archivos = len(archivos_creados)
+            # Crear de una vez las subcarpetas para que los workers no lo comprueben por página
+            if formato_carpeta and not solo_zip and len(unidades):
+                for subcarpeta in range(unidades.inicio // paginas_por_carpeta,
+                                        (unidades.fin - 1) // paginas_por_carpeta + 1):
+                    os.makedirs(os.path.join(carpeta_salida, formato_carpeta.format(subcarpeta)),
+                                exist_ok=True)
+
+            # Bloques contiguos de tamaño adaptativo, los más caros primero. Es un
+            # generador: el pool lo consume según quedan workers libres y el plan
+            # no ocupa memoria
+            planificador = PlanificadorBloques(
+                intervalos_pendientes, workers_bloques,
+                costes=unidades.costes(
+                    costes_paginas(indice_paginas.obtener(ruta_pdf), os.path.getsize(ruta_pdf))
+                ),
+                paginas_por_ventana=batch_size
+            )
+            tareas = ((ruta_pdf, inicio, fin, opciones, unidades.paginas_bloque(inicio, fin))
+                      for inicio, fin in planificador)
+
+            # El ZIP se abre antes de empezar: cada página se añade en cuanto llega,
+            # así la compresión se solapa con la extracción en lugar de ir al final
+            archivo_zip = None
+            if crear_zip and bloques_previos:
+                archivo_zip = EscritorZipStream(
+                    ruta_zip, fecha=fecha_zip,
+                    reanudar_en=bloques_previos[-1]['zip_fin'],
+                    entradas=(entrada for bloque in bloques_previos for entrada in bloque['entradas_zip'])
+                )
+            elif crear_zip:
+                archivo_zip = EscritorZipStream(ruta_zip, fecha=fecha_zip)
 
-                for i, archivo in enumerate(archivos_creados):
-                    nombre_en_zip = os.path.basename(archivo)
-                    archivo_zip.write(archivo, nombre_en_zip)
+            # Los archivos sueltos se anotan en el manifiesto en lugar de en una lista
+            manifiesto = ManifiestoDivision.crear(carpeta_salida, bloques_previos) if not solo_zip else None
 
-                    # Actualizar progreso cada 100 archivos para no saturar
-                    if i % 100 == 0 or i == total_archivos - 1:
-                        progreso_zip = 85 + int((i / total_archivos) * 15)
-                        if callback_progreso:
-                            callback_progreso(
-                                progreso_zip,
-                                f"Comprimiendo: {i + 1:,} / {total_archivos:,} archivos"
-                            )
+        paginas_completadas = sum(unidades.num_paginas(bloque['inicio'], bloque['fin'])
+                                  for bloque in bloques_previos)
+        reanudando = bool(bloques_previos)
+        # Los bloques previos ya están en el diario, el ZIP y el manifiesto
+        del bloques_previos
+
+        if reanudando:
+            monitor.fase(
+                FASE_PREPARANDO, int((paginas_completadas / total_a_procesar) * 95),
+                f"Reanudando: {paginas_completadas:,} de {total_a_procesar:,} páginas ya estaban listas"
+            )
+
+        cancelado = False
+        registro = RegistroDuplicados(carpeta_salida) if deduplicar else None
+        uso_cache = None
+        if digest_cache is not None:
+            uso_cache = {
+                'limite': int(limite_cache_mb * 1024 * 1024) if limite_cache_mb else cache_salidas.limite_bytes,
+                'bytes_nuevos': 0,
+                'reutilizados': 0,
+                'errores': 0,
+            }
+        # Páginas y bytes recibidos en el proceso principal (si el trabajo no tiene slot)
+        avance = [0, 0]
+        paginas_con_error = []
+        respaldo = [0, None]
+        try:
+            with pool_manager.registrar_trabajo(control) as slot:
+                # Los workers consultan el slot entre páginas para pausar o cancelar
+                # y suman en él su avance, que el monitor lee a frecuencia fija
+                opciones['slot'] = slot
+                segundos_estimados = None
+                if estimacion and total_a_procesar:
+                    pendientes = total_a_procesar - paginas_completadas
+                    segundos_estimados = estimacion['segundos'] * pendientes / total_a_procesar
+                monitor.iniciar(
+                    total_a_procesar,
+                    (lambda: pool_manager.leer_avance(slot)) if slot is not None else (lambda: tuple(avance)),
+                    base=paginas_completadas,
+                    segundos_estimados=segundos_estimados
+                )
+                try:
+                    with medidor.fase('procesamiento'):
+                        cancelado = _procesar_tareas(
+                            tareas, max_workers, archivo_zip, journal, manifiesto, avance,
+                            control, medidor, backend, planificador, gobernador.frenar,
+                            unidades, registro, opciones, uso_cache,
+                            lambda mensaje: avisar(mensaje, FASE_PROCESANDO, monitor.porcentaje()),
+                            paginas_con_error, respaldo
+                        )
+                finally:
+                    monitor.detener()
+                # Los bloques llegan según terminan
+                paginas_con_error.sort()
+                # Si ninguna página se pudo copiar con el motor crudo, el trabajo se hizo con PyPDF2
+                if respaldo[0] and respaldo[0] >= avance[0]:
+                    motor = MOTOR_PYPDF2
+        finally:
+            if archivo_zip is not None:
+                if not cancelado:
+                    monitor.fase(FASE_CERRANDO_ZIP, 95, "Cerrando archivo ZIP...")
+                with medidor.fase('cierre_zip'):
+                    archivo_zip.cerrar()
+            journal.cerrar()
+            if manifiesto is not None:
+                manifiesto.cerrar()
+            if uso_cache is not None:
+                with medidor.fase('cache'):
+                    cache_salidas.aplicar_limite(uso_cache['limite'])
+
+        # Decisiones sobre los recursos del trabajo, para las métricas
+        medidor.registrar_recursos(
+            cpus_sistema=os.cpu_count(),
+            cpus_efectivas=cpus_efectivas(),
+            cuota_cpu=cuota_cpu(),
+            limite_memoria=limite_memoria(),
+            workers=max_workers,
+            motivo_workers=motivo_workers,
+            backend=backend,
+            **gobernador.como_dict()
+        )
+
+        if manifiesto is not None:
+            archivos_creados = ArchivosManifiesto(manifiesto.ruta, carpeta_salida, manifiesto.total_archivos)
+        else:
+            archivos_creados = ArchivosManifiesto(None, carpeta_salida, 0)
 
-        if callback_progreso:
-            callback_progreso(100, f"¡División completada! {total_a_procesar:,} páginas procesadas")
+        if cancelado:
+            # Se conserva el diario para poder reanudar el trabajo más adelante
+            paginas_hechas = paginas_completadas + avance[0] - len(paginas_con_error)
+            monitor.fase(
+                FASE_CANCELADO,
+                int((paginas_hechas / total_a_procesar) * 95) if total_a_procesar else 0,
+                f"División cancelada: {paginas_hechas:,} de {total_a_procesar:,} páginas procesadas"
+            )
+            return {
+                'archivos_individuales': archivos_creados,
+                'manifiesto': archivos_creados.ruta,
+                'carpeta': carpeta_salida,
+                'zip': ruta_zip,
+                'total_paginas': total_a_procesar,
+                'paginas_procesadas': paginas_hechas,
+                'paginas_con_error': paginas_con_error,
+                'paginas_respaldo': respaldo[0],
+                'duplicados': registro.grupos() if registro is not None else [],
+                'archivos_desde_cache': uso_cache['reutilizados'] if uso_cache is not None else 0,
+                'avisos': avisos,
+                'cancelado': True,
+                'backend': backend,
+                'motor': motor,
+                'metricas': medidor.como_dict()
+            }
+
+        if paginas_con_error:
+            # Trabajo fallido: se conserva el diario como al cancelar
+            monitor.fase(
+                FASE_ERROR, 100,
+                f"División terminada con errores: {len(paginas_con_error):,} de "
+                f"{total_a_procesar:,} páginas no se pudieron generar"
+            )
+        else:
+            # Trabajo terminado: el diario ya no hace falta
+            journal.eliminar()
+            if solo_zip and not os.listdir(carpeta_salida):
+                os.rmdir(carpeta_salida)
+
+            monitor.fase(FASE_COMPLETADO, 100, f"¡División completada! {total_a_procesar:,} páginas procesadas")
 
     except Exception as e:
-        if callback_progreso:
-            callback_progreso(-1, f"Error: {str(e)}")
+        monitor.fase(FASE_ERROR, -1, f"Error: {str(e)}")
         raise Exception(f"Error al procesar el PDF: {str(e)}")
 
     return {
         'archivos_individuales': archivos_creados,
+        'manifiesto': archivos_creados.ruta,
         'carpeta': carpeta_salida,
         'zip': ruta_zip,
-        'total_paginas': total_a_procesar
+        'total_paginas': total_a_procesar,
+        'paginas_procesadas': total_a_procesar - len(paginas_con_error),
+        'paginas_con_error': paginas_con_error,
+        'paginas_respaldo': respaldo[0],
+        'duplicados': registro.grupos() if registro is not None else [],
+        'archivos_desde_cache': uso_cache['reutilizados'] if uso_cache is not None else 0,
+        'avisos': avisos,
+        'cancelado': False,
+        'backend': backend,
+        'motor': motor,
+        'metricas': medidor.como_dict()
+    }
+
+
+def _procesar_tareas(tareas, max_workers, archivo_zip, journal, manifiesto, avance, control,
+                     medidor, backend=BACKEND_PROCESOS, planificador=None, freno=None,
+                     unidades=None, registro=None, opciones=None, uso_cache=None, avisar=None,
+                     paginas_con_error=None, respaldo=None):
+    """
+    Reparte los bloques entre los workers y recoge sus resultados en el ZIP y el diario.
+
+    Args:
+        manifiesto (ManifiestoDivision | None): Recibe los archivos sueltos de cada bloque
+        avance (list): [páginas, bytes] recibidos, se actualiza por cada bloque
+        medidor (MetricasDivision): Recibe las mediciones de cada bloque
+        backend (str): Cómo ejecutar los bloques (ver PoolManager.ejecutar)
+        planificador (PlanificadorBloques, optional): Genera las tareas; se le
+                                                      informa de cada bloque terminado
+        freno (callable, optional): Frena el reparto (ver GobernadorMemoria)
+        unidades (_UnidadesSalida, optional): Páginas de cada archivo, para contar el
+                                              avance en páginas (default: una por archivo)
+        registro (RegistroDuplicados, optional): Huellas de los archivos ya recibidos; sus
+                                                 repetidos se publican en
+                                                 opciones['huellas_repetidas'] para las
+                                                 tareas siguientes
+        uso_cache (dict, optional): {'limite', 'bytes_nuevos', 'reutilizados', 'errores'} de
+                                    la caché de salidas; al pasar del límite o si un worker
+                                    no pudo guardar en ella, las tareas siguientes dejan de
+                                    guardar (opciones['guardar_en_cache'])
+        avisar (callable, optional): avisar(mensaje) para los problemas que no detienen
+                                     el trabajo
+        paginas_con_error (list, optional): Recibe las páginas (1-based) de los archivos
+                                            que los workers no pudieron generar o escribir
+        respaldo (list, optional): [páginas, primer motivo] que el motor crudo no pudo
+                                   copiar y se extrajeron con PyPDF2
+
+    Returns:
+        bool: True si el trabajo se canceló antes de terminar
+    """
+    cancelado = False
+
+    # Los resultados llegan según terminan: un bloque lento no frena a los demás
+    for inicio, fin, resultados_bloque, medicion, incidencias in pool_manager.ejecutar(
+            procesar_bloque_paginas, tareas, max_workers, backend, freno):
+        medidor.agregar_bloque(medicion)
+
+        # Archivos que no se pudieron generar o escribir: se avisa del primero y se anotan todos
+        if incidencias['paginas']:
+            paginas_bloque = sorted(
+                pagina + 1
+                for numero_pagina, _ in incidencias['paginas']
+                for pagina in (unidades.paginas_archivo(numero_pagina) if unidades is not None
+                               else [numero_pagina])
+            )
+            if not paginas_con_error and avisar is not None:
+                avisar(f"No se pudieron generar las páginas {formatear_paginas(paginas_bloque)} "
+                       f"({incidencias['paginas'][0][1]})")
+            if paginas_con_error is not None:
+                paginas_con_error.extend(paginas_bloque)
+
+        # Páginas que el motor crudo no pudo copiar: se avisa la primera vez
+        if incidencias['respaldo'][0] and respaldo is not None:
+            if not respaldo[0] and avisar is not None:
+                avisar(f"Motor de copia directa no disponible para algunas páginas "
+                       f"({incidencias['respaldo'][1]}), usando PyPDF2")
+            respaldo[0] += incidencias['respaldo'][0]
+            respaldo[1] = respaldo[1] or incidencias['respaldo'][1]
+
+        archivos_bloque = []
+        entradas_bloque = []
+        originales_bloque = {}
+        for (numero_pagina, nombre_archivo, ruta_relativa, tamano, entrada_zip,
+             huella, duplicado, desde_cache) in resultados_bloque:
+            if uso_cache is not None:
+                if desde_cache:
+                    uso_cache['reutilizados'] += 1
+                else:
+                    uso_cache['bytes_nuevos'] += tamano
+
+            original = None
+            if registro is not None and huella is not None:
+                original = originales_bloque.get(huella) or registro.original(huella)
+
+            # La entrada llega ya comprimida: aquí solo se añade al archivo. Un duplicado
+            # llega sin datos y se copia la entrada del original ya escrita
+            entrada = None
+            if archivo_zip is not None:
+                with medidor.fase('escritura_zip'):
+                    if duplicado:
+                        _, crc, tamano_comprimido, tamano_original, metodo, offset_original = original[1]
+                        offset = archivo_zip.agregar_copia(nombre_archivo, offset_original,
+                                                           tamano_comprimido, crc, tamano_original, metodo)
+                    else:
+                        comprimido, crc, tamano_original, metodo = entrada_zip
+                        tamano_comprimido = len(comprimido)
+                        offset = archivo_zip.agregar_comprimido(nombre_archivo, *entrada_zip)
+                entrada = [nombre_archivo, crc, tamano_comprimido, tamano_original, metodo, offset]
+                entradas_bloque.append(entrada)
+            archivos_bloque.append([numero_pagina, ruta_relativa or nombre_archivo,
+                                    tamano if ruta_relativa else None])
+
+            if huella is None or registro is None:
+                continue
+            if original is None:
+                originales_bloque[huella] = (ruta_relativa, entrada)
+                registro.registrar(huella, ruta_relativa, entrada)
+                continue
+            # Repetido de un archivo que otro worker ya había escrito: se sustituye por un enlace
+            if not duplicado and ruta_relativa is not None:
+                with medidor.fase('enlaces'):
+                    registro.enlazar(original[0], ruta_relativa)
+            registro.registrar_duplicado(huella, ruta_relativa or nombre_archivo, tamano, original)
+
+        # Anotar el bloque en el diario solo cuando sus datos ya están en disco. Un
+        # bloque al que le faltan archivos no se anota: al reanudar se vuelve a generar
+        if fin > inicio and manifiesto is not None:
+            manifiesto.registrar_bloque(inicio, fin, archivos_bloque)
+        if fin > inicio and not incidencias['paginas']:
+            if archivo_zip is not None:
+                with medidor.fase('escritura_zip'):
+                    archivo_zip.flush()
+            with medidor.fase('journal'):
+                journal.registrar_bloque(
+                    inicio, fin, archivos_bloque,
+                    zip_fin=archivo_zip.posicion if archivo_zip is not None else None,
+                    entradas_zip=entradas_bloque,
+                    paginas=unidades.num_paginas(inicio, fin) if unidades is not None else None
+                )
+
+        bytes_bloque = sum(resultado[3] for resultado in resultados_bloque)
+        avance[0] += unidades.num_paginas(inicio, fin) if unidades is not None else fin - inicio
+        avance[1] += bytes_bloque
+        if planificador is not None:
+            planificador.registrar(inicio, fin, bytes_bloque + sum(
+                len(entrada[4][0]) for entrada in resultados_bloque if entrada[4] is not None))
+
+        # Los bloques que aún no se enviaron ya reconocen los repetidos de este
+        if registro is not None:
+            opciones['huellas_repetidas'] = registro.repetidas
+        # Un trabajo mayor que la caché no la llena con sus archivos desplazando a todos los demás
+        if uso_cache is not None and uso_cache['bytes_nuevos'] > uso_cache['limite']:
+            opciones['guardar_en_cache'] = False
+        # Un fallo de disco en la caché se avisa una vez y no se repite en cada bloque
+        if uso_cache is not None and incidencias['cache']:
+            if not uso_cache['errores'] and avisar is not None:
+                avisar(f"No se pudo guardar en la caché de salidas ({incidencias['cache'][0]}); "
+                       f"este trabajo deja de guardar en ella")
+            uso_cache['errores'] += len(incidencias['cache'])
+            opciones['guardar_en_cache'] = False
+
+        # Un bloque cancelado a medias trae fin < fin pedido; el resto queda pendiente
+        if control is not None and not control.esperar_si_pausado():
+            cancelado = True
+
+    return cancelado
+
+
+def reanudar_division(carpeta_salida, callback_progreso=None, batch_size=None, max_workers=None,
+                      control=None, callback_eventos=None, metricas=True, hilos_escritura=2,
+                      backend=BACKEND_AUTO, limite_workers=None, limite_rss=None, deduplicar=True,
+                      usar_cache=True, limite_cache_mb=None):
+    """
+    Reanuda un trabajo de división interrumpido usando su diario.
+
+    Verifica los archivos y entradas ZIP ya escritos y procesa solo las páginas
+    que faltan, con los mismos parámetros que el trabajo original.
+
+    Args:
+        carpeta_salida (str): Carpeta de salida del trabajo interrumpido
+        callback_progreso (callable): Callback para progreso
+        batch_size (int, optional): Páginas que se planifican juntas (default: 2000)
+        max_workers (int): Procesos paralelos (default: CPUs efectivas - 1)
+        control (ControlTrabajo, optional): Token para cancelar o pausar el trabajo
+        callback_eventos (callable, optional): Recibe los EventoProgreso del trabajo
+        metricas (bool): Medir tiempos por fase y memoria
+        hilos_escritura (int): Hilos de escritura en disco por worker (0 = síncrona)
+        backend (str): Cómo ejecutar el trabajo (ver dividir_pdf_optimizado)
+        limite_workers (int, optional): Tope de workers
+        limite_rss (int, optional): Memoria a partir de la cual se frena el reparto
+        deduplicar (bool): Enlazar los archivos repetidos de las páginas que faltan
+        usar_cache (bool): Usar la caché de salidas para las páginas que faltan
+        limite_cache_mb (float, optional): Tamaño máximo de la caché de salidas
+
+    Returns:
+        dict: Información de archivos creados (igual que dividir_pdf_optimizado)
+    """
+    journal = JournalDivision.cargar(carpeta_salida)
+    if journal is None:
+        raise ValueError(f"No hay ningún trabajo que reanudar en {carpeta_salida}")
+
+    # La selección de páginas se guarda como texto (ver formatear_paginas)
+    parametros = dict(journal.parametros)
+    if parametros['rango_paginas']:
+        parametros['rango_paginas'] = tuple(parametros['rango_paginas'])
+
+    return dividir_pdf_optimizado(
+        journal.cabecera['ruta_pdf'],
+        carpeta_salida,
+        callback_progreso=callback_progreso,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        reanudar=True,
+        control=control,
+        callback_eventos=callback_eventos,
+        metricas=metricas,
+        hilos_escritura=hilos_escritura,
+        backend=backend,
+        limite_workers=limite_workers,
+        limite_rss=limite_rss,
+        deduplicar=deduplicar,
+        usar_cache=usar_cache,
+        limite_cache_mb=limite_cache_mb,
+        **parametros
+    )
+
+
+def trabajo_pendiente(carpeta_salida, ruta_pdf=None):
+    """
+    Indica si en la carpeta hay un trabajo interrumpido que se pueda reanudar.
+
+    Args:
+        carpeta_salida (str): Carpeta de salida
+        ruta_pdf (str, optional): Si se indica, el trabajo debe ser de este PDF
+
+    Returns:
+        dict | None: {'ruta_pdf', 'paginas_completadas'} o None
+    """
+    if not carpeta_salida or not os.path.isdir(carpeta_salida):
+        return None
+
+    journal = JournalDivision.cargar(carpeta_salida)
+    if journal is None:
+        return None
+
+    if ruta_pdf and os.path.abspath(ruta_pdf) != journal.cabecera['ruta_pdf']:
+        return None
+
+    return {
+        'ruta_pdf': journal.cabecera['ruta_pdf'],
+        'paginas_completadas': journal.paginas_completadas,
     }
 
 
-def procesar_pagina_individual(args):
+# Documentos abiertos por cada proceso del pool, uno por motor. El pool es persistente
+# y puede atender trabajos de distintos archivos, así que se guarda su identidad.
+# Son por hilo: con el backend de hilos cada uno necesita su propio lector.
+_documentos_worker = threading.local()
+
+
+def _abrir_documento(ruta_pdf, motor):
+    """Abre el PDF con el motor indicado (PdfReader o DocumentoCrudo)"""
+    if motor == MOTOR_CRUDO:
+        return DocumentoCrudo(ruta_pdf)
+    # PyPDF2 lee los objetos de forma diferida: el archivo debe seguir abierto
+    return PyPDF2.PdfReader(open(ruta_pdf, 'rb'))
+
+
+def _cerrar_documento(documento):
+    """Cierra el archivo asociado a un documento abierto con _abrir_documento"""
+    if isinstance(documento, DocumentoCrudo):
+        documento.cerrar()
+    else:
+        documento.stream.close()
+
+
+def _obtener_documento_worker(ruta_pdf, motor=MOTOR_PYPDF2):
+    """
+    Devuelve el documento de este hilo para el motor indicado, abriéndolo y
+    analizándolo solo la primera vez (o si el archivo cambió en disco).
+
+    Args:
+        ruta_pdf (str): Ruta del archivo PDF de entrada
+        motor (str): MOTOR_PYPDF2 o MOTOR_CRUDO
+
+    Returns:
+        PyPDF2.PdfReader | DocumentoCrudo: Documento ya analizado
+    """
+    info = os.stat(ruta_pdf)
+    clave = (os.path.abspath(ruta_pdf), info.st_size, info.st_mtime_ns)
+
+    if not hasattr(_documentos_worker, 'documentos'):
+        _documentos_worker.documentos = {}
+    documentos = _documentos_worker.documentos
+
+    actual = documentos.get(motor)
+    if actual is None or actual[0] != clave:
+        if actual is not None:
+            if not isinstance(actual[1], Exception):
+                _cerrar_documento(actual[1])
+            del documentos[motor]
+
+        # Un fallo al abrir también se recuerda para no reintentarlo en cada página
+        try:
+            documentos[motor] = (clave, _abrir_documento(ruta_pdf, motor))
+        except Exception as e:
+            documentos[motor] = (clave, e)
+
+    documento = documentos[motor][1]
+    if isinstance(documento, Exception):
+        raise documento
+    return documento
+
+
+def _serializar_paginas(documento, indices, podar_recursos=False):
+    """
+    Genera un PDF con las páginas indicadas usando el motor del documento.
+
+    Args:
+        documento (PyPDF2.PdfReader | DocumentoCrudo): Documento de origen
+        indices (list): Índices 0-based de las páginas
+        podar_recursos (bool): Copiar solo los recursos que usa cada página
+
+    Returns:
+        bytes: Contenido del PDF resultante
+    """
+    if isinstance(documento, DocumentoCrudo):
+        return documento.extraer_paginas(indices, podar_recursos)
+
+    escritor_pdf = PyPDF2.PdfWriter()
+    for indice in indices:
+        pagina = documento.pages[indice]
+        # add_page copia todo lo alcanzable desde la página: hay que podar antes
+        escritor_pdf.add_page(podar_pagina(pagina) if podar_recursos else pagina)
+
+    buffer = io.BytesIO()
+    escritor_pdf.write(buffer)
+    return buffer.getvalue()
+
+
+def _extraer_con_respaldo(ruta_pdf, indices, motor, cronometro=None, podar_recursos=False):
+    """
+    Extrae las páginas con el motor pedido. Si el motor crudo no puede con el
+    documento o con una página concreta, se recurre a PyPDF2.
+
+    Con cronometro se mide por separado el análisis del documento (solo la
+    primera vez en cada proceso) y la serialización de las páginas.
+
+    Returns:
+        tuple: (datos, respaldo). respaldo es None o, si se recurrió a PyPDF2, el
+               motivo por el que el motor crudo no pudo
+    """
+    if cronometro is None:
+        cronometro = Cronometro(activo=False)
+
+    respaldo = None
+    if motor == MOTOR_CRUDO:
+        try:
+            with cronometro.medir('analisis'):
+                documento = _obtener_documento_worker(ruta_pdf, MOTOR_CRUDO)
+            with cronometro.medir('serializacion'):
+                return _serializar_paginas(documento, indices, podar_recursos), None
+        except Exception as e:
+            respaldo = f"{type(e).__name__}: {e}"
+
+    with cronometro.medir('analisis'):
+        documento = _obtener_documento_worker(ruta_pdf, MOTOR_PYPDF2)
+    with cronometro.medir('serializacion'):
+        return _serializar_paginas(documento, indices, podar_recursos), respaldo
+
+
+def verificar_motor_crudo(ruta_pdf, paginas, podar_recursos=False):
+    """
+    Comprueba que el motor crudo produce páginas equivalentes a las de PyPDF2.
+
+    Compara, para cada página, el tamaño, la rotación, el contenido
+    decodificado, las claves de recursos y el texto extraído.
+
+    Args:
+        ruta_pdf (str): Ruta del archivo PDF
+        paginas (list): Índices 0-based de las páginas a comprobar
+        podar_recursos (bool): Comprobar las páginas con los recursos podados (las
+                               categorías de recursos se mantienen aunque queden vacías)
+
+    Returns:
+        list: Descripción de las diferencias encontradas (vacía si son equivalentes)
+    """
+    diferencias = []
+
+    with open(ruta_pdf, 'rb') as archivo_pdf:
+        lector_pdf = PyPDF2.PdfReader(archivo_pdf)
+        documento = DocumentoCrudo(ruta_pdf)
+
+        try:
+            for indice in paginas:
+                original = _pagina_sin_aplanar(lector_pdf, documento.numero_objeto_pagina(indice))
+                copia = PyPDF2.PdfReader(io.BytesIO(
+                    documento.extraer_paginas([indice], podar_recursos))).pages[0]
+
+                comprobaciones = {
+                    'MediaBox': (list(original.mediabox), list(copia.mediabox)),
+                    'Rotate': (original.get('/Rotate', 0), copia.get('/Rotate', 0)),
+                    # /Contents puede ser un stream o un array de streams
+                    'Contenido': (
+                        datos_contenido(original.get('/Contents')),
+                        datos_contenido(copia.get('/Contents'))
+                    ),
+                    # /Resources puede ser una referencia: se resuelve antes de comparar
+                    'Recursos': (
+                        sorted(original['/Resources'].keys()) if '/Resources' in original else [],
+                        sorted(copia['/Resources'].keys()) if '/Resources' in copia else []
+                    ),
+                    'Texto': (original.extract_text(), copia.extract_text()),
+                }
+
+                for nombre, (esperado, obtenido) in comprobaciones.items():
+                    if esperado != obtenido:
+                        diferencias.append(f"Página {indice + 1}: {nombre} distinto")
+        finally:
+            documento.cerrar()
+
+    return diferencias
+
+
+def _pagina_sin_aplanar(lector_pdf, num_objeto):
     """
-    Procesa una página individual del PDF.
-    Función separada para permitir multiprocessing.
+    Devuelve una página de PyPDF2 con sus atributos heredados sin recorrer el
+    árbol de páginas completo (lector.pages carga todas las páginas en memoria).
 
     Args:
-        args: tupla (ruta_pdf, numero_pagina, carpeta_salida, formato_nombre)
+        lector_pdf (PyPDF2.PdfReader): Lector del documento
+        num_objeto (int): Número del objeto de la página
 
     Returns:
-        str: Ruta del archivo creado o None si falla
+        PyPDF2.PageObject: Página lista para comparar
+    """
+    referencia = PyPDF2.generic.IndirectObject(num_objeto, 0, lector_pdf)
+    pagina = PyPDF2.PageObject(lector_pdf, referencia)
+    pagina.update(lector_pdf.get_object(referencia))
+
+    # Completar los atributos heredables igual que al aplanar el árbol
+    nodo = pagina.get('/Parent')
+    while nodo is not None:
+        nodo = nodo.get_object()
+        for clave in ('/Resources', '/MediaBox', '/CropBox', '/Rotate'):
+            if clave in nodo and clave not in pagina:
+                pagina[PyPDF2.generic.NameObject(clave)] = nodo[clave]
+        nodo = nodo.get('/Parent')
+    return pagina
+
+
+class _UnidadesSalida:
+    """
+    Páginas de origen (0-based) de cada archivo de salida del trabajo.
+
+    origen son las páginas en el orden de salida (un range o un array). Cada
+    archivo toma las paginas_por_archivo siguientes o, si se indican cortes,
+    hasta la posición de origen donde termina cada uno (rangos de tamaño libre).
+
+    Con una página por archivo de un rango contiguo, cada archivo se identifica
+    por su página (como siempre); en los demás casos, por su posición 0..n.
+    """
+
+    def __init__(self, origen, paginas_por_archivo=1, cortes=None):
+        self.origen = origen
+        self.paginas_por_archivo = max(1, int(paginas_por_archivo))
+        self.cortes = cortes
+        self.por_pagina = (cortes is None and self.paginas_por_archivo == 1
+                           and isinstance(origen, range))
+
+        if self.por_pagina:
+            self.inicio, self.fin = origen.start, origen.stop
+        elif cortes is not None:
+            self.inicio, self.fin = 0, len(cortes)
+        else:
+            self.inicio, self.fin = 0, -(-len(origen) // self.paginas_por_archivo)
+
+    def __len__(self):
+        return self.fin - self.inicio
+
+    @property
+    def total_paginas(self):
+        return len(self.origen)
+
+    def _tramo(self, unidad):
+        """Posiciones [a, b) de origen que ocupa el archivo"""
+        if self.cortes is not None:
+            return self.cortes[unidad - 1] if unidad else 0, self.cortes[unidad]
+        inicio = unidad * self.paginas_por_archivo
+        return inicio, min(inicio + self.paginas_por_archivo, len(self.origen))
+
+    def num_paginas(self, inicio, fin):
+        """Páginas de origen de los archivos [inicio, fin)"""
+        if self.por_pagina or fin <= inicio:
+            return max(0, fin - inicio)
+        return self._tramo(fin - 1)[1] - self._tramo(inicio)[0]
+
+    def paginas_archivo(self, unidad):
+        """Páginas de origen (0-based) del archivo"""
+        if self.por_pagina:
+            return [unidad]
+        return list(self.origen[slice(*self._tramo(unidad))])
+
+    def paginas_bloque(self, inicio, fin):
+        """Páginas de cada archivo [inicio, fin) para la tarea, o None si cada archivo es su página"""
+        if self.por_pagina:
+            return None
+        return [list(self.origen[slice(*self._tramo(unidad))]) for unidad in range(inicio, fin)]
+
+    def costes(self, costes_pagina):
+        """
+        Coste de cada archivo para el planificador a partir del de cada página.
+
+        Returns:
+            array | None: None si todos los archivos cuestan lo mismo y no hay costes
+        """
+        if self.por_pagina:
+            return costes_pagina
+        if costes_pagina is None and self.cortes is None and self.paginas_por_archivo == 1:
+            return None
+
+        costes = array('q')
+        for unidad in range(self.fin):
+            inicio, fin = self._tramo(unidad)
+            if costes_pagina is None:
+                costes.append(fin - inicio)
+            else:
+                costes.append(sum(costes_pagina[pagina] for pagina in self.origen[inicio:fin]))
+        return costes
+
+
+def _planificar_por_tamano(ruta_pdf, origen, tamano_max, motor=MOTOR_PYPDF2, podar_recursos=False):
     """
-    ruta_pdf, numero_pagina, carpeta_salida, formato_nombre = args
+    Reparte las páginas en archivos consecutivos que no pasen de tamano_max.
+
+    El tamaño se estima antes de generar nada, con unas pocas páginas de
+    muestra serializadas por separado y juntas: lo que ahorran juntas es la
+    parte común de cada archivo (fuentes e imágenes compartidas, cabeceras) y
+    el resto se reparte por página según su coste en costes_paginas. Se
+    planifica con un margen bajo el límite; si aun así un archivo lo supera,
+    el worker lo parte (ver _partes_por_tamano).
 
+    Args:
+        ruta_pdf (str): Ruta del PDF
+        origen (range | array): Páginas (0-based) en el orden de salida
+        tamano_max (int): Bytes máximos de cada archivo
+        motor (str): Motor con el que se generarán los archivos
+        podar_recursos (bool): Si los archivos se generarán con los recursos podados
+
+    Returns:
+        array: Posición de origen donde termina cada archivo (cortes de _UnidadesSalida)
+    """
+    total = len(origen)
+    costes = costes_paginas(indice_paginas.obtener(ruta_pdf), os.path.getsize(ruta_pdf))
+
+    def coste(pagina):
+        return costes[pagina] if costes is not None else 1
+
+    # Tamaño real de unas páginas repartidas por la selección frente a su coste
+    cantidad = min(_PAGINAS_MUESTRA_TAMANO, total)
+    muestra = sorted({origen[(i * (total - 1)) // max(1, cantidad - 1)] for i in range(cantidad)})
+    try:
+        documento = _abrir_documento(ruta_pdf, motor)
+    except Exception:
+        documento = _abrir_documento(ruta_pdf, MOTOR_PYPDF2)
     try:
-        # Abrir PDF solo para esta página (gestión eficiente de memoria)
-        with open(ruta_pdf, 'rb') as archivo_pdf:
-            lector_pdf = PyPDF2.PdfReader(archivo_pdf)
+        individuales = [len(_serializar_paginas(documento, [pagina], podar_recursos))
+                        for pagina in muestra]
+        base = _BYTES_BASE_ARCHIVO
+        if len(muestra) > 1:
+            juntas = len(_serializar_paginas(documento, muestra, podar_recursos))
+            base = (sum(individuales) - juntas) / (len(muestra) - 1)
+        base = max(0, min(base, min(individuales)))
+        factor = statistics.median(
+            (tamano - base) / coste(pagina) for tamano, pagina in zip(individuales, muestra)
+        )
+    finally:
+        _cerrar_documento(documento)
+
+    objetivo = tamano_max * _FRACCION_TAMANO_OBJETIVO
+    cortes = array('q')
+    acumulado, paginas_archivo = base, 0
+    for posicion, pagina in enumerate(origen):
+        estimado = max(_BYTES_MIN_PAGINA, factor * coste(pagina))
+        if paginas_archivo and acumulado + estimado > objetivo:
+            cortes.append(posicion)
+            acumulado, paginas_archivo = base, 0
+        acumulado += estimado
+        paginas_archivo += 1
+    if total:
+        cortes.append(total)
+    return cortes
+
+
+def _intervalos_pendientes(inicio, fin, completados):
+    """
+    Calcula los intervalos de [inicio, fin) que no cubren los bloques completados.
+
+    Args:
+        inicio (int): Primera página (0-based)
+        fin (int): Página final (exclusiva)
+        completados (list): Tuplas (inicio, fin) ya procesadas
+
+    Returns:
+        list: Tuplas (inicio, fin) pendientes, ordenadas
+    """
+    pendientes = []
+    actual = inicio
+    for inicio_hecho, fin_hecho in sorted(completados):
+        if inicio_hecho > actual:
+            pendientes.append((actual, min(inicio_hecho, fin)))
+        actual = max(actual, fin_hecho)
+    if actual < fin:
+        pendientes.append((actual, fin))
+    return [(a, b) for a, b in pendientes if a < b]
+
+
+def parsear_paginas(texto):
+    """
+    Convierte una selección escrita ("1-5, 9, 20-12") en la lista de páginas.
+
+    Los rangos incluyen ambos extremos y, si el inicio es mayor que el fin, se
+    recorren hacia atrás. Se respetan el orden y las repeticiones.
+
+    Args:
+        texto (str): Números y rangos separados por comas, espacios o saltos de línea
+
+    Returns:
+        array: Números de página 1-based
+
+    Raises:
+        ValueError: Si alguna parte no es un número o un rango válido
+    """
+    paginas = array('q')
+    for inicio, fin in parsear_rangos(texto):
+        paso = 1 if fin >= inicio else -1
+        paginas.extend(range(inicio, fin + paso, paso))
+    return paginas
+
+
+def parsear_rangos(texto):
+    """
+    Convierte un texto como "1-10, 11-50, 80" en la lista de rangos escritos.
+
+    Args:
+        texto (str): Números y rangos separados por comas, espacios o saltos de línea
+
+    Returns:
+        list: Tuplas (inicio, fin) 1-based e inclusivas; un número suelto es (n, n)
+
+    Raises:
+        ValueError: Si alguna parte no es un número o un rango válido
+    """
+    rangos = []
+    for parte in re.split(r"[,;\s]+", re.sub(r"\s*-\s*", "-", texto.strip())):
+        if not parte:
+            continue
+        coincidencia = re.fullmatch(r"(\d+)(?:-(\d+))?", parte)
+        if coincidencia is None:
+            raise ValueError(f"Selección de páginas inválida: {parte}")
+        inicio = int(coincidencia.group(1))
+        rangos.append((inicio, int(coincidencia.group(2) or inicio)))
+    return rangos
+
+
+def formatear_paginas(paginas):
+    """
+    Texto compacto de una selección de páginas, inverso de parsear_paginas.
+
+    Args:
+        paginas (iterable): Números de página 1-based
+
+    Returns:
+        str: Tramos consecutivos como "inicio-fin" separados por comas
+    """
+    tramos = []
+    inicio = anterior = paso = None
+    for pagina in paginas:
+        if anterior is not None and pagina - anterior in (1, -1) and paso in (None, pagina - anterior):
+            paso, anterior = pagina - anterior, pagina
+            continue
+        if inicio is not None:
+            tramos.append(f"{inicio}-{anterior}" if anterior != inicio else str(inicio))
+        inicio = anterior = pagina
+        paso = None
+    if inicio is not None:
+        tramos.append(f"{inicio}-{anterior}" if anterior != inicio else str(inicio))
+    return ",".join(tramos)
+
+
+def ubicacion_pagina(numero_pagina, formato_nombre, formato_carpeta=None, paginas_por_carpeta=1000):
+    """
+    Nombre del archivo de una página y su ruta dentro de la carpeta de salida.
+
+    Args:
+        numero_pagina (int): Índice 0-based de la página
+        formato_nombre (str): Formato del nombre (p. ej. "pagina_{:03d}")
+        formato_carpeta (str, optional): Formato de la subcarpeta (p. ej. "{:04d}")
+        paginas_por_carpeta (int): Páginas por subcarpeta
+
+    Returns:
+        tuple: (nombre_archivo, ruta_relativa). La ruta usa "/" como separador y es
+               igual al nombre si no hay subcarpetas
+    """
+    nombre_archivo = formato_nombre.format(numero_pagina + 1) + ".pdf"
+    if not formato_carpeta:
+        return nombre_archivo, nombre_archivo
+    subcarpeta = formato_carpeta.format(numero_pagina // paginas_por_carpeta)
+    return nombre_archivo, f"{subcarpeta}/{nombre_archivo}"
 
-            # Crear nuevo PDF con solo esta página
-            escritor_pdf = PyPDF2.PdfWriter()
-            escritor_pdf.add_page(lector_pdf.pages[numero_pagina])
+
+def procesar_bloque_paginas(args):
+    """
+    Procesa un bloque contiguo de páginas con el lector del worker.
+
+    Args:
+        args: tupla (ruta_pdf, inicio, fin, opciones, paginas_origen) donde opciones es
+              un dict con carpeta_salida, formato_nombre, formato_carpeta,
+              paginas_por_carpeta, guardar_archivos, hilos_escritura, devolver_datos,
+              compresion_zip, motor, podar_recursos, deduplicar, huellas_repetidas,
+              digest_cache (None sin caché de salidas), guardar_en_cache y slot
+              (estado del trabajo en el pool).
+              paginas_origen es None si cada archivo es una página del rango
+              [inicio, fin); si no, [inicio, fin) son archivos de salida y
+              paginas_origen la lista de páginas (0-based) de cada uno
+
+    Returns:
+        tuple: (inicio, fin, lista de (numero_pagina, nombre_archivo, ruta, tamano, entrada_zip,
+               huella, duplicado, desde_cache), medicion, incidencias). Si el trabajo se cancela,
+               fin es la primera página que quedó sin procesar.
+               ruta es la ruta relativa a carpeta_salida (con la subcarpeta, si hay), o None
+               si no se guardó en disco; entrada_zip es None si no se pidió o si el archivo
+               es un duplicado; si no, es la tupla comprimida que devuelve comprimir_entrada.
+               huella es None si no se pidió deduplicar ni se usa la caché; duplicado
+               indica que el archivo repite uno anterior (del bloque o de
+               opciones['huellas_repetidas']) y se enlazó a él; desde_cache, que se
+               tomó de la caché de salidas en lugar de extraerlo.
+               Las páginas con error se omiten de la lista. medicion es una MedicionBloque,
+               o None si opciones['metricas'] es falso. incidencias es un dict con
+               'paginas', lista de (numero_pagina, motivo) de los archivos que no se
+               pudieron generar o escribir, 'cache', los fallos al guardar en la caché de
+               salidas, y 'respaldo', [páginas, primer motivo] de las que el motor crudo no
+               pudo copiar y se extrajeron con PyPDF2.
+    """
+    ruta_pdf, inicio, fin, opciones, paginas_origen = args
+    resultados = []
+    medicion = MedicionBloque() if opciones.get('metricas') else None
+    cronometro = medicion.cronometro if medicion is not None else Cronometro(activo=False)
+    escritor = None
+    if opciones['guardar_archivos']:
+        escritor = _obtener_escritor_worker(opciones.get('hilos_escritura', 0))
+    # Identifica los archivos de este bloque si varios hilos comparten el escritor
+    grupo = object()
+
+    # Archivos repetidos: los del propio bloque y los que el proceso principal ya
+    # vio repetirse se enlazan al primero en lugar de escribirse y comprimirse otra vez
+    deduplicar = opciones.get('deduplicar', False)
+    repetidas = opciones.get('huellas_repetidas') or {}
+    huellas_bloque = {}
+    enlaces = []
+
+    # Archivos de divisiones anteriores del mismo PDF con los mismos ajustes: se
+    # llevan desde la caché en lugar de extraerlos. Los nuevos se guardan en ella
+    # al terminar el bloque, cuando ya están en disco
+    digest = opciones.get('digest_cache')
+    guardar_en_cache = digest is not None and opciones.get('guardar_en_cache', True)
+    pendientes_cache = []
+    # Lo que el proceso principal debe saber aunque el bloque termine: archivos
+    # que no se pudieron escribir, fallos al guardar en la caché y páginas que
+    # el motor crudo no pudo copiar
+    incidencias = {'paginas': [], 'cache': [], 'respaldo': [0, None]}
+
+    for numero_pagina in range(inicio, fin):
+        # Espera aquí mientras el trabajo está en pausa
+        if not esperar_turno(opciones.get('slot')):
+            return _terminar_bloque(inicio, numero_pagina, resultados, medicion, escritor, grupo,
+                                    enlaces, opciones['carpeta_salida'], pendientes_cache,
+                                    incidencias)
+
+        inicio_pagina = time.perf_counter() if medicion is not None else None
+        indices = [numero_pagina] if paginas_origen is None else paginas_origen[numero_pagina - inicio]
+        try:
+            en_cache = None
+            if digest is not None:
+                clave_cache = cache_salidas.clave(digest, indices, opciones['motor'],
+                                                  opciones.get('podar_recursos', False))
+                with cronometro.medir('cache'):
+                    en_cache = cache_salidas.buscar(clave_cache)
+
+            if en_cache is not None:
+                datos, huella_cache = en_cache
+            else:
+                # Crear nuevo PDF con solo esta página (o las de este archivo)
+                datos, respaldo = _extraer_con_respaldo(ruta_pdf, indices, opciones['motor'], cronometro,
+                                                        opciones.get('podar_recursos', False))
+                if respaldo is not None:
+                    _anotar_respaldo(incidencias, indices, respaldo)
+
+            # Un archivo que pasó del tamaño máximo se parte aquí mismo, sin replanificar
+            partes = [(indices, datos)]
+            tamano_max = opciones.get('tamano_max_archivo')
+            if tamano_max and len(datos) > tamano_max and len(indices) > 1:
+                partes = _partes_por_tamano(ruta_pdf, indices, datos, opciones['motor'],
+                                            tamano_max, cronometro, opciones.get('podar_recursos', False),
+                                            incidencias)
 
             # Generar nombre de archivo
-            nombre_archivo = formato_nombre.format(numero_pagina + 1) + ".pdf"
-            ruta_archivo = os.path.join(carpeta_salida, nombre_archivo)
+            nombre_archivo, ruta_relativa = ubicacion_pagina(
+                numero_pagina, opciones['formato_nombre'],
+                opciones.get('formato_carpeta'), opciones.get('paginas_por_carpeta', 1000)
+            )
 
-            # Guardar archivo
-            with open(ruta_archivo, 'wb') as archivo_pagina:
-                escritor_pdf.write(archivo_pagina)
+            resultados_archivo = []
+            for numero_parte, (_, datos) in enumerate(partes, 1):
+                # Las partes llevan sufijo: pagina_003_1.pdf, pagina_003_2.pdf...
+                nombre_parte, ruta_parte = nombre_archivo, ruta_relativa
+                if len(partes) > 1:
+                    nombre_parte = f"{nombre_archivo[:-4]}_{numero_parte}.pdf"
+                    ruta_parte = f"{ruta_relativa[:-4]}_{numero_parte}.pdf"
 
-            return ruta_archivo
+                # La caché solo guarda archivos completos (sin partir)
+                desde_cache = en_cache is not None and len(partes) == 1
+                if desde_cache:
+                    huella = huella_cache
+                elif deduplicar or (guardar_en_cache and len(partes) == 1):
+                    huella = huella_datos(datos)
+                else:
+                    huella = None
+                duplicado = deduplicar and (huella in huellas_bloque or huella in repetidas)
+                if duplicado:
+                    ruta_original = huellas_bloque.get(huella, repetidas.get(huella))
+                elif deduplicar:
+                    huellas_bloque[huella] = ruta_parte
 
-    except Exception as e:
-        print(f"Error procesando página {numero_pagina + 1}: {str(e)}")
+                # Guardar archivo (los duplicados se enlazan al terminar el bloque,
+                # cuando el original ya está en disco)
+                if opciones['guardar_archivos'] and duplicado:
+                    enlaces.append((numero_pagina, ruta_original, ruta_parte))
+                elif opciones['guardar_archivos']:
+                    ruta_archivo = os.path.join(opciones['carpeta_salida'], ruta_parte)
+                    with cronometro.medir('escritura'):
+                        if desde_cache and cache_salidas.materializar(huella, ruta_archivo):
+                            # Clon o enlace del archivo guardado: no hay nada que escribir
+                            pass
+                        elif escritor is not None:
+                            # Solo espera si el disco lleva demasiado retraso
+                            escritor.escribir(ruta_archivo, datos, numero_pagina, grupo)
+                        else:
+                            escribir_archivo(ruta_archivo, datos)
+
+                if guardar_en_cache and en_cache is None and len(partes) == 1:
+                    if opciones['guardar_archivos']:
+                        pendientes_cache.append((numero_pagina, clave_cache, huella, ruta_parte))
+                    else:
+                        with cronometro.medir('cache'):
+                            error = _guardar_en_cache(clave_cache, huella, datos=datos)
+                        # Tras un fallo el resto del bloque no vuelve a intentarlo
+                        if error is not None:
+                            incidencias['cache'].append(error)
+                            guardar_en_cache = False
+
+                # Comprimir aquí la entrada del ZIP: el proceso principal solo la añade
+                entrada_zip = None
+                if opciones['devolver_datos'] and not duplicado:
+                    with cronometro.medir('compresion_zip'):
+                        entrada_zip = comprimir_entrada(datos, opciones['compresion_zip'])
+
+                if not opciones['guardar_archivos']:
+                    ruta_parte = None
+                resultados_archivo.append((numero_pagina, nombre_parte, ruta_parte, len(datos),
+                                           entrada_zip, huella, duplicado, desde_cache))
+
+            resultados.extend(resultados_archivo)
+            registrar_avance(opciones.get('slot'), len(indices),
+                             sum(resultado[3] for resultado in resultados_archivo))
+
+        except Exception as e:
+            incidencias['paginas'].append((numero_pagina, str(e)))
+            registrar_avance(opciones.get('slot'), len(indices), 0)
+
+        if medicion is not None:
+            medicion.registrar_pagina(time.perf_counter() - inicio_pagina)
+
+    return _terminar_bloque(inicio, fin, resultados, medicion, escritor, grupo,
+                            enlaces, opciones['carpeta_salida'], pendientes_cache,
+                            incidencias)
+
+
+def _partes_por_tamano(ruta_pdf, indices, datos, motor, tamano_max, cronometro=None,
+                       podar_recursos=False, incidencias=None):
+    """
+    Parte por la mitad, hasta quedar por debajo de tamano_max, un archivo
+    que lo superó al generarse. Una página sola no se puede partir. Los
+    trozos que recurren a PyPDF2 se anotan en incidencias (ver
+    procesar_bloque_paginas).
+
+    Returns:
+        list: Tuplas (indices, datos) de cada parte, en orden
+    """
+    if len(datos) <= tamano_max or len(indices) == 1:
+        return [(indices, datos)]
+
+    partes = []
+    mitad = len(indices) // 2
+    for trozo in (indices[:mitad], indices[mitad:]):
+        datos_trozo, respaldo = _extraer_con_respaldo(ruta_pdf, trozo, motor, cronometro, podar_recursos)
+        if respaldo is not None and incidencias is not None:
+            _anotar_respaldo(incidencias, trozo, respaldo)
+        partes.extend(_partes_por_tamano(ruta_pdf, trozo, datos_trozo, motor, tamano_max,
+                                         cronometro, podar_recursos, incidencias))
+    return partes
+
+
+def _anotar_respaldo(incidencias, indices, motivo):
+    """Suma a las incidencias del bloque unas páginas extraídas con PyPDF2 en lugar del motor crudo"""
+    incidencias['respaldo'][0] += len(indices)
+    if incidencias['respaldo'][1] is None:
+        incidencias['respaldo'][1] = motivo
+
+
+# Escritor en segundo plano de cada proceso del pool (se crea con el primer bloque).
+# Con el backend de hilos lo comparten todos los hilos del proceso principal
+_escritor_worker = None
+_lock_escritor = threading.Lock()
+
+
+def _reiniciar_estado_worker():
+    """
+    Descarta el estado heredado al crear un proceso con fork: los hilos del
+    escritor no existen en el hijo y los documentos abiertos comparten la
+    posición de lectura con el padre.
+    """
+    global _escritor_worker, _lock_escritor, _documentos_worker
+    _escritor_worker = None
+    _lock_escritor = threading.Lock()
+    _documentos_worker = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_estado_worker)
+
+
+def _obtener_escritor_worker(hilos):
+    """
+    Devuelve el EscritorArchivos de este proceso con el número de hilos pedido,
+    o None si la escritura debe ser síncrona (hilos == 0).
+    """
+    global _escritor_worker
+    if not hilos:
         return None
+    with _lock_escritor:
+        # Los bloques que usan el escritor anterior lo conservan hasta terminar
+        if _escritor_worker is None or _escritor_worker.hilos != hilos:
+            _escritor_worker = EscritorArchivos(hilos)
+        return _escritor_worker
+
+
+def _terminar_bloque(inicio, fin, resultados, medicion, escritor, grupo=None,
+                     enlaces=None, carpeta_salida=None, pendientes_cache=None,
+                     incidencias=None):
+    """
+    Espera a que los archivos del bloque estén en disco y arma el resultado.
+
+    El bloque no se devuelve hasta entonces: el diario solo debe anotar
+    bloques cuyos archivos ya existen. Después se crean los enlaces de los
+    duplicados, (numero_pagina, ruta_original, ruta) relativas a carpeta_salida.
+    Las páginas que no se pudieron escribir o enlazar se quitan del resultado
+    y se anotan en incidencias['paginas'] con el motivo. Por último los archivos
+    nuevos, (numero_pagina, clave, huella, ruta), se guardan en la caché de
+    salidas; el primer fallo se anota en incidencias['cache'] y no se guarda el resto.
+    """
+    if incidencias is None:
+        incidencias = {'paginas': [], 'cache': [], 'respaldo': [0, None]}
+    cronometro = medicion.cronometro if medicion is not None else Cronometro(activo=False)
+    errores = {}
+    if escritor is not None:
+        with cronometro.medir('escritura'):
+            errores = escritor.esperar(grupo)
+
+    if enlaces:
+        with cronometro.medir('escritura'):
+            for numero_pagina, ruta_original, ruta_relativa in enlaces:
+                try:
+                    enlazar_archivo(os.path.join(carpeta_salida, ruta_original),
+                                    os.path.join(carpeta_salida, ruta_relativa))
+                except OSError as e:
+                    errores[numero_pagina] = e
+
+    if pendientes_cache:
+        with cronometro.medir('cache'):
+            for numero_pagina, clave, huella, ruta_relativa in pendientes_cache:
+                if numero_pagina in errores:
+                    continue
+                error = _guardar_en_cache(clave, huella, origen=os.path.join(carpeta_salida, ruta_relativa))
+                if error is not None:
+                    incidencias['cache'].append(error)
+                    break
+
+    if errores:
+        incidencias['paginas'].extend((numero_pagina, str(error))
+                                      for numero_pagina, error in sorted(errores.items()))
+        resultados = [resultado for resultado in resultados if resultado[0] not in errores]
 
+    return inicio, fin, resultados, medicion.terminar() if medicion is not None else None, incidencias
 
-def estimar_tiempo_procesamiento(num_paginas, crear_zip=True):
+
+def _guardar_en_cache(clave, huella, datos=None, origen=None):
+    """
+    Guarda un archivo en la caché de salidas; un fallo no afecta a la división.
+
+    Returns:
+        str | None: El motivo si no se pudo guardar
+    """
+    try:
+        cache_salidas.guardar(clave, huella, datos, origen)
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def calibrar_tiempos(ruta_pdf, paginas=None, motor=MOTOR_PYPDF2, crear_zip=True,
+                     compresion_zip="ZIP_DEFLATED", tamano_muestra=8, podar_recursos=True):
+    """
+    Mide cuánto tarda este equipo en procesar unas páginas repartidas por el documento.
+
+    Se abre el PDF como lo haría un worker y se extraen (y comprimen, si hay ZIP)
+    las páginas de muestra, cronometrando cada paso por separado.
+
+    Args:
+        ruta_pdf (str): Ruta del PDF
+        paginas (list, optional): Índices 0-based que se van a procesar (por defecto todas)
+        motor (str): Motor de extracción que se usará
+        crear_zip (bool): Si medir también la compresión
+        compresion_zip (str): Algoritmo del ZIP
+        tamano_muestra (int): Número de páginas a medir
+        podar_recursos (bool): Si la división podará los recursos de cada página
+
+    Returns:
+        dict: {'segundos_apertura', 'muestras': [(indice, segundos_extraccion,
+               segundos_zip, bytes_salida)], 'motor', 'crear_zip'}
+    """
+    if paginas is None:
+        paginas = range(indice_paginas.total_paginas(ruta_pdf))
+    total = len(paginas)
+    if total == 0:
+        raise ValueError("No hay páginas que medir")
+
+    # Páginas repartidas uniformemente (principio, medio, final...)
+    cantidad = min(tamano_muestra, total)
+    muestra = sorted({paginas[(i * (total - 1)) // max(1, cantidad - 1)] for i in range(cantidad)})
+
+    inicio = time.perf_counter()
+    try:
+        documento = _abrir_documento(ruta_pdf, motor)
+    except Exception:
+        motor = MOTOR_PYPDF2
+        documento = _abrir_documento(ruta_pdf, motor)
+
+    metodo_zip = resolver_metodo_zip(compresion_zip)
+    muestras = []
+    try:
+        # La primera página llena cachés del lector: cuenta como coste de arranque del worker
+        _serializar_paginas(documento, [muestra[0]], podar_recursos)
+        segundos_apertura = time.perf_counter() - inicio
+
+        for indice in muestra:
+            inicio = time.perf_counter()
+            datos = _serializar_paginas(documento, [indice], podar_recursos)
+            segundos_extraccion = time.perf_counter() - inicio
+
+            segundos_zip = 0.0
+            if crear_zip:
+                inicio = time.perf_counter()
+                comprimir_entrada(datos, metodo_zip)
+                segundos_zip = time.perf_counter() - inicio
+
+            muestras.append((indice, segundos_extraccion, segundos_zip, len(datos)))
+    finally:
+        _cerrar_documento(documento)
+
+    return {
+        'segundos_apertura': segundos_apertura,
+        'muestras': muestras,
+        'motor': motor,
+        'crear_zip': crear_zip,
+    }
+
+
+def _cuartiles(valores):
+    """Percentiles 25 y 75 (con pocas muestras, el mínimo y el máximo)"""
+    valores = sorted(valores)
+    if len(valores) < 4:
+        return valores[0], valores[-1]
+    cuartiles = statistics.quantiles(valores, n=4)
+    return cuartiles[0], cuartiles[2]
+
+
+def estimar_tiempo_procesamiento(num_paginas, crear_zip=True, ruta_pdf=None, rango_paginas=None,
+                                 max_workers=None, calibracion=None, paginas_seleccionadas=None):
     """
     Estima el tiempo aproximado de procesamiento.
 
+    Con ruta_pdf se mide una muestra del propio archivo (ver calibrar_tiempos)
+    y, si el índice de páginas ya tiene los bytes de cada página, el coste se
+    reparte según el peso real de las páginas del rango. Sin archivo se usan
+    valores por defecto.
+
     Args:
         num_paginas (int): Número de páginas a procesar
         crear_zip (bool): Si se creará ZIP
+        ruta_pdf (str, optional): PDF a medir
+        rango_paginas (tuple, optional): (inicio, fin) 1-based, como en dividir_pdf_optimizado
+        max_workers (int, optional): Procesos paralelos (default: CPU cores - 1)
+        calibracion (dict, optional): Resultado previo de calibrar_tiempos para no volver a medir
+        paginas_seleccionadas (list, optional): Páginas 1-based, como en dividir_pdf_optimizado
 
     Returns:
-        dict: Estimación de tiempo
+        dict: Estimación de tiempo. 'segundos' es el valor más probable y
+              'segundos_min'/'segundos_max' el rango esperado; 'calibrado'
+              indica si se midió el archivo. 'segundos_trabajo' es el tiempo
+              de todas las páginas en un solo proceso y 'segundos_apertura'
+              lo que tarda cada proceso en abrir el PDF
     """
-    # Estimaciones basadas en benchmarks (ajusta según tu hardware)
-    tiempo_por_pagina = 0.05  # segundos por página
-    tiempo_zip_por_archivo = 0.02  # segundos por archivo al comprimir
+    workers = max(1, int(max_workers) if max_workers else workers_por_defecto()[0])
+    workers = max(1, min(workers, num_paginas))
+
+    if ruta_pdf is None and calibracion is None:
+        # Sin archivo que medir: valores por defecto
+        segundos_extraccion = num_paginas * _SEGUNDOS_POR_PAGINA
+        segundos_zip = num_paginas * _SEGUNDOS_ZIP_POR_PAGINA if crear_zip else 0.0
+        rango = (0.5, 2.0)
+        apertura = 0.0
+        calibrado = False
+    else:
+        if calibracion is None:
+            paginas = None
+            if paginas_seleccionadas:
+                paginas = sorted({pagina - 1 for pagina in paginas_seleccionadas})
+            elif rango_paginas:
+                total = indice_paginas.total_paginas(ruta_pdf)
+                paginas = range(max(0, rango_paginas[0] - 1), min(total, rango_paginas[1]))
+            calibracion = calibrar_tiempos(ruta_pdf, paginas, crear_zip=crear_zip)
 
-    tiempo_extraccion = num_paginas * tiempo_por_pagina
-    tiempo_zip = (num_paginas * tiempo_zip_por_archivo) if crear_zip else 0
-    tiempo_total = tiempo_extraccion + tiempo_zip
+        muestras = calibracion['muestras']
+        apertura = calibracion['segundos_apertura']
+        tiempos_extraccion = [muestra[1] for muestra in muestras]
+        tiempos_zip = [muestra[2] if crear_zip else 0.0 for muestra in muestras]
 
-    # Ajustar por paralelización (asumiendo 4 cores)
-    workers = max(1, cpu_count() - 1)
-    tiempo_total_paralelo = tiempo_total / min(workers, 4)
+        # Páginas más pesadas tardan más: si se conocen sus bytes, escalar por ellos
+        bytes_paginas = None
+        if ruta_pdf is not None:
+            indice = indice_paginas.buscar(ruta_pdf)
+            if indice:
+                bytes_paginas = indice.get('bytes_paginas')
+
+        if bytes_paginas:
+            inicio, fin = 0, len(bytes_paginas)
+            if rango_paginas:
+                inicio, fin = max(0, rango_paginas[0] - 1), min(len(bytes_paginas), rango_paginas[1])
+            if paginas_seleccionadas:
+                bytes_rango = sum(bytes_paginas[pagina - 1] for pagina in paginas_seleccionadas
+                                  if 0 < pagina <= len(bytes_paginas))
+            else:
+                bytes_rango = sum(bytes_paginas[inicio:fin])
+            coste = [max(1, bytes_paginas[muestra[0]]) for muestra in muestras]
+            factores = [(extraccion + zip_) / peso
+                        for extraccion, zip_, peso in zip(tiempos_extraccion, tiempos_zip, coste)]
+            segundos_extraccion = statistics.median(
+                extraccion / peso for extraccion, peso in zip(tiempos_extraccion, coste)) * bytes_rango
+            segundos_zip = statistics.median(
+                zip_ / peso for zip_, peso in zip(tiempos_zip, coste)) * bytes_rango
+            bajo, alto = (factor * bytes_rango for factor in _cuartiles(factores))
+        else:
+            tiempos = [extraccion + zip_ for extraccion, zip_ in zip(tiempos_extraccion, tiempos_zip)]
+            segundos_extraccion = statistics.median(tiempos_extraccion) * num_paginas
+            segundos_zip = statistics.median(tiempos_zip) * num_paginas
+            bajo, alto = (tiempo * num_paginas for tiempo in _cuartiles(tiempos))
+
+        # Rango de confianza relativo a partir de la dispersión de la muestra
+        total = segundos_extraccion + segundos_zip
+        rango = (min(bajo, total) / total if total else 1.0,
+                 max(alto, total) / total if total else 1.0)
+        calibrado = True
+
+    # Reparto entre procesos: cada uno abre el PDF una vez y trabaja en paralelo,
+    # pero no hay más paralelismo real que núcleos disponibles
+    paralelismo = min(workers, cpus_efectivas()) * _EFICIENCIA_PARALELA
+    segundos = (segundos_extraccion + segundos_zip) / paralelismo + apertura
 
     return {
-        'minutos': int(tiempo_total_paralelo / 60),
-        'horas': int(tiempo_total_paralelo / 3600),
+        'segundos': segundos,
+        'segundos_min': segundos * rango[0],
+        'segundos_max': segundos * rango[1],
+        'segundos_extraccion': segundos_extraccion / paralelismo,
+        'segundos_zip': segundos_zip / paralelismo,
+        'segundos_trabajo': segundos_extraccion + segundos_zip,
+        'segundos_apertura': apertura,
+        'workers': workers,
+        'calibrado': calibrado,
+        'minutos': int(segundos / 60),
+        'horas': int(segundos / 3600),
         'advertencia_muy_grande': num_paginas > 100000
-    }
\ No newline at end of file
+    }
+
+
+def elegir_backend(num_paginas, tamano_archivo, max_workers=None, estimacion=None,
+                   crear_zip=True):
+    """
+    Elige cómo ejecutar una división: en el propio hilo, con hilos o con procesos.
+
+    Arrancar procesos cuesta (mucho más en Windows, que usa spawn) y cada uno
+    abre el PDF de nuevo; para documentos pequeños eso supera al trabajo.
+    Los hilos no arrancan nada, pero el GIL deja en paralelo solo la escritura
+    y la compresión. Se estima el tiempo de cada opción y se elige el menor.
+
+    Args:
+        num_paginas (int): Páginas a procesar
+        tamano_archivo (int): Tamaño del PDF en bytes
+        max_workers (int, optional): Procesos o hilos disponibles (default: CPUs efectivas - 1)
+        estimacion (dict, optional): Resultado de estimar_tiempo_procesamiento; si está
+                                     calibrado se usa el coste medido por página
+        crear_zip (bool): Si se creará ZIP (solo sin estimación calibrada)
+
+    Returns:
+        str: BACKEND_SECUENCIAL, BACKEND_HILOS o BACKEND_PROCESOS
+    """
+    workers = max(1, int(max_workers) if max_workers else workers_por_defecto()[0])
+    workers = max(1, min(workers, num_paginas or 1))
+
+    if estimacion and estimacion.get('calibrado') and 'segundos_trabajo' in estimacion:
+        trabajo = estimacion['segundos_trabajo']
+        apertura = estimacion['segundos_apertura']
+    else:
+        por_pagina = _SEGUNDOS_POR_PAGINA + (_SEGUNDOS_ZIP_POR_PAGINA if crear_zip else 0.0)
+        trabajo = num_paginas * por_pagina
+        apertura = tamano_archivo / (1024 * 1024) * _SEGUNDOS_APERTURA_POR_MB
+
+    if trabajo < _SEGUNDOS_TRABAJO_SECUENCIAL or workers == 1 and trabajo < _SEGUNDOS_TRABAJO_PROCESOS:
+        return BACKEND_SECUENCIAL
+    if trabajo > _SEGUNDOS_TRABAJO_PROCESOS:
+        return BACKEND_PROCESOS
+
+    # Cada hilo abre su propio lector, y las aperturas compiten por el GIL
+    tiempos = {
+        BACKEND_SECUENCIAL: apertura + trabajo,
+        BACKEND_HILOS: apertura * workers
+                       + trabajo * (_FRACCION_GIL + (1 - _FRACCION_GIL) / workers),
+        BACKEND_PROCESOS: pool_manager.coste_arranque(workers) + apertura
+                          + trabajo / (min(workers, cpus_efectivas()) * _EFICIENCIA_PARALELA),
+    }
+    return min(tiempos, key=tiempos.get)
@@ -0,0 +1,755 @@
+# utils/pdf_raw.py - Extracción de páginas copiando los bytes originales de los objetos
+import mmap
+import re
+from collections import deque
+
+import PyPDF2
+
+from app.utils.poda_recursos import (
+    CATEGORIAS_PODABLES,
+    datos_contenido,
+    nombre_usado,
+    nombres_usados,
+    recursos_pagina,
+)
+
+# Delimitadores y tokens de la sintaxis PDF
+_RE_ESPACIOS = re.compile(rb'(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)*')
+_RE_TOKEN = re.compile(
+    rb'(?P<ref>(?P<num>\d+)\s+(?P<gen>\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%]))'
+    rb'|(?P<cadena>\()'
+    rb'|(?P<hex><(?!<)[^>]*>)'
+    rb'|(?P<comentario>%[^\r\n]*)'
+    rb'|(?P<nombre>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)'
+    rb'|(?P<otro><<|>>|[\[\]{}]|[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)'
+)
+_RE_NOMBRE = re.compile(rb'/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*')
+_RE_PALABRA = re.compile(rb'[^\x00\t\n\x0c\r ()<>\[\]{}/%]+')
+_RE_REFERENCIA = re.compile(rb'(\d+)\s+(\d+)\s+R(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])')
+_RE_CABECERA_OBJETO = re.compile(rb'\s*(\d+)\s+(\d+)\s+obj')
+_RE_VERSION = re.compile(rb'%PDF-(\d\.\d)')
+_RE_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+_RE_SUBSECCION_XREF = re.compile(rb'(\d+)\s+(\d+)[ \t]*(?:\r\n|\r|\n)')
+_RE_ENTRADA_XREF = re.compile(rb'(\d{10}) (\d{5}) ([nf])')
+
+# Atributos de página que se heredan de los nodos /Pages
+_ATRIBUTOS_HEREDABLES = (b'/Resources', b'/MediaBox', b'/CropBox', b'/Rotate')
+
+_CATEGORIAS_PODABLES = {categoria.encode('ascii') for categoria in CATEGORIAS_PODABLES}
+
+# Límite de objetos y object streams decodificados que se mantienen en memoria
+_MAX_CACHE_OBJETOS = 20000
+_MAX_CACHE_OBJSTM = 64
+
+
+class PdfCrudoNoSoportado(Exception):
+    """El documento usa algo que el motor crudo no puede copiar byte a byte"""
+
+
+def _saltar_espacios(datos, pos):
+    """Avanza sobre espacios en blanco y comentarios"""
+    return _RE_ESPACIOS.match(datos, pos).end()
+
+
+def _fin_cadena(datos, pos):
+    """Devuelve la posición siguiente al cierre de una cadena literal que empieza en pos"""
+    profundidad = 0
+    total = len(datos)
+    while pos < total:
+        caracter = datos[pos]
+        if caracter == 0x5C:  # '\' escapa el siguiente carácter
+            pos += 2
+            continue
+        if caracter == 0x28:  # '('
+            profundidad += 1
+        elif caracter == 0x29:  # ')'
+            profundidad -= 1
+            if profundidad == 0:
+                return pos + 1
+        pos += 1
+    raise PdfCrudoNoSoportado("Cadena literal sin cerrar")
+
+
+def _fin_valor(datos, pos):
+    """Devuelve la posición donde termina el valor PDF que empieza en pos"""
+    inicio = datos[pos:pos + 2]
+
+    if inicio == b'<<':
+        pos = _saltar_espacios(datos, pos + 2)
+        while datos[pos:pos + 2] != b'>>':
+            if datos[pos:pos + 1] != b'/':
+                raise PdfCrudoNoSoportado(f"Diccionario mal formado en la posición {pos}")
+            pos = _saltar_espacios(datos, _RE_NOMBRE.match(datos, pos).end())
+            pos = _saltar_espacios(datos, _fin_valor(datos, pos))
+        return pos + 2
+
+    if inicio[:1] == b'[':
+        pos = _saltar_espacios(datos, pos + 1)
+        while datos[pos:pos + 1] != b']':
+            if pos >= len(datos):
+                raise PdfCrudoNoSoportado("Array sin cerrar")
+            pos = _saltar_espacios(datos, _fin_valor(datos, pos))
+        return pos + 1
+
+    if inicio[:1] == b'(':
+        return _fin_cadena(datos, pos)
+
+    if inicio[:1] == b'<':
+        # mmap no tiene index(), solo find()
+        fin = datos.find(b'>', pos)
+        if fin == -1:
+            raise PdfCrudoNoSoportado("Cadena hexadecimal sin cerrar")
+        return fin + 1
+
+    if inicio[:1] == b'/':
+        return _RE_NOMBRE.match(datos, pos).end()
+
+    referencia = _RE_REFERENCIA.match(datos, pos)
+    if referencia:
+        return referencia.end()
+
+    palabra = _RE_PALABRA.match(datos, pos)
+    if not palabra:
+        raise PdfCrudoNoSoportado(f"Valor no reconocido en la posición {pos}")
+    return palabra.end()
+
+
+def _entradas_diccionario(datos, pos):
+    """
+    Lee las entradas de primer nivel de un diccionario sin decodificar sus valores.
+
+    Returns:
+        dict: {nombre (bytes): (inicio_valor, fin_valor)}
+    """
+    if datos[pos:pos + 2] != b'<<':
+        return {}
+
+    entradas = {}
+    pos = _saltar_espacios(datos, pos + 2)
+    while datos[pos:pos + 2] != b'>>':
+        fin_nombre = _RE_NOMBRE.match(datos, pos).end()
+        nombre = bytes(datos[pos:fin_nombre])
+        inicio_valor = _saltar_espacios(datos, fin_nombre)
+        fin_valor = _fin_valor(datos, inicio_valor)
+        entradas[nombre] = (inicio_valor, fin_valor)
+        pos = _saltar_espacios(datos, fin_valor)
+    return entradas
+
+
+def _iterar_referencias(datos, inicio, fin):
+    """Recorre las referencias indirectas 'n g R' del rango, ignorando cadenas y comentarios"""
+    pos = inicio
+    while True:
+        token = _RE_TOKEN.search(datos, pos, fin)
+        if not token:
+            return
+        if token.group('cadena'):
+            pos = _fin_cadena(datos, token.start())
+            continue
+        if token.group('ref'):
+            yield token.start(), token.end(), int(token.group('num')), int(token.group('gen'))
+        pos = token.end()
+
+
+def _reescribir_referencias(datos, inicio, fin, mapear):
+    """
+    Copia el rango sustituyendo cada referencia por lo que devuelva mapear(num, gen).
+
+    Returns:
+        bytes: Texto del valor con las referencias renumeradas
+    """
+    partes = []
+    ultimo = inicio
+    for ref_inicio, ref_fin, num, gen in _iterar_referencias(datos, inicio, fin):
+        partes.append(datos[ultimo:ref_inicio])
+        partes.append(mapear(num, gen))
+        ultimo = ref_fin
+    partes.append(datos[ultimo:fin])
+    return b''.join(partes)
+
+
+class ObjetoCrudo:
+    """Ubicación de un objeto dentro de los bytes del archivo (o de su object stream)"""
+
+    __slots__ = ('datos', 'inicio', 'fin', 'inicio_stream', 'fin_stream')
+
+    def __init__(self, datos, inicio, fin, inicio_stream=None, fin_stream=None):
+        self.datos = datos
+        self.inicio = inicio
+        self.fin = fin
+        self.inicio_stream = inicio_stream
+        self.fin_stream = fin_stream
+
+    @property
+    def tamano(self):
+        """Bytes que ocupa el objeto al copiarlo"""
+        tamano = self.fin - self.inicio
+        if self.inicio_stream is not None:
+            tamano += self.fin_stream - self.inicio_stream
+        return tamano
+
+
+class DocumentoCrudo:
+    """
+    Acceso a las páginas de un PDF a nivel de bytes.
+
+    Lee la tabla xref una sola vez (con PyPDF2, que ya resuelve revisiones
+    incrementales y xref streams) y localiza cada objeto por su offset. Las
+    páginas se extraen copiando los bytes de los objetos que necesitan, con
+    las referencias renumeradas, sin decodificar ni volver a serializar nada.
+    """
+
+    def __init__(self, ruta_pdf):
+        self.ruta_pdf = ruta_pdf
+        self._archivo = open(ruta_pdf, 'rb')
+        try:
+            self._datos = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._lector = PyPDF2.PdfReader(self._archivo, strict=False)
+
+            if self._lector.is_encrypted:
+                raise PdfCrudoNoSoportado("El motor crudo no admite PDFs cifrados")
+
+            version = _RE_VERSION.search(self._datos, 0, 1024)
+            self.version = version.group(1) if version else b'1.7'
+
+            self._cache_objetos = {}
+            self._cache_objstm = {}
+            self._recorrer_arbol_paginas()
+        except Exception:
+            self.cerrar()
+            raise
+
+    def cerrar(self):
+        """Libera el mapeo de memoria y el archivo"""
+        if getattr(self, '_datos', None) is not None:
+            self._datos.close()
+            self._datos = None
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    @property
+    def total_paginas(self):
+        return len(self._paginas)
+
+    # ------------------------------------------------------------------
+    # Lectura de objetos
+    # ------------------------------------------------------------------
+
+    def _leer_objeto(self, num):
+        """Devuelve el ObjetoCrudo del número indicado o None si no existe"""
+        objeto = self._cache_objetos.get(num)
+        if objeto is not None:
+            return objeto
+
+        if num in self._lector.xref_objStm:
+            num_stream, indice = self._lector.xref_objStm[num]
+            objeto = self._leer_de_objstm(num_stream, indice)
+        else:
+            offset = None
+            for generacion, tabla in self._lector.xref.items():
+                if generacion != 65535 and num in tabla:
+                    offset = tabla[num]
+                    break
+            if offset is None:
+                return None
+            objeto = self._leer_en_offset(num, offset)
+
+        if len(self._cache_objetos) >= _MAX_CACHE_OBJETOS:
+            self._cache_objetos.clear()
+        self._cache_objetos[num] = objeto
+        return objeto
+
+    def _leer_en_offset(self, num, offset):
+        """Localiza el valor (y el stream, si lo hay) de un objeto guardado en el archivo"""
+        datos = self._datos
+        cabecera = _RE_CABECERA_OBJETO.match(datos, offset)
+        if not cabecera or int(cabecera.group(1)) != num:
+            raise PdfCrudoNoSoportado(f"La xref no apunta al objeto {num}")
+
+        inicio = _saltar_espacios(datos, cabecera.end())
+        fin = _fin_valor(datos, inicio)
+
+        pos = _saltar_espacios(datos, fin)
+        if datos[pos:pos + 6] != b'stream':
+            return ObjetoCrudo(datos, inicio, fin)
+
+        pos += 6
+        if datos[pos:pos + 2] == b'\r\n':
+            pos += 2
+        elif datos[pos:pos + 1] in (b'\n', b'\r'):
+            pos += 1
+
+        longitud = self._longitud_stream(datos, inicio)
+        fin_stream = pos + longitud
+        cierre = _saltar_espacios(datos, fin_stream)
+        if longitud < 0 or datos[cierre:cierre + 9] != b'endstream':
+            raise PdfCrudoNoSoportado(f"/Length incorrecto en el objeto {num}")
+
+        return ObjetoCrudo(datos, inicio, fin, pos, fin_stream)
+
+    def _longitud_stream(self, datos, inicio_diccionario):
+        """Valor de /Length del diccionario de un stream (directo o indirecto)"""
+        entradas = _entradas_diccionario(datos, inicio_diccionario)
+        if b'/Length' not in entradas:
+            raise PdfCrudoNoSoportado("Stream sin /Length")
+
+        inicio, fin = entradas[b'/Length']
+        referencia = _RE_REFERENCIA.match(datos, inicio)
+        if referencia:
+            objeto = self._leer_objeto(int(referencia.group(1)))
+            if objeto is None:
+                raise PdfCrudoNoSoportado("/Length apunta a un objeto inexistente")
+            return int(objeto.datos[objeto.inicio:objeto.fin])
+        return int(datos[inicio:fin])
+
+    def _leer_de_objstm(self, num_stream, indice):
+        """Extrae el texto de un objeto guardado dentro de un object stream"""
+        contenido = self._cache_objstm.get(num_stream)
+        if contenido is None:
+            stream = self._lector.get_object(num_stream)
+            datos = stream.get_data()
+            primero = int(stream['/First'])
+            numeros = datos[:primero].split()
+            offsets = [primero + int(off) for off in numeros[1::2]]
+            offsets.append(len(datos))
+            contenido = (datos, offsets)
+
+            if len(self._cache_objstm) >= _MAX_CACHE_OBJSTM:
+                self._cache_objstm.clear()
+            self._cache_objstm[num_stream] = contenido
+
+        datos, offsets = contenido
+        inicio = _saltar_espacios(datos, offsets[indice])
+        return ObjetoCrudo(datos, inicio, _fin_valor(datos, inicio))
+
+    def _entradas(self, num):
+        """Entradas de primer nivel del diccionario de un objeto"""
+        objeto = self._leer_objeto(num)
+        if objeto is None:
+            return None, {}
+        return objeto, _entradas_diccionario(objeto.datos, objeto.inicio)
+
+    def _valor_resuelto(self, objeto, entradas, clave):
+        """Devuelve (datos, inicio, fin) del valor de una clave, siguiendo una referencia"""
+        inicio, fin = entradas[clave]
+        referencia = _RE_REFERENCIA.match(objeto.datos, inicio)
+        if referencia and referencia.end() == fin:
+            destino = self._leer_objeto(int(referencia.group(1)))
+            if destino is None:
+                return None
+            return destino.datos, destino.inicio, destino.fin
+        return objeto.datos, inicio, fin
+
+    # ------------------------------------------------------------------
+    # Árbol de páginas
+    # ------------------------------------------------------------------
+
+    def _recorrer_arbol_paginas(self):
+        """Localiza las páginas en orden y los atributos que heredan de sus nodos padre"""
+        raiz = self._lector.trailer.raw_get('/Root')
+        self._num_raiz = raiz.idnum
+
+        catalogo, entradas = self._entradas(self._num_raiz)
+        if b'/Pages' not in entradas:
+            raise PdfCrudoNoSoportado("El catálogo no tiene /Pages")
+        num_arbol = int(_RE_REFERENCIA.match(catalogo.datos, entradas[b'/Pages'][0]).group(1))
+
+        self._paginas = []
+        self._heredados = []
+        self._nodos = set()
+
+        pila = [(num_arbol, {})]
+        while pila:
+            num, heredados = pila.pop()
+            objeto, entradas = self._entradas(num)
+            if objeto is None:
+                continue
+
+            if b'/Kids' not in entradas:
+                self._paginas.append(num)
+                self._heredados.append(heredados)
+                continue
+
+            if num in self._nodos:
+                raise PdfCrudoNoSoportado("Árbol de páginas con ciclos")
+            self._nodos.add(num)
+
+            # Los atributos del nodo sustituyen a los de sus antecesores
+            propios = {clave: (objeto.datos,) + entradas[clave]
+                       for clave in _ATRIBUTOS_HEREDABLES if clave in entradas}
+            if propios:
+                heredados = {**heredados, **propios}
+
+            hijos = self._valor_resuelto(objeto, entradas, b'/Kids')
+            if hijos is None:
+                continue
+            datos_hijos, inicio, fin = hijos
+            referencias = [num_hijo for _, _, num_hijo, _ in _iterar_referencias(datos_hijos, inicio, fin)]
+            pila.extend((num_hijo, heredados) for num_hijo in reversed(referencias))
+
+        self._nums_paginas = set(self._paginas)
+
+    def numero_objeto_pagina(self, indice):
+        """Número de objeto de la página (índice 0-based)"""
+        return self._paginas[indice]
+
+    def offset_objeto(self, num):
+        """Offset del objeto en el archivo, o None si está dentro de un object stream"""
+        if num in self._lector.xref_objStm:
+            return None
+        for generacion, tabla in self._lector.xref.items():
+            if generacion != 65535 and num in tabla:
+                return tabla[num]
+        return None
+
+    def bytes_pagina(self, indice):
+        """
+        Bytes de los objetos que necesita la página (diccionario, contenido y recursos).
+
+        Es aproximadamente lo que ocupa la página extraída por separado; los
+        recursos compartidos cuentan en cada página que los usa.
+
+        Args:
+            indice (int): Índice 0-based de la página
+
+        Returns:
+            int: Total de bytes de los objetos alcanzables desde la página
+        """
+        num_pagina = self._paginas[indice]
+        objeto, entradas = self._entradas(num_pagina)
+        total = objeto.tamano
+        rangos = [(objeto.datos, inicio, fin) for clave, (inicio, fin) in entradas.items()
+                  if clave != b'/Parent']
+        rangos.extend(self._heredados[indice].values())
+
+        visitados = {num_pagina}
+        while rangos:
+            datos, inicio, fin = rangos.pop()
+            for _, _, num, _ in _iterar_referencias(datos, inicio, fin):
+                if (num in visitados or num in self._nums_paginas
+                        or num in self._nodos or num == self._num_raiz):
+                    continue
+                visitados.add(num)
+                destino = self._leer_objeto(num)
+                if destino is not None:
+                    total += destino.tamano
+                    rangos.append((destino.datos, destino.inicio, destino.fin))
+        return total
+
+    # ------------------------------------------------------------------
+    # Poda de recursos
+    # ------------------------------------------------------------------
+
+    def _resolver(self, datos, inicio, fin):
+        """(datos, inicio, fin) del valor, siguiendo una referencia; None si no existe"""
+        referencia = _RE_REFERENCIA.match(datos, inicio)
+        if referencia and referencia.end() == fin:
+            destino = self._leer_objeto(int(referencia.group(1)))
+            if destino is None:
+                return None
+            return destino.datos, destino.inicio, destino.fin
+        return datos, inicio, fin
+
+    def _nombres_usados_pagina(self, indice):
+        """Nombres que usa el contenido de la página (None si no se puede leer: no se poda)"""
+        try:
+            pagina = self._lector.get_object(self._paginas[indice])
+            recursos = recursos_pagina(pagina)
+            if recursos is None:
+                return None
+            return nombres_usados(datos_contenido(pagina.get('/Contents')), recursos)
+        except Exception:
+            return None
+
+    def _recursos_podados(self, datos, inicio, fin, usados, mapear):
+        """
+        Copia un diccionario /Resources dejando en cada categoría solo las entradas usadas.
+
+        Las categorías se escriben como diccionarios directos; las entradas que
+        quedan conservan sus referencias (renumeradas con mapear).
+        """
+        resuelto = self._resolver(datos, inicio, fin)
+        if resuelto is None or resuelto[0][resuelto[1]:resuelto[1] + 2] != b'<<':
+            return _reescribir_referencias(datos, inicio, fin, mapear)
+        datos, inicio, _ = resuelto
+
+        partes = [b'<<']
+        for clave, (inicio_valor, fin_valor) in _entradas_diccionario(datos, inicio).items():
+            categoria = None
+            if clave in _CATEGORIAS_PODABLES:
+                categoria = self._resolver(datos, inicio_valor, fin_valor)
+            if categoria is None or categoria[0][categoria[1]:categoria[1] + 2] != b'<<':
+                partes.append(clave + b' ' + _reescribir_referencias(datos, inicio_valor, fin_valor, mapear))
+                continue
+
+            datos_categoria, inicio_categoria, _ = categoria
+            partes.append(clave + b'<<')
+            for nombre, (inicio_entrada, fin_entrada) in _entradas_diccionario(
+                    datos_categoria, inicio_categoria).items():
+                if nombre_usado(nombre, usados):
+                    partes.append(nombre + b' ' + _reescribir_referencias(
+                        datos_categoria, inicio_entrada, fin_entrada, mapear))
+            partes.append(b'>>')
+        partes.append(b'>>')
+        return b'\n'.join(partes)
+
+    def _formulario_podado(self, num, objeto, mapear):
+        """
+        Diccionario de un formulario (form XObject) con sus /Resources propios
+        podados, o None si el objeto no es un formulario con recursos propios.
+        """
+        entradas = _entradas_diccionario(objeto.datos, objeto.inicio)
+        subtipo = entradas.get(b'/Subtype')
+        if (b'/Resources' not in entradas or subtipo is None
+                or objeto.datos[subtipo[0]:subtipo[1]] != b'/Form'):
+            return None
+        try:
+            formulario = self._lector.get_object(num)
+            usados = nombres_usados(formulario.get_data(), formulario['/Resources'].get_object())
+        except Exception:
+            return None
+
+        partes = [b'<<']
+        for clave, (inicio, fin) in entradas.items():
+            if clave == b'/Resources':
+                valor = self._recursos_podados(objeto.datos, inicio, fin, usados, mapear)
+            else:
+                valor = _reescribir_referencias(objeto.datos, inicio, fin, mapear)
+            partes.append(clave + b' ' + valor)
+        partes.append(b'>>')
+        return b'\n'.join(partes)
+
+    # ------------------------------------------------------------------
+    # Extracción
+    # ------------------------------------------------------------------
+
+    def _diccionario_pagina(self, indice, mapear, num_padre, usados=None):
+        """
+        Reescribe el diccionario de la página sin /Parent y con los atributos heredados.
+
+        Con usados (ver _nombres_usados_pagina) los recursos se copian podados.
+        """
+        objeto, entradas = self._entradas(self._paginas[indice])
+        datos = objeto.datos
+
+        def valor(datos_valor, inicio, fin, clave):
+            if clave == b'/Resources' and usados is not None:
+                return self._recursos_podados(datos_valor, inicio, fin, usados, mapear)
+            return _reescribir_referencias(datos_valor, inicio, fin, mapear)
+
+        partes = [b'<<']
+        for clave, (inicio, fin) in entradas.items():
+            if clave == b'/Parent':
+                continue
+            partes.append(clave + b' ' + valor(datos, inicio, fin, clave))
+
+        for clave, (datos_heredado, inicio, fin) in self._heredados[indice].items():
+            if clave not in entradas:
+                partes.append(clave + b' ' + valor(datos_heredado, inicio, fin, clave))
+
+        partes.append(b'/Parent %d 0 R>>' % num_padre)
+        return b'\n'.join(partes)
+
+    def extraer_paginas(self, indices, podar_recursos=False):
+        """
+        Genera un PDF con las páginas indicadas copiando los bytes de sus objetos.
+
+        Args:
+            indices (list): Índices 0-based de las páginas, en el orden de salida
+            podar_recursos (bool): Copiar solo los recursos que usa el contenido de
+                                   cada página (y de sus formularios)
+
+        Returns:
+            bytes: Contenido del PDF resultante
+        """
+        # 1 = catálogo, 2 = nodo /Pages, 3.. = una entrada por página de salida
+        num_catalogo, num_arbol = 1, 2
+        nuevos_numeros = {}
+        for posicion, indice in enumerate(indices):
+            nuevos_numeros.setdefault(self._paginas[indice], 3 + posicion)
+
+        siguiente = [3 + len(indices)]
+        pendientes = deque()
+
+        def mapear(num, gen):
+            nuevo = nuevos_numeros.get(num)
+            if nuevo is not None:
+                return b'%d 0 R' % nuevo
+
+            # No seguir enlaces al resto del documento (otras páginas, árbol, catálogo)
+            if num in self._nums_paginas or num in self._nodos or num == self._num_raiz:
+                return b'null'
+            if self._leer_objeto(num) is None:
+                return b'null'
+
+            nuevo = siguiente[0]
+            siguiente[0] += 1
+            nuevos_numeros[num] = nuevo
+            pendientes.append(num)
+            return b'%d 0 R' % nuevo
+
+        cuerpos = [
+            (num_catalogo, b'<</Type/Catalog/Pages 2 0 R>>', None),
+            (num_arbol, b'<</Type/Pages/Kids[' + b' '.join(
+                b'%d 0 R' % (3 + posicion) for posicion in range(len(indices))
+            ) + b']/Count %d>>' % len(indices), None),
+        ]
+
+        for posicion, indice in enumerate(indices):
+            usados = self._nombres_usados_pagina(indice) if podar_recursos else None
+            cuerpos.append((3 + posicion, self._diccionario_pagina(indice, mapear, num_arbol, usados), None))
+
+        while pendientes:
+            num = pendientes.popleft()
+            objeto = self._leer_objeto(num)
+            valor = None
+            stream = None
+            if objeto.inicio_stream is not None:
+                stream = objeto.datos[objeto.inicio_stream:objeto.fin_stream]
+                if podar_recursos:
+                    valor = self._formulario_podado(num, objeto, mapear)
+            if valor is None:
+                valor = _reescribir_referencias(objeto.datos, objeto.inicio, objeto.fin, mapear)
+            cuerpos.append((nuevos_numeros[num], valor, stream))
+
+        return self._serializar(cuerpos, siguiente[0])
+
+    def _serializar(self, cuerpos, total_objetos):
+        """Escribe los objetos y una tabla xref nueva"""
+        partes = [b'%PDF-' + self.version + b'\n%\xe2\xe3\xcf\xd3\n']
+        posicion = len(partes[0])
+        offsets = [0] * total_objetos
+
+        for num, valor, stream in sorted(cuerpos, key=lambda cuerpo: cuerpo[0]):
+            offsets[num] = posicion
+            if stream is None:
+                bloque = b'%d 0 obj\n%s\nendobj\n' % (num, valor)
+            else:
+                bloque = b'%d 0 obj\n%s\nstream\n%s\nendstream\nendobj\n' % (num, valor, stream)
+            partes.append(bloque)
+            posicion += len(bloque)
+
+        xref = [b'xref\n0 %d\n0000000000 65535 f \n' % total_objetos]
+        xref.extend(b'%010d 00000 n \n' % offset for offset in offsets[1:])
+        xref.append(b'trailer\n<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n'
+                    % (total_objetos, posicion))
+        partes.extend(xref)
+        return b''.join(partes)
+
+
+def contar_paginas_rapido(ruta_pdf):
+    """
+    Lee el número de páginas del /Count del árbol de páginas sin recorrerlo.
+
+    Solo se leen el trailer, las entradas de la xref del catálogo y del nodo
+    /Pages y esos dos objetos, así que el coste no depende del tamaño del PDF.
+    Si el archivo usa xref streams (o algo que no se pueda leer así) se recurre
+    a PyPDF2, que tampoco recorre el árbol para leer /Count.
+
+    Args:
+        ruta_pdf (str): Ruta del PDF
+
+    Returns:
+        int: Número de páginas que declara el documento
+    """
+    with open(ruta_pdf, 'rb') as archivo:
+        datos = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _contar_con_xref_clasica(datos)
+        except (PdfCrudoNoSoportado, ValueError, AttributeError):
+            pass
+        finally:
+            datos.close()
+
+        archivo.seek(0)
+        lector = PyPDF2.PdfReader(archivo, strict=False)
+        return int(lector.trailer['/Root']['/Pages']['/Count'])
+
+
+def _contar_con_xref_clasica(datos):
+    """contar_paginas_rapido para archivos con tablas xref tradicionales"""
+    cola = datos[max(0, len(datos) - 2048):]
+    posiciones = list(_RE_STARTXREF.finditer(cola))
+    if not posiciones:
+        raise PdfCrudoNoSoportado("No se encontró startxref")
+    offset_xref = int(posiciones[-1].group(1))
+
+    # Secciones xref desde la más reciente siguiendo /Prev
+    secciones = []
+    visitadas = set()
+    while offset_xref is not None and offset_xref not in visitadas:
+        visitadas.add(offset_xref)
+        subsecciones, trailer = _leer_seccion_xref(datos, offset_xref)
+        secciones.append(subsecciones)
+        if b'/XRefStm' in trailer:
+            raise PdfCrudoNoSoportado("Archivo híbrido con xref stream")
+        if len(secciones) == 1:
+            if b'/Root' not in trailer:
+                raise PdfCrudoNoSoportado("El trailer no tiene /Root")
+            inicio, fin = trailer[b'/Root']
+            num_raiz = int(_RE_REFERENCIA.match(datos, inicio).group(1))
+        offset_xref = int(datos[slice(*trailer[b'/Prev'])]) if b'/Prev' in trailer else None
+
+    def leer(num):
+        for subsecciones in secciones:
+            for primero, cantidad, inicio_entradas in subsecciones:
+                if primero <= num < primero + cantidad:
+                    entrada = _RE_ENTRADA_XREF.match(datos, inicio_entradas + 20 * (num - primero))
+                    if not entrada:
+                        raise PdfCrudoNoSoportado("Entrada xref mal formada")
+                    if entrada.group(3) != b'n':
+                        return None
+                    cabecera = _RE_CABECERA_OBJETO.match(datos, int(entrada.group(1)))
+                    if not cabecera or int(cabecera.group(1)) != num:
+                        raise PdfCrudoNoSoportado(f"La xref no apunta al objeto {num}")
+                    inicio = _saltar_espacios(datos, cabecera.end())
+                    return inicio, _entradas_diccionario(datos, inicio)
+        return None
+
+    def valor(entradas, clave):
+        if clave not in entradas:
+            raise PdfCrudoNoSoportado(f"Falta {clave.decode()}")
+        inicio, fin = entradas[clave]
+        referencia = _RE_REFERENCIA.match(datos, inicio)
+        if referencia and referencia.end() == fin:
+            objeto = leer(int(referencia.group(1)))
+            if objeto is None:
+                raise PdfCrudoNoSoportado(f"{clave} apunta a un objeto inexistente")
+            inicio = objeto[0]
+            fin = _fin_valor(datos, inicio)
+        return inicio, fin
+
+    catalogo = leer(num_raiz)
+    if catalogo is None:
+        raise PdfCrudoNoSoportado("No se encontró el catálogo")
+    inicio, _ = valor(catalogo[1], b'/Pages')
+    arbol = _entradas_diccionario(datos, inicio)
+    return int(datos[slice(*valor(arbol, b'/Count'))])
+
+
+def _leer_seccion_xref(datos, offset):
+    """
+    Localiza las subsecciones de una tabla xref sin leer sus entradas.
+
+    Returns:
+        tuple: ([(primer_objeto, cantidad, offset_entradas)], entradas del trailer)
+    """
+    if datos[offset:offset + 4] != b'xref':
+        raise PdfCrudoNoSoportado("La xref no es una tabla tradicional")
+
+    subsecciones = []
+    pos = _saltar_espacios(datos, offset + 4)
+    while datos[pos:pos + 7] != b'trailer':
+        cabecera = _RE_SUBSECCION_XREF.match(datos, pos)
+        if not cabecera:
+            raise PdfCrudoNoSoportado("Subsección xref mal formada")
+        primero, cantidad = int(cabecera.group(1)), int(cabecera.group(2))
+        subsecciones.append((primero, cantidad, cabecera.end()))
+        # Cada entrada ocupa exactamente 20 bytes
+        pos = _saltar_espacios(datos, cabecera.end() + 20 * cantidad)
+
+    trailer = _entradas_diccionario(datos, _saltar_espacios(datos, pos + 7))
+    if b'/Root' not in trailer and not subsecciones:
+        raise PdfCrudoNoSoportado("Trailer sin /Root")
+    return subsecciones, trailer
@@ -0,0 +1,155 @@
+# utils/planificador.py - Reparto adaptativo de las páginas en bloques para los workers
+import time
+from array import array
+
+from app.utils.metricas import memoria_disponible
+
+# Páginas que se planifican juntas cuando no se indica batch_size
+PAGINAS_POR_VENTANA = 2000
+
+# Duración buscada de cada bloque: suficiente para amortizar el envío al
+# worker y corta para que ningún bloque alargue el final del trabajo
+SEGUNDOS_POR_BLOQUE = 1.0
+
+# Salida máxima de un bloque: sus páginas y entradas ZIP llegan juntas al proceso principal
+BYTES_MAX_BLOQUE = 64 * 1024 * 1024
+
+# Fracción de la memoria libre que pueden ocupar los bloques en vuelo
+_FRACCION_MEMORIA = 0.25
+
+# Bloques en vuelo por worker (el que procesa y el siguiente, ver PoolManager)
+_BLOQUES_EN_VUELO_POR_WORKER = 2
+
+
+def costes_paginas(indice, tamano_archivo):
+    """
+    Coste relativo de cada página a partir del índice de páginas.
+
+    Usa los bytes de cada página si el índice los tiene; si no, el tramo del
+    archivo entre el objeto de la página y el siguiente objeto página, que en
+    la mayoría de los PDF incluye su contenido e imágenes.
+
+    Args:
+        indice (dict): Índice de indice_paginas
+        tamano_archivo (int): Tamaño del PDF en bytes
+
+    Returns:
+        array | None: Coste de cada página (0-based), o None si el índice no tiene offsets
+    """
+    if indice.get('bytes_paginas'):
+        return array('q', (max(1, tamano) for tamano in indice['bytes_paginas']))
+
+    offsets = indice.get('offsets')
+    if not offsets:
+        return None
+
+    costes = array('q', bytes(8 * len(offsets)))
+    orden = sorted(range(len(offsets)), key=offsets.__getitem__)
+    for posicion, pagina in enumerate(orden):
+        siguiente = offsets[orden[posicion + 1]] if posicion + 1 < len(orden) else tamano_archivo
+        costes[pagina] = max(1, siguiente - offsets[pagina])
+    return costes
+
+
+class PlanificadorBloques:
+    """
+    Reparte las páginas pendientes en bloques contiguos de tamaño adaptativo.
+
+    - Tamaño: con el rendimiento observado, cada bloque dura unos
+      SEGUNDOS_POR_BLOQUE y su salida cabe en la memoria libre.
+    - Orden: dentro de cada ventana de páginas, los bloques más caros (según
+      el coste de sus páginas) salen primero y no se quedan para el final.
+    - Final del trabajo: los bloques encogen según queda menos trabajo por
+      repartir, así los workers que terminan antes se llevan lo que falta en
+      trozos pequeños en lugar de esperar a uno que tiene un bloque grande.
+
+    Es un iterable de (inicio, fin) que se consume a medida que los workers
+    quedan libres; registrar() le informa de cada bloque terminado. Se usa
+    desde un solo hilo.
+    """
+
+    def __init__(self, intervalos, workers, costes=None, paginas_por_ventana=None):
+        """
+        Args:
+            intervalos (list): Tuplas (inicio, fin) de páginas pendientes (0-based)
+            workers (int): Procesos o hilos que consumen los bloques
+            costes (array, optional): Coste de cada página (ver costes_paginas);
+                                      sin él todas las páginas cuestan lo mismo
+            paginas_por_ventana (int, optional): Páginas que se planifican juntas
+                                                 (default: PAGINAS_POR_VENTANA)
+        """
+        self.intervalos = intervalos
+        self.workers = max(1, workers)
+        self.costes = costes
+        self.paginas_por_ventana = max(1, paginas_por_ventana or PAGINAS_POR_VENTANA)
+
+        self.coste_total = sum(self._coste(inicio, fin) for inicio, fin in intervalos)
+        self.coste_emitido = 0
+        self.coste_hecho = 0
+        self.bytes_hechos = 0
+        self._inicio = None
+
+    def _coste(self, inicio, fin):
+        if self.costes is None:
+            return fin - inicio
+        return sum(self.costes[inicio:fin])
+
+    def registrar(self, inicio, fin, bytes_generados):
+        """Anota un bloque terminado (fin puede ser menor que el pedido si se canceló)"""
+        self.coste_hecho += self._coste(inicio, fin)
+        self.bytes_hechos += bytes_generados
+
+    def _coste_objetivo(self, coste_ventana):
+        """Coste por bloque según el rendimiento y la memoria (sin el ajuste del final)"""
+        if self.coste_hecho and self._inicio is not None:
+            segundos = time.perf_counter() - self._inicio
+            coste_por_segundo = self.coste_hecho / max(segundos, 1e-6) / self.workers
+            objetivo = coste_por_segundo * SEGUNDOS_POR_BLOQUE
+        else:
+            # Sin mediciones: unos cuantos bloques por worker en la ventana
+            objetivo = coste_ventana / (self.workers * 4)
+
+        # La salida de los bloques en vuelo debe caber en la memoria libre
+        if self.coste_hecho and self.bytes_hechos:
+            bytes_por_coste = self.bytes_hechos / self.coste_hecho
+            presupuesto = BYTES_MAX_BLOQUE
+            disponible = memoria_disponible()
+            if disponible is not None:
+                presupuesto = min(presupuesto, disponible * _FRACCION_MEMORIA
+                                  / (self.workers * _BLOQUES_EN_VUELO_POR_WORKER))
+            objetivo = min(objetivo, presupuesto / bytes_por_coste)
+
+        return objetivo
+
+    def _bloques_ventana(self, inicio, fin):
+        """Parte la ventana [inicio, fin) en bloques contiguos: [(coste, inicio, fin)]"""
+        objetivo_base = self._coste_objetivo(self._coste(inicio, fin))
+        restante = self.coste_total - self.coste_emitido
+
+        bloques = []
+        inicio_bloque, acumulado = inicio, 0
+        for pagina in range(inicio, fin):
+            # Al final del trabajo, bloques cada vez más pequeños
+            objetivo = max(1, min(objetivo_base, restante / (2 * self.workers)))
+            coste = self.costes[pagina] if self.costes is not None else 1
+            if acumulado and acumulado + coste > objetivo:
+                bloques.append((acumulado, inicio_bloque, pagina))
+                restante -= acumulado
+                inicio_bloque, acumulado = pagina, 0
+            acumulado += coste
+        bloques.append((acumulado, inicio_bloque, fin))
+        return bloques
+
+    def __iter__(self):
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+
+        for inicio_intervalo, fin_intervalo in self.intervalos:
+            for inicio_ventana in range(inicio_intervalo, fin_intervalo, self.paginas_por_ventana):
+                fin_ventana = min(inicio_ventana + self.paginas_por_ventana, fin_intervalo)
+
+                # Los más caros primero: si uno tarda, los demás workers siguen con el resto
+                for coste, inicio, fin in sorted(self._bloques_ventana(inicio_ventana, fin_ventana),
+                                                 key=lambda bloque: -bloque[0]):
+                    self.coste_emitido += coste
+                    yield inicio, fin
@@ -0,0 +1,212 @@
+# utils/poda_recursos.py - Poda de los recursos que cada página no usa al extraerla
+import re
+
+from PyPDF2 import PageObject
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, EncodedStreamObject, NameObject
+
+# Categorías de /Resources cuyas entradas se nombran desde el contenido (Tf, Do, gs, cs, scn, sh, BDC).
+# El resto (/ProcSet y claves desconocidas) se copia siempre
+CATEGORIAS_PODABLES = ('/Font', '/XObject', '/ExtGState', '/ColorSpace', '/Pattern', '/Shading', '/Properties')
+
+# Cualquier nombre del contenido, también dentro de cadenas o imágenes en línea:
+# sobran nombres (se conserva algún recurso de más) pero no falta ninguno
+_RE_NOMBRE = re.compile(rb'/([^\x00\t\n\x0c\r ()<>\[\]{}/%]*)')
+_RE_ESCAPE_NOMBRE = re.compile(rb'#([0-9A-Fa-f]{2})')
+
+
+def sin_escapes(nombre):
+    """Nombre en bytes con las secuencias #xx sustituidas por su carácter"""
+    if b'#' not in nombre:
+        return nombre
+    return _RE_ESCAPE_NOMBRE.sub(lambda m: bytes([int(m.group(1), 16)]), nombre)
+
+
+def nombres_contenido(datos):
+    """
+    Nombres que aparecen en un content stream.
+
+    Args:
+        datos (bytes): Contenido decodificado
+
+    Returns:
+        set: Nombres sin la barra y sin secuencias #xx (bytes)
+    """
+    return {sin_escapes(nombre) for nombre in _RE_NOMBRE.findall(datos)}
+
+
+def nombre_usado(clave, usados):
+    """
+    Indica si una entrada de recursos se nombra en el contenido.
+
+    Args:
+        clave (str | bytes): Clave tal como la da PyPDF2 (str, ya sin escapes)
+                             o tal como está en el archivo (bytes, con escapes)
+        usados (set): Resultado de nombres_usados()
+    """
+    if isinstance(clave, str):
+        if not clave.isascii():
+            # PyPDF2 ya decodificó el nombre y no se puede saber con qué bytes se escribió
+            return True
+        clave = clave.encode('ascii')
+    else:
+        clave = sin_escapes(clave)
+    return clave[1:] in usados
+
+
+def datos_contenido(contenido):
+    """Bytes decodificados de /Contents (un stream o un array de streams)"""
+    if contenido is None:
+        return b''
+    contenido = contenido.get_object()
+    if isinstance(contenido, list):
+        return b'\n'.join(parte.get_object().get_data() for parte in contenido)
+    return contenido.get_data()
+
+
+def recursos_pagina(pagina):
+    """/Resources de una página, propios o heredados de sus nodos /Pages (None si no tiene)"""
+    nodo, vistos = pagina, set()
+    while isinstance(nodo, DictionaryObject) and id(nodo) not in vistos:
+        vistos.add(id(nodo))
+        recursos = nodo.get('/Resources')
+        if recursos is not None:
+            recursos = recursos.get_object()
+            return recursos if isinstance(recursos, DictionaryObject) else None
+        padre = nodo.get('/Parent')
+        nodo = padre.get_object() if padre is not None else None
+    return None
+
+
+def _es_formulario(xobjeto):
+    return isinstance(xobjeto, DictionaryObject) and xobjeto.get('/Subtype') == '/Form'
+
+
+def nombres_usados(datos, recursos, visitados=None):
+    """
+    Nombres que usa un contenido, incluidos los de los formularios (form
+    XObjects) que dibuja y que no tienen /Resources propios: esos toman los
+    recursos de quien los dibuja.
+
+    Args:
+        datos (bytes): Contenido decodificado
+        recursos (DictionaryObject | None): Recursos con los que se dibuja
+        visitados (set, optional): Formularios ya recorridos (evita ciclos)
+
+    Returns:
+        set: Nombres (bytes) según nombres_contenido()
+    """
+    usados = nombres_contenido(datos)
+    xobjetos = recursos.get('/XObject') if recursos else None
+    xobjetos = xobjetos.get_object() if xobjetos is not None else None
+    if not isinstance(xobjetos, DictionaryObject):
+        return usados
+
+    visitados = set() if visitados is None else visitados
+    pendientes = [clave for clave in xobjetos if nombre_usado(clave, usados)]
+    while pendientes:
+        referencia = xobjetos.raw_get(pendientes.pop())
+        identificador = getattr(referencia, 'idnum', None) or id(referencia)
+        if identificador in visitados:
+            continue
+        visitados.add(identificador)
+
+        formulario = referencia.get_object()
+        if not _es_formulario(formulario) or '/Resources' in formulario:
+            continue
+        nuevos = nombres_contenido(formulario.get_data()) - usados
+        usados |= nuevos
+        pendientes.extend(clave for clave in xobjetos if nombre_usado(clave, nuevos))
+    return usados
+
+
+def _copiar_formulario(formulario, recursos):
+    """Copia del stream de un formulario con otros /Resources (sin tocar el original)"""
+    if isinstance(formulario, EncodedStreamObject):
+        copia = EncodedStreamObject()
+    else:
+        copia = DecodedStreamObject()
+    copia.update(formulario)
+    copia._data = formulario._data
+    copia[NameObject('/Resources')] = recursos
+    return copia
+
+
+def podar_recursos(recursos, usados, visitados=None):
+    """
+    Diccionario de recursos nuevo con solo las entradas usadas.
+
+    Los formularios usados que tienen recursos propios se sustituyen por una
+    copia con sus recursos podados a su vez. Los objetos del documento de
+    origen no se modifican (el lector se comparte entre trabajos).
+
+    Args:
+        recursos (DictionaryObject): Recursos originales (ya resueltos)
+        usados (set): Resultado de nombres_usados()
+        visitados (set, optional): Formularios ya podados en esta rama (evita ciclos)
+
+    Returns:
+        tuple: (DictionaryObject con los recursos podados, entradas descartadas)
+    """
+    visitados = set() if visitados is None else visitados
+    podados = DictionaryObject()
+    descartadas = 0
+
+    for categoria, valor in recursos.items():
+        entradas = valor.get_object() if valor is not None else None
+        if categoria not in CATEGORIAS_PODABLES or not isinstance(entradas, DictionaryObject):
+            podados[NameObject(categoria)] = recursos.raw_get(categoria)
+            continue
+
+        nuevas = DictionaryObject()
+        for clave in entradas:
+            if not nombre_usado(clave, usados):
+                descartadas += 1
+                continue
+            referencia = entradas.raw_get(clave)
+            if categoria == '/XObject':
+                formulario = referencia.get_object()
+                identificador = getattr(referencia, 'idnum', None) or id(referencia)
+                if (_es_formulario(formulario) and '/Resources' in formulario
+                        and identificador not in visitados):
+                    propios = formulario['/Resources'].get_object()
+                    usados_formulario = nombres_usados(formulario.get_data(), propios)
+                    propios, descartadas_formulario = podar_recursos(
+                        propios, usados_formulario, visitados | {identificador})
+                    if descartadas_formulario:
+                        descartadas += descartadas_formulario
+                        referencia = _copiar_formulario(formulario, propios)
+            nuevas[NameObject(clave)] = referencia
+        podados[NameObject(categoria)] = nuevas
+    return podados, descartadas
+
+
+def podar_pagina(pagina):
+    """
+    Página equivalente con solo los recursos que usa su contenido.
+
+    Pensado para el escritor de PyPDF2, que copia el diccionario /Resources
+    completo en cada archivo aunque la página use una parte. Si el contenido
+    no se puede leer, o no sobra nada, se devuelve la página original.
+
+    Args:
+        pagina (PageObject): Página del lector (con los atributos heredados ya aplicados)
+
+    Returns:
+        PageObject: Página a añadir al escritor
+    """
+    recursos = recursos_pagina(pagina)
+    if recursos is None:
+        return pagina
+
+    try:
+        usados = nombres_usados(datos_contenido(pagina.get('/Contents')), recursos)
+        podados, descartadas = podar_recursos(recursos, usados)
+    except Exception:
+        return pagina
+    if not descartadas:
+        return pagina
+
+    nueva = PageObject(pdf=pagina.pdf)
+    nueva.update(pagina)
+    nueva[NameObject('/Resources')] = podados
+    return nueva
@@ -0,0 +1,336 @@
+# utils/pool_manager.py - Pool de procesos persistente para el procesamiento de PDFs
+import atexit
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+from app.utils.recursos import cpus_efectivas, workers_por_defecto
+
+# Trabajos que pueden compartir el pool a la vez con su propio estado
+MAX_TRABAJOS = 8
+
+# Estado de cada trabajo, visible desde los workers
+ESTADO_EN_CURSO = 0
+ESTADO_PAUSADO = 1
+ESTADO_CANCELADO = 2
+
+# Formas de ejecutar las tareas de un trabajo
+BACKEND_AUTO = "auto"
+BACKEND_SECUENCIAL = "secuencial"   # en el hilo que llama, sin arrancar nada
+BACKEND_HILOS = "hilos"             # pool de hilos del proceso principal
+BACKEND_PROCESOS = "procesos"       # pool de procesos persistente
+
+# Coste aproximado de arrancar un proceso del pool (importar la aplicación incluido).
+# Con "spawn" (Windows, macOS) cada proceso arranca un intérprete nuevo
+_SEGUNDOS_ARRANQUE_FORK = 0.05
+_SEGUNDOS_ARRANQUE_SPAWN = 0.5
+
+# Tareas enviadas por worker: la que ejecuta y la siguiente, para no dejarlo parado
+_TAREAS_EN_VUELO_POR_WORKER = 2
+
+# Copia en cada worker de los arrays compartidos (los recibe al arrancar el proceso)
+_estados_worker = None
+_contadores_worker = None
+
+
+def _inicializar_worker(estados, contadores):
+    """Inicializador de los procesos del pool"""
+    global _estados_worker, _contadores_worker
+    _estados_worker = estados
+    _contadores_worker = contadores
+
+
+def registrar_avance(slot, paginas=1, bytes_generados=0):
+    """
+    Se llama desde los workers por cada página terminada.
+
+    Solo suma en los contadores compartidos del trabajo; el proceso principal
+    los lee a su ritmo (ver MonitorProgreso).
+    """
+    if _contadores_worker is None or slot is None:
+        return
+    with _contadores_worker.get_lock():
+        _contadores_worker[2 * slot] += paginas
+        _contadores_worker[2 * slot + 1] += bytes_generados
+
+
+def esperar_turno(slot, intervalo=0.1):
+    """
+    Se llama desde los workers entre página y página.
+
+    Espera mientras el trabajo esté en pausa (sin consumir CPU) y avisa si se canceló.
+
+    Args:
+        slot (int | None): Slot del trabajo (opciones['slot'])
+        intervalo (float): Segundos entre comprobaciones durante la pausa
+
+    Returns:
+        bool: True para seguir, False si el trabajo se canceló
+    """
+    if _estados_worker is None or slot is None:
+        return True
+
+    while True:
+        estado = _estados_worker[slot]
+        if estado == ESTADO_EN_CURSO:
+            return True
+        if estado == ESTADO_CANCELADO:
+            return False
+        time.sleep(intervalo)
+
+
+def _imap_acotado(enviar, tareas, max_en_vuelo, freno=None):
+    """
+    Equivalente a imap_unordered con pocas tareas en vuelo.
+
+    El iterable de tareas solo se consume cuando un worker queda libre, así
+    quien lo genera decide cada tarea con la información más reciente (ver
+    PlanificadorBloques) y ningún worker espera a que terminen los demás.
+
+    Args:
+        enviar (callable): Recibe una tarea y devuelve un Future con su resultado
+        tareas (iterable): Argumentos de cada tarea
+        max_en_vuelo (int): Tareas enviadas y sin recoger como máximo
+        freno (callable, optional): Si devuelve True, antes de enviar otra tarea se
+                                    espera a que termine alguna (ver GobernadorMemoria)
+    """
+    en_vuelo = set()
+    for tarea in tareas:
+        while freno is not None and en_vuelo and freno():
+            terminadas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                yield futuro.result()
+        en_vuelo.add(enviar(tarea))
+        if len(en_vuelo) >= max_en_vuelo:
+            terminadas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                yield futuro.result()
+
+    while en_vuelo:
+        terminadas, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+        for futuro in terminadas:
+            yield futuro.result()
+
+
+def _enviar_a_pool(pool, funcion, tarea):
+    """Envía una tarea al pool de procesos y devuelve un Future con su resultado"""
+    futuro = Future()
+    pool.apply_async(funcion, (tarea,), callback=futuro.set_result,
+                     error_callback=futuro.set_exception)
+    return futuro
+
+
+class PoolManager:
+    """Gestor del pool de procesos compartido durante toda la sesión de la aplicación"""
+
+    def __init__(self):
+        self._pool = None
+        self._procesos = 0
+        self._usuarios = 0
+        self._lock = threading.Lock()
+        self._estados = None
+        self._contadores = None
+        self._slots_libres = list(range(MAX_TRABAJOS))
+
+        # Cerrar el pool aunque la aplicación termine sin pasar por shutdown()
+        atexit.register(self.shutdown)
+
+    def _resolver_workers(self, max_workers):
+        """Número de procesos a usar (por defecto CPUs efectivas - 1, ver workers_por_defecto)"""
+        if max_workers is None:
+            return workers_por_defecto()[0]
+        return max(1, int(max_workers))
+
+    def _estados_compartidos(self):
+        """Arrays compartidos con el estado y los contadores de cada slot (con el lock tomado)"""
+        if self._estados is None:
+            self._estados = multiprocessing.RawArray('b', MAX_TRABAJOS)
+            # Páginas y bytes generados por cada slot
+            self._contadores = multiprocessing.Array('q', 2 * MAX_TRABAJOS)
+        return self._estados
+
+    def _crear_pool(self, procesos):
+        """Crea un pool nuevo cerrando el anterior (debe llamarse con el lock tomado)"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
+        self._pool = Pool(processes=procesos, initializer=_inicializar_worker,
+                          initargs=(self._estados_compartidos(), self._contadores))
+        self._procesos = procesos
+
+    def warm_up(self, max_workers=None):
+        """Arranca los procesos por adelantado para que el primer trabajo no pague el coste"""
+        procesos = self._resolver_workers(max_workers)
+        with self._lock:
+            if self._pool is None:
+                self._crear_pool(procesos)
+
+    @contextmanager
+    def acquire(self, max_workers=None):
+        """
+        Presta el pool compartido mientras dura el bloque with.
+
+        Si el pool está libre y se pide otro número de procesos se recrea;
+        si otro trabajo lo está usando se reutiliza tal cual.
+        """
+        procesos = self._resolver_workers(max_workers)
+        with self._lock:
+            if self._pool is None or (self._usuarios == 0 and self._procesos != procesos):
+                self._crear_pool(procesos)
+            self._usuarios += 1
+            pool = self._pool
+
+        try:
+            yield pool
+        finally:
+            with self._lock:
+                self._usuarios -= 1
+
+    @contextmanager
+    def registrar_trabajo(self, control=None):
+        """
+        Reserva un slot de estado para un trabajo mientras dura el bloque with.
+
+        Los workers consultan el slot con esperar_turno(); si se pasa un
+        ControlTrabajo, sus cambios (pausa, cancelación) se publican en él.
+        Si no quedan slots libres se devuelve None y el trabajo no se puede
+        pausar desde los workers.
+        """
+        with self._lock:
+            estados = self._estados_compartidos()
+            slot = self._slots_libres.pop() if self._slots_libres else None
+            if slot is not None:
+                estados[slot] = ESTADO_EN_CURSO
+                with self._contadores.get_lock():
+                    self._contadores[2 * slot] = 0
+                    self._contadores[2 * slot + 1] = 0
+
+        if slot is not None and control is not None:
+            control._vincular(estados, slot)
+
+        try:
+            yield slot
+        finally:
+            if slot is not None:
+                if control is not None:
+                    control._desvincular()
+                with self._lock:
+                    estados[slot] = ESTADO_EN_CURSO
+                    self._slots_libres.append(slot)
+
+    def leer_avance(self, slot):
+        """Páginas y bytes que los workers han registrado en el slot"""
+        if slot is None or self._contadores is None:
+            return 0, 0
+        with self._contadores.get_lock():
+            return self._contadores[2 * slot], self._contadores[2 * slot + 1]
+
+    def pids_workers(self):
+        """Pids de los procesos del pool (vacío si no está arrancado)"""
+        with self._lock:
+            pool = self._pool
+        if pool is None:
+            return []
+        return [proceso.pid for proceso in getattr(pool, '_pool', []) if proceso.pid]
+
+    def imap_unordered(self, funcion, tareas, max_workers=None, freno=None):
+        """
+        Ejecuta las tareas en el pool compartido y devuelve los resultados
+        según van terminando (sin esperar a las tareas más lentas).
+
+        Cada proceso tiene a lo sumo una tarea esperando detrás de la que
+        ejecuta; el resto del iterable se consume a medida que terminan.
+        """
+        with self.acquire(max_workers) as pool:
+            yield from _imap_acotado(
+                lambda tarea: _enviar_a_pool(pool, funcion, tarea), tareas,
+                _TAREAS_EN_VUELO_POR_WORKER * self._procesos, freno
+            )
+
+    def ejecutar(self, funcion, tareas, max_workers=None, backend=BACKEND_PROCESOS, freno=None):
+        """
+        Ejecuta las tareas con el backend indicado y devuelve los resultados
+        según van terminando.
+
+        Con los backends de hilos y secuencial las tareas corren en este proceso;
+        esperar_turno() y registrar_avance() funcionan igual que en los workers.
+
+        Args:
+            funcion (callable): Función de una tarea (debe poder serializarse para procesos)
+            tareas (iterable): Argumentos de cada tarea; se consumen según se reparten
+            max_workers (int, optional): Procesos o hilos a usar
+            backend (str): BACKEND_PROCESOS, BACKEND_HILOS o BACKEND_SECUENCIAL
+            freno (callable, optional): Consultado antes de cada envío; mientras devuelva
+                                        True no se envían más tareas que las que terminan
+        """
+        if backend == BACKEND_PROCESOS:
+            yield from self.imap_unordered(funcion, tareas, max_workers, freno)
+            return
+
+        self._preparar_proceso_principal()
+        if backend == BACKEND_SECUENCIAL:
+            for tarea in tareas:
+                yield funcion(tarea)
+        elif backend == BACKEND_HILOS:
+            hilos = self._resolver_workers(max_workers)
+            with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="division") as ejecutor:
+                yield from _imap_acotado(
+                    lambda tarea: ejecutor.submit(funcion, tarea), tareas,
+                    _TAREAS_EN_VUELO_POR_WORKER * hilos, freno
+                )
+        else:
+            raise ValueError(f"Backend no soportado: {backend}")
+
+    def _preparar_proceso_principal(self):
+        """Da acceso a los estados y contadores compartidos a las tareas que corren aquí"""
+        with self._lock:
+            if _estados_worker is None:
+                _inicializar_worker(self._estados_compartidos(), self._contadores)
+
+    def coste_arranque(self, max_workers=None):
+        """
+        Segundos estimados hasta tener el pool de procesos listo para un trabajo.
+
+        Es 0 si el pool ya está arrancado y se podrá usar tal cual.
+        """
+        procesos = self._resolver_workers(max_workers)
+        with self._lock:
+            if self._pool is not None and (self._usuarios > 0 or self._procesos == procesos):
+                return 0.0
+
+        if multiprocessing.get_start_method() == "fork":
+            return _SEGUNDOS_ARRANQUE_FORK * procesos
+        # Los procesos arrancan en paralelo, pero compiten por los núcleos
+        return _SEGUNDOS_ARRANQUE_SPAWN * max(1, procesos / cpus_efectivas())
+
+    def shutdown(self, timeout=5.0):
+        """Cierra el pool esperando a los procesos; los termina si no responden a tiempo"""
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+            self._procesos = 0
+
+            # Pedir a los trabajos en curso que paren en la siguiente página
+            if self._estados is not None:
+                for slot in range(MAX_TRABAJOS):
+                    if slot not in self._slots_libres:
+                        self._estados[slot] = ESTADO_CANCELADO
+
+        if pool is None:
+            return
+
+        pool.close()
+        hilo_cierre = threading.Thread(target=pool.join, daemon=True)
+        hilo_cierre.start()
+        hilo_cierre.join(timeout)
+
+        if hilo_cierre.is_alive():
+            pool.terminate()
+            pool.join()
+
+
+pool_manager = PoolManager()
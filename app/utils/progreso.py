@@ -0,0 +1,203 @@
+# utils/progreso.py - Canal de progreso con muestreo a frecuencia fija
+import threading
+import time
+
+# Fases de un trabajo de división
+FASE_PREPARANDO = "preparando"
+FASE_PROCESANDO = "procesando"
+FASE_CERRANDO_ZIP = "cerrando_zip"
+FASE_COMPLETADO = "completado"
+FASE_CANCELADO = "cancelado"
+FASE_ERROR = "error"
+
+# Peso del último intervalo en la media móvil de la velocidad
+_SUAVIZADO_VELOCIDAD = 0.3
+
+
+class EventoProgreso:
+    """Estado de un trabajo en un instante, tal como lo recibe callback_eventos"""
+
+    __slots__ = ('fase', 'porcentaje', 'mensaje', 'paginas_hechas', 'paginas_totales',
+                 'bytes_generados', 'paginas_por_segundo', 'bytes_por_segundo', 'eta_segundos')
+
+    def __init__(self, fase, porcentaje, mensaje, paginas_hechas=0, paginas_totales=0,
+                 bytes_generados=0, paginas_por_segundo=0.0, bytes_por_segundo=0.0,
+                 eta_segundos=None):
+        self.fase = fase
+        self.porcentaje = porcentaje
+        self.mensaje = mensaje
+        self.paginas_hechas = paginas_hechas
+        self.paginas_totales = paginas_totales
+        self.bytes_generados = bytes_generados
+        self.paginas_por_segundo = paginas_por_segundo
+        self.bytes_por_segundo = bytes_por_segundo
+        self.eta_segundos = eta_segundos
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+class MonitorProgreso:
+    """
+    Publica el progreso de un trabajo a frecuencia fija.
+
+    Los workers solo incrementan contadores compartidos (páginas y bytes); un
+    hilo del proceso principal los lee unas pocas veces por segundo, calcula
+    la velocidad y el tiempo restante y llama a los callbacks. Así el coste de
+    informar no depende del tamaño del trabajo ni del tamaño de los bloques.
+
+    callback_progreso recibe (porcentaje, mensaje) como siempre; callback_eventos
+    recibe un EventoProgreso con los datos estructurados. Si un callback falla en
+    el muestreo, el trabajo sigue y al_fallar(mensaje) recibe el primer
+    error del trabajo (los siguientes se descartan).
+    """
+
+    def __init__(self, callback_progreso=None, callback_eventos=None, frecuencia_hz=5.0,
+                 porcentaje_maximo=95, al_fallar=None):
+        self.callback_progreso = callback_progreso
+        self.callback_eventos = callback_eventos
+        self.al_fallar = al_fallar
+        self.intervalo = 1.0 / frecuencia_hz
+        self.porcentaje_maximo = porcentaje_maximo
+
+        self._leer_contadores = None
+        self._total = 0
+        self._base = 0
+        self._ultimo = None
+        self._velocidad_paginas = 0.0
+        self._velocidad_bytes = 0.0
+        self._segundos_estimados = None
+        self._inicio = None
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._fallo_anotado = False
+
+    @property
+    def activo(self):
+        return bool(self.callback_progreso or self.callback_eventos)
+
+    def _publicar(self, evento):
+        with self._lock:
+            if self.callback_progreso:
+                self.callback_progreso(evento.porcentaje, evento.mensaje)
+            if self.callback_eventos:
+                self.callback_eventos(evento)
+
+    def fase(self, fase, porcentaje, mensaje):
+        """Publica un cambio de fase (preparación, cierre del ZIP, fin, error...)"""
+        if not self.activo:
+            return
+        paginas, bytes_generados = self._contadores()
+        self._publicar(EventoProgreso(
+            fase, porcentaje, mensaje,
+            paginas_hechas=paginas,
+            paginas_totales=self._total,
+            bytes_generados=bytes_generados,
+            paginas_por_segundo=self._velocidad_paginas,
+            bytes_por_segundo=self._velocidad_bytes,
+        ))
+
+    def iniciar(self, total, leer_contadores, base=0, segundos_estimados=None):
+        """
+        Empieza a muestrear en segundo plano.
+
+        Args:
+            total (int): Páginas del trabajo completo
+            leer_contadores (callable): Devuelve (páginas, bytes) hechos desde el inicio
+            base (int): Páginas que ya estaban hechas (al reanudar)
+            segundos_estimados (float, optional): Duración prevista de las páginas pendientes
+                                                  (estimar_tiempo_procesamiento); se usa para el
+                                                  tiempo restante hasta que haya velocidad medida
+        """
+        self._total = total
+        self._base = base
+        self._leer_contadores = leer_contadores
+        self._segundos_estimados = segundos_estimados
+        self._inicio = time.monotonic()
+        self._ultimo = (self._inicio,) + self._contadores()
+
+        if not self.activo:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Para el muestreo y publica una última muestra"""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+        self._muestrear_sin_fallar()
+
+    def _contadores(self):
+        if self._leer_contadores is None:
+            return self._base, 0
+        paginas, bytes_generados = self._leer_contadores()
+        return min(self._total, self._base + paginas), bytes_generados
+
+    def porcentaje(self, paginas=None):
+        """Porcentaje de la fase de procesamiento con las páginas hechas (o las actuales)"""
+        if paginas is None:
+            paginas, _ = self._contadores()
+        return int((paginas / self._total) * self.porcentaje_maximo) if self._total else 0
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self._muestrear_sin_fallar()
+
+    def _muestrear_sin_fallar(self):
+        try:
+            self._muestrear()
+        except Exception as e:
+            # Un fallo al pintar el progreso no debe parar el trabajo; se anota una vez
+            if not self._fallo_anotado:
+                self._fallo_anotado = True
+                if self.al_fallar is not None:
+                    self.al_fallar(f"Error al publicar el progreso: {type(e).__name__}: {e}")
+
+    def _muestrear(self):
+        """Lee los contadores y publica un evento si hubo avance"""
+        ahora = time.monotonic()
+        paginas, bytes_generados = self._contadores()
+        instante, paginas_antes, bytes_antes = self._ultimo
+        if paginas == paginas_antes:
+            return
+
+        # Media móvil exponencial para que la velocidad no salte de una muestra a otra
+        transcurrido = max(ahora - instante, 1e-6)
+        velocidad_paginas = (paginas - paginas_antes) / transcurrido
+        velocidad_bytes = (bytes_generados - bytes_antes) / transcurrido
+        if self._velocidad_paginas:
+            velocidad_paginas = (_SUAVIZADO_VELOCIDAD * velocidad_paginas
+                                 + (1 - _SUAVIZADO_VELOCIDAD) * self._velocidad_paginas)
+            velocidad_bytes = (_SUAVIZADO_VELOCIDAD * velocidad_bytes
+                               + (1 - _SUAVIZADO_VELOCIDAD) * self._velocidad_bytes)
+        self._velocidad_paginas = velocidad_paginas
+        self._velocidad_bytes = velocidad_bytes
+        self._ultimo = (ahora, paginas, bytes_generados)
+
+        restantes = self._total - paginas
+        eta = restantes / velocidad_paginas if velocidad_paginas > 0 else None
+
+        # Al principio manda la estimación previa; según avanza, la velocidad medida
+        if self._segundos_estimados is not None:
+            pendientes = max(1, self._total - self._base)
+            fraccion = (paginas - self._base) / pendientes
+            eta_prevista = max(0.0, self._segundos_estimados - (ahora - self._inicio))
+            peso = min(1.0, fraccion * 4)
+            eta = eta_prevista if eta is None else peso * eta + (1 - peso) * eta_prevista
+        porcentaje = self.porcentaje(paginas)
+
+        self._publicar(EventoProgreso(
+            FASE_PROCESANDO, porcentaje,
+            f"Procesadas {paginas:,} de {self._total:,} páginas",
+            paginas_hechas=paginas,
+            paginas_totales=self._total,
+            bytes_generados=bytes_generados,
+            paginas_por_segundo=velocidad_paginas,
+            bytes_por_segundo=velocidad_bytes,
+            eta_segundos=eta,
+        ))
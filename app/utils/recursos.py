@@ -0,0 +1,257 @@
+# utils/recursos.py - Límites efectivos de CPU y memoria (contenedores, afinidad) y freno por memoria
+import math
+import os
+import time
+
+try:
+    import psutil
+except ImportError:
+    # Sin psutil la memoria de cada proceso se lee de /proc (solo Linux)
+    psutil = None
+
+# Fracción del límite de memoria a partir de la cual se frena el reparto si no se indica otro
+FRACCION_LIMITE_RSS = 0.8
+
+# Memoria aproximada de un worker recién arrancado (intérprete, PyPDF2, buffers)
+_MEMORIA_BASE_WORKER = 80 * 1024 * 1024
+
+# Cada worker mantiene el PDF analizado: la tabla xref y los objetos que va leyendo
+_MEMORIA_WORKER_POR_BYTE_PDF = 0.5
+
+# Segundos entre lecturas de la memoria de los procesos
+_INTERVALO_MEDICION = 0.1
+
+_RAIZ_CGROUP = "/sys/fs/cgroup"
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding='ascii') as archivo:
+            return archivo.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _rutas_cgroup(controlador):
+    """
+    Carpetas donde buscar los archivos del cgroup de este proceso, de la más
+    concreta a la raíz (dentro de un contenedor el cgroup propio suele ser la raíz).
+    """
+    rutas = []
+    contenido = _leer("/proc/self/cgroup") or ""
+    for linea in contenido.splitlines():
+        partes = linea.split(":", 2)
+        if len(partes) != 3:
+            continue
+        _, controladores, ruta = partes
+        if controladores == "":
+            # cgroup v2 (jerarquía unificada)
+            rutas.append(os.path.join(_RAIZ_CGROUP, ruta.lstrip("/")))
+        elif controlador in controladores.split(","):
+            for carpeta in (controladores, controlador):
+                rutas.append(os.path.join(_RAIZ_CGROUP, carpeta, ruta.lstrip("/")))
+                rutas.append(os.path.join(_RAIZ_CGROUP, carpeta))
+    rutas.append(_RAIZ_CGROUP)
+    return rutas
+
+
+def cuota_cpu():
+    """
+    CPUs que permite la cuota del cgroup (p. ej. 1.5 con --cpus=1.5), o None si no hay cuota.
+    """
+    for carpeta in _rutas_cgroup("cpu"):
+        # cgroup v2: "cuota periodo" o "max periodo"
+        valor = _leer(os.path.join(carpeta, "cpu.max"))
+        if valor:
+            partes = valor.split()
+            if partes[0] == "max":
+                return None
+            try:
+                return int(partes[0]) / int(partes[1])
+            except (IndexError, ValueError, ZeroDivisionError):
+                return None
+
+        # cgroup v1: cuota -1 = sin límite
+        cuota = _leer(os.path.join(carpeta, "cpu.cfs_quota_us"))
+        periodo = _leer(os.path.join(carpeta, "cpu.cfs_period_us"))
+        if cuota and periodo:
+            try:
+                cuota, periodo = int(cuota), int(periodo)
+            except ValueError:
+                return None
+            return cuota / periodo if cuota > 0 and periodo > 0 else None
+    return None
+
+
+def cpus_efectivas():
+    """
+    CPUs que este proceso puede usar de verdad.
+
+    Tiene en cuenta la máscara de afinidad (taskset, planificadores de tareas)
+    y la cuota de CPU del cgroup (contenedores); cpu_count() solo cuenta los
+    núcleos de la máquina.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    cuota = cuota_cpu()
+    if cuota is not None:
+        cpus = min(cpus, math.ceil(cuota))
+    return max(1, cpus)
+
+
+def memoria_fisica():
+    """Memoria física total de la máquina (bytes), o None"""
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def limite_memoria():
+    """
+    Memoria que pueden usar este proceso y sus hijos: el límite del cgroup si
+    lo hay (contenedores) o la memoria física.
+
+    Returns:
+        int | None: Bytes, o None si no se puede saber
+    """
+    fisica = memoria_fisica()
+    for carpeta in _rutas_cgroup("memory"):
+        # cgroup v2: "max" = sin límite; cgroup v1: un número enorme si no hay límite
+        valor = _leer(os.path.join(carpeta, "memory.max"))
+        if valor is None:
+            valor = _leer(os.path.join(carpeta, "memory.limit_in_bytes"))
+        if valor is None:
+            continue
+        if valor == "max":
+            break
+        try:
+            limite = int(valor)
+        except ValueError:
+            break
+        return min(limite, fisica) if fisica else limite
+    return fisica
+
+
+def memoria_proceso(pid):
+    """Memoria residente (RSS) de un proceso en bytes, o None si no se puede leer"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    valor = _leer(f"/proc/{pid}/statm")
+    if not valor:
+        return None
+    try:
+        return int(valor.split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IndexError, ValueError, OSError):
+        return None
+
+
+def workers_por_defecto(maximo=None, tamano_pdf=None, limite_rss=None):
+    """
+    Número de workers para un trabajo cuando no se indica.
+
+    Parte de las CPUs efectivas menos una (para la interfaz y el proceso
+    principal) y lo reduce si la memoria no alcanza para todos.
+
+    Args:
+        maximo (int, optional): Tope configurado (ajuste "Procesos máximos")
+        tamano_pdf (int, optional): Bytes del PDF, para estimar la memoria de cada worker
+        limite_rss (int, optional): Memoria total permitida (default: FRACCION_LIMITE_RSS
+                                    del límite de memoria)
+
+    Returns:
+        tuple: (workers, motivo) donde motivo explica qué lo limitó
+               ("cpu", "memoria" o "maximo")
+    """
+    workers, motivo = max(1, cpus_efectivas() - 1), "cpu"
+
+    if limite_rss is None:
+        limite = limite_memoria()
+        limite_rss = int(limite * FRACCION_LIMITE_RSS) if limite else None
+    if limite_rss and tamano_pdf is not None:
+        por_worker = _MEMORIA_BASE_WORKER + tamano_pdf * _MEMORIA_WORKER_POR_BYTE_PDF
+        por_memoria = max(1, int((limite_rss - (memoria_proceso(os.getpid()) or 0)) // por_worker))
+        if por_memoria < workers:
+            workers, motivo = por_memoria, "memoria"
+
+    if maximo and maximo < workers:
+        workers, motivo = max(1, int(maximo)), "maximo"
+    return workers, motivo
+
+
+class GobernadorMemoria:
+    """
+    Frena el reparto de tareas cuando la memoria de todo el trabajo se acerca al límite.
+
+    Suma la memoria residente del proceso principal y de los workers; si pasa
+    de limite_rss, el reparto espera a que termine alguna tarea antes de
+    enviar la siguiente (así baja la concurrencia en lugar de fallar por falta
+    de memoria). Guarda las decisiones para las métricas del trabajo.
+    """
+
+    def __init__(self, limite_rss=None, pids_workers=None):
+        """
+        Args:
+            limite_rss (int, optional): Bytes permitidos (default: FRACCION_LIMITE_RSS
+                                        del límite de memoria del sistema o contenedor)
+            pids_workers (callable, optional): Devuelve los pids de los workers en uso
+        """
+        if limite_rss is None:
+            limite = limite_memoria()
+            limite_rss = int(limite * FRACCION_LIMITE_RSS) if limite else None
+        self.limite_rss = limite_rss
+        self.pids_workers = pids_workers or (lambda: [])
+
+        self.frenos = 0
+        self.segundos_frenado = 0.0
+        self.rss_max = 0
+        self._ultima_medicion = 0.0
+        self._rss = 0
+        self._inicio_freno = None
+
+    def memoria_total(self):
+        """RSS del proceso principal más el de los workers (medido como mucho cada 0.1 s)"""
+        ahora = time.monotonic()
+        if ahora - self._ultima_medicion >= _INTERVALO_MEDICION:
+            self._ultima_medicion = ahora
+            pids = [os.getpid()] + list(self.pids_workers())
+            self._rss = sum(memoria_proceso(pid) or 0 for pid in pids)
+            self.rss_max = max(self.rss_max, self._rss)
+        return self._rss
+
+    def frenar(self):
+        """
+        Indica si conviene esperar antes de enviar otra tarea.
+
+        Se llama antes de cada envío (ver PoolManager.ejecutar).
+        """
+        if not self.limite_rss:
+            return False
+
+        frenado = self.memoria_total() >= self.limite_rss
+        if frenado and self._inicio_freno is None:
+            self.frenos += 1
+            self._inicio_freno = time.monotonic()
+        elif not frenado and self._inicio_freno is not None:
+            self.segundos_frenado += time.monotonic() - self._inicio_freno
+            self._inicio_freno = None
+        return frenado
+
+    def como_dict(self):
+        if self._inicio_freno is not None:
+            self.segundos_frenado += time.monotonic() - self._inicio_freno
+            self._inicio_freno = time.monotonic()
+        return {
+            'limite_rss': self.limite_rss,
+            'rss_max_total': self.rss_max or None,
+            'frenos': self.frenos,
+            'segundos_frenado': self.segundos_frenado,
+        }
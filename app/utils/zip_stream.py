@@ -0,0 +1,345 @@
+# utils/zip_stream.py - Escritura de ZIP con entradas comprimidas en los workers
+import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+# Algoritmos disponibles (mismos nombres que usa la configuración)
+METODOS_ZIP = {
+    "ZIP_DEFLATED": zipfile.ZIP_DEFLATED,
+    "ZIP_STORED": zipfile.ZIP_STORED,
+    "ZIP_BZIP2": zipfile.ZIP_BZIP2,
+    "ZIP_LZMA": zipfile.ZIP_LZMA,
+}
+
+# Nivel de compresión por defecto de cada algoritmo (LZMA no admite nivel en ZIP)
+NIVELES_ZIP = {
+    zipfile.ZIP_DEFLATED: 6,
+    zipfile.ZIP_BZIP2: 9,
+}
+
+# Filtros PDF cuyo contenido ya está comprimido y apenas gana con deflate
+_FILTROS_COMPRIMIDOS = re.compile(
+    rb'/(FlateDecode|Fl|DCTDecode|DCT|JPXDecode|JBIG2Decode|CCITTFaxDecode|CCF|LZWDecode|LZW)\b'
+)
+
+_MASCARA_LZMA_EOS = 0x02
+_LIMITE_ZIP64 = (1 << 31) - 1
+_LIMITE_ENTRADAS = (1 << 16) - 1
+
+
+def resolver_metodo_zip(metodo):
+    """
+    Convierte el nombre del algoritmo (p. ej. "ZIP_DEFLATED") en la constante de zipfile.
+
+    Args:
+        metodo (str | int): Nombre de la configuración o constante de zipfile
+
+    Returns:
+        int: Constante de compresión de zipfile
+    """
+    if isinstance(metodo, int):
+        return metodo
+    if metodo not in METODOS_ZIP:
+        raise ValueError(f"Algoritmo de compresión no soportado: {metodo}")
+    return METODOS_ZIP[metodo]
+
+
+def streams_ya_comprimidos(datos, umbral=0.8):
+    """
+    Indica si la mayor parte de un PDF son streams ya comprimidos (Flate, JPEG...).
+
+    Args:
+        datos (bytes): Contenido del PDF
+        umbral (float): Fracción mínima del archivo ocupada por esos streams
+
+    Returns:
+        bool: True si comprimir de nuevo no compensa
+    """
+    bytes_comprimidos = 0
+    posicion = 0
+
+    while True:
+        inicio = datos.find(b'stream', posicion)
+        if inicio == -1:
+            break
+
+        # 'endstream' también contiene 'stream'
+        if datos[inicio - 3:inicio] == b'end':
+            posicion = inicio + 6
+            continue
+
+        fin = datos.find(b'endstream', inicio)
+        if fin == -1:
+            break
+
+        cabecera = datos[max(0, datos.rfind(b'obj', 0, inicio)):inicio]
+        if _FILTROS_COMPRIMIDOS.search(cabecera):
+            bytes_comprimidos += fin - inicio
+
+        posicion = fin + 9
+
+    return bytes_comprimidos >= umbral * len(datos)
+
+
+def _crear_compresor(metodo, nivel=None):
+    """
+    Compresor con el formato que espera cada método del ZIP.
+
+    Deflate va sin cabecera zlib (wbits negativo) y LZMA con la cabecera de
+    propiedades que añade zipfile.LZMACompressor.
+    """
+    if metodo == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if nivel is None else nivel,
+                                zlib.DEFLATED, -15)
+    if metodo == zipfile.ZIP_BZIP2:
+        if bz2 is None:
+            raise RuntimeError("La compresión BZIP2 requiere el módulo bz2")
+        return bz2.BZ2Compressor(9 if nivel is None else nivel)
+    if metodo == zipfile.ZIP_LZMA:
+        if lzma is None:
+            raise RuntimeError("La compresión LZMA requiere el módulo lzma")
+        return zipfile.LZMACompressor()
+    raise ValueError(f"Algoritmo de compresión no soportado: {metodo}")
+
+
+def comprimir_entrada(datos, metodo, nivel=None, es_pdf=True):
+    """
+    Comprime los bytes de una entrada del ZIP. Pensada para ejecutarse en los workers.
+
+    Los PDF cuyos streams ya vienen comprimidos se guardan sin compresión (STORED):
+    volver a comprimirlos cuesta CPU y casi no reduce el tamaño.
+
+    Args:
+        datos (bytes): Contenido sin comprimir
+        metodo (int): Constante de compresión de zipfile
+        nivel (int, optional): Nivel de compresión (por defecto el de NIVELES_ZIP)
+        es_pdf (bool): Si aplicar la detección de streams ya comprimidos
+
+    Returns:
+        tuple: (datos_comprimidos, crc, tamano_original, metodo_usado)
+    """
+    crc = zlib.crc32(datos)
+
+    if metodo != zipfile.ZIP_STORED and es_pdf and streams_ya_comprimidos(datos):
+        metodo = zipfile.ZIP_STORED
+
+    if metodo == zipfile.ZIP_STORED:
+        return datos, crc, len(datos), metodo
+
+    if nivel is None:
+        nivel = NIVELES_ZIP.get(metodo)
+
+    compresor = _crear_compresor(metodo, nivel)
+    comprimido = compresor.compress(datos) + compresor.flush()
+    return comprimido, crc, len(datos), metodo
+
+
+class EscritorZipStream:
+    """
+    Escritor de ZIP secuencial que recibe entradas ya comprimidas.
+
+    Los workers comprimen en paralelo (comprimir_entrada) y el proceso principal
+    solo añade los bytes al archivo y escribe el directorio central al cerrar.
+    Los registros del directorio central se van guardando en un archivo temporal,
+    así la memoria no crece con el número de entradas.
+    """
+
+    def __init__(self, ruta_zip, fecha=None, reanudar_en=None, entradas=None):
+        """
+        Args:
+            ruta_zip (str): Ruta del ZIP a generar
+            fecha (tuple, optional): Fecha de las entradas (por defecto, ahora)
+            reanudar_en (int, optional): Continuar un ZIP a medias, truncándolo en este offset
+            entradas (list, optional): Entradas ya escritas antes de reanudar_en, como
+                                       [nombre, crc, tamano_comprimido, tamano, metodo, offset]
+        """
+        self.ruta_zip = ruta_zip
+        self.fecha = tuple(fecha) if fecha else time.localtime()[:6]
+        self._directorio = tempfile.TemporaryFile()
+        self._total_entradas = 0
+
+        # Lectura y escritura: las entradas repetidas se copian de las ya escritas
+        if reanudar_en is None:
+            self._archivo = open(ruta_zip, 'w+b')
+        else:
+            self._archivo = open(ruta_zip, 'r+b')
+            self._archivo.truncate(reanudar_en)
+            self._archivo.seek(reanudar_en)
+            for nombre, crc, tamano_comprimido, tamano, metodo, offset in entradas or []:
+                info = self._crear_info(nombre, crc, tamano_comprimido, tamano, metodo)
+                info.FileHeader()  # Ajusta las versiones igual que al escribir
+                info.header_offset = offset
+                self._registrar_entrada(info)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cerrar()
+
+    def _crear_info(self, nombre, crc, tamano_comprimido, tamano, metodo):
+        """Crea el ZipInfo de una entrada con los datos ya calculados"""
+        info = zipfile.ZipInfo(nombre, date_time=self.fecha)
+        info.compress_type = metodo
+        info.CRC = crc
+        info.compress_size = tamano_comprimido
+        info.file_size = tamano
+        info.external_attr = 0o644 << 16
+        if metodo == zipfile.ZIP_LZMA:
+            info.flag_bits |= _MASCARA_LZMA_EOS
+        return info
+
+    def agregar_comprimido(self, nombre, comprimido, crc, tamano, metodo):
+        """
+        Añade una entrada cuyos bytes ya vienen comprimidos.
+
+        Args:
+            nombre (str): Nombre de la entrada dentro del ZIP
+            comprimido (bytes): Datos comprimidos con el método indicado
+            crc (int): CRC32 de los datos sin comprimir
+            tamano (int): Tamaño sin comprimir
+            metodo (int): Constante de compresión de zipfile
+
+        Returns:
+            int: Offset de la cabecera local de la entrada
+        """
+        info = self._crear_info(nombre, crc, len(comprimido), tamano, metodo)
+        info.header_offset = self._archivo.tell()
+
+        self._archivo.write(info.FileHeader(zip64=tamano > _LIMITE_ZIP64
+                                            or len(comprimido) > _LIMITE_ZIP64))
+        self._archivo.write(comprimido)
+        self._registrar_entrada(info)
+        return info.header_offset
+
+    def agregar_copia(self, nombre, offset_origen, tamano_comprimido, crc, tamano, metodo):
+        """
+        Añade una entrada con los mismos datos que otra ya escrita, sin volver a comprimirlos.
+
+        Los datos se leen del propio ZIP. Sirve para los archivos repetidos:
+        cada nombre necesita su entrada, pero no hace falta recibir ni
+        comprimir otra vez el contenido.
+
+        Args:
+            nombre (str): Nombre de la nueva entrada
+            offset_origen (int): Offset de la cabecera local de la entrada original
+            tamano_comprimido (int): Bytes comprimidos de la entrada original
+            crc (int): CRC32 de los datos sin comprimir
+            tamano (int): Tamaño sin comprimir
+            metodo (int): Constante de compresión de zipfile
+
+        Returns:
+            int: Offset de la cabecera local de la entrada nueva
+        """
+        posicion = self._archivo.tell()
+        self._archivo.seek(offset_origen + 26)
+        largo_nombre, largo_extra = struct.unpack('<HH', self._archivo.read(4))
+        self._archivo.seek(offset_origen + 30 + largo_nombre + largo_extra)
+        comprimido = self._archivo.read(tamano_comprimido)
+        self._archivo.seek(posicion)
+        return self.agregar_comprimido(nombre, comprimido, crc, tamano, metodo)
+
+    def _registrar_entrada(self, info):
+        """Guarda el registro del directorio central de la entrada hasta el cierre"""
+        self._directorio.write(self._registro_central(info))
+        self._total_entradas += 1
+
+    @property
+    def posicion(self):
+        """Offset actual de escritura (fin de la última entrada)"""
+        return self._archivo.tell()
+
+    def flush(self):
+        """
+        Vuelca al disco las entradas escritas hasta ahora (fsync incluido: el
+        diario las da por escritas y debe seguir siendo cierto tras un corte
+        de luz, no solo si se cierra el programa).
+        """
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+
+    def agregar(self, nombre, datos, metodo=zipfile.ZIP_DEFLATED, nivel=None):
+        """Comprime en este proceso y añade la entrada"""
+        return self.agregar_comprimido(nombre, *comprimir_entrada(datos, metodo, nivel))
+
+    def cerrar(self):
+        """Escribe el directorio central (con extensiones ZIP64 si hacen falta) y cierra"""
+        if self._archivo is None:
+            return
+
+        inicio_directorio = self._archivo.tell()
+        self._directorio.seek(0)
+        shutil.copyfileobj(self._directorio, self._archivo)
+        self._directorio.close()
+        fin_directorio = self._archivo.tell()
+
+        total = self._total_entradas
+        tamano_directorio = fin_directorio - inicio_directorio
+
+        if (total > _LIMITE_ENTRADAS or inicio_directorio > _LIMITE_ZIP64
+                or tamano_directorio > _LIMITE_ZIP64):
+            self._archivo.write(struct.pack(
+                zipfile.structEndArchive64, zipfile.stringEndArchive64,
+                44, 45, 45, 0, 0, total, total, tamano_directorio, inicio_directorio
+            ))
+            self._archivo.write(struct.pack(
+                zipfile.structEndArchive64Locator, zipfile.stringEndArchive64Locator,
+                0, fin_directorio, 1
+            ))
+            total = min(total, _LIMITE_ENTRADAS)
+            tamano_directorio = min(tamano_directorio, 0xFFFFFFFF)
+            inicio_directorio = min(inicio_directorio, 0xFFFFFFFF)
+
+        self._archivo.write(struct.pack(
+            zipfile.structEndArchive, zipfile.stringEndArchive,
+            0, 0, total, total, tamano_directorio, inicio_directorio, 0
+        ))
+        self._archivo.close()
+        self._archivo = None
+
+    def _registro_central(self, info):
+        """Construye el registro del directorio central de una entrada"""
+        dt = info.date_time
+        fecha_dos = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        hora_dos = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+
+        extra = []
+        tamano, tamano_comprimido, offset = info.file_size, info.compress_size, info.header_offset
+        if tamano > _LIMITE_ZIP64 or tamano_comprimido > _LIMITE_ZIP64:
+            extra.extend([tamano, tamano_comprimido])
+            tamano = tamano_comprimido = 0xFFFFFFFF
+        if offset > _LIMITE_ZIP64:
+            extra.append(offset)
+            offset = 0xFFFFFFFF
+
+        datos_extra = b''
+        version_minima = 0
+        if extra:
+            datos_extra = struct.pack('<HH' + 'Q' * len(extra), 1, 8 * len(extra), *extra)
+            version_minima = zipfile.ZIP64_VERSION
+
+        nombre, flag_bits = info._encodeFilenameFlags()
+        return struct.pack(
+            zipfile.structCentralDir, zipfile.stringCentralDir,
+            max(version_minima, info.create_version), info.create_system,
+            max(version_minima, info.extract_version), info.reserved,
+            flag_bits, info.compress_type, hora_dos, fecha_dos,
+            info.CRC, tamano_comprimido, tamano,
+            len(nombre), len(datos_extra), 0,
+            0, info.internal_attr, info.external_attr, offset
+        ) + nombre + datos_extra
@@ -0,0 +1,82 @@
+# benchmarks/comparar.py - Compara dos archivos de resultados de benchmarks.ejecutar
+"""
+Uso:
+    python -m benchmarks.comparar base.jsonl nuevo.jsonl
+
+Empareja las ejecuciones por configuración y muestra la variación de
+páginas por segundo, tiempo y memoria máxima. Si hay varias repeticiones
+de una configuración se usa la mediana.
+"""
+import argparse
+import json
+import statistics
+
+from benchmarks.ejecutar import clave_configuracion
+
+
+def cargar_resultados(ruta):
+    """
+    Lee un archivo JSONL y agrupa las métricas por configuración.
+
+    Returns:
+        dict: clave de configuración -> lista de métricas
+    """
+    agrupados = {}
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            registro = json.loads(linea)
+            agrupados.setdefault(clave_configuracion(registro['config']), []).append(registro['metricas'])
+    return agrupados
+
+
+def _mediana(metricas, campo):
+    valores = [m[campo] for m in metricas if m.get(campo) is not None]
+    return statistics.median(valores) if valores else None
+
+
+def _variacion(base, nuevo):
+    if not base or nuevo is None:
+        return "   -   "
+    return f"{(nuevo - base) / base * 100:+6.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dos archivos de resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    args = parser.parse_args(argv)
+
+    base = cargar_resultados(args.base)
+    nuevo = cargar_resultados(args.nuevo)
+    comunes = [clave for clave in base if clave in nuevo]
+
+    if not comunes:
+        print("No hay configuraciones en común entre los dos archivos")
+        return
+
+    print(f"{'configuración':<62} {'pág/s base':>11} {'pág/s nuevo':>12} {'Δ pág/s':>8} "
+          f"{'Δ tiempo':>8} {'Δ memoria':>9}")
+    for clave in sorted(comunes):
+        paginas, contenido, batch_size, workers, modo_zip, motor, backend = clave
+        nombre = f"{paginas} {contenido} b={batch_size} w={workers} {modo_zip} {motor} {backend}"
+
+        velocidad_base = _mediana(base[clave], 'paginas_por_segundo')
+        velocidad_nueva = _mediana(nuevo[clave], 'paginas_por_segundo')
+        memoria_base = _mediana(base[clave], 'memoria_max_padre')
+        memoria_nueva = _mediana(nuevo[clave], 'memoria_max_padre')
+
+        print(f"{nombre:<62} {velocidad_base:>11,.1f} {velocidad_nueva:>12,.1f} "
+              f"{_variacion(velocidad_base, velocidad_nueva):>8} "
+              f"{_variacion(_mediana(base[clave], 'segundos'), _mediana(nuevo[clave], 'segundos')):>8} "
+              f"{_variacion(memoria_base, memoria_nueva):>9}")
+
+    solo_base = len(base) - len(comunes)
+    solo_nuevo = len([clave for clave in nuevo if clave not in base])
+    if solo_base or solo_nuevo:
+        print(f"\n{solo_base} configuraciones solo en la base, {solo_nuevo} solo en el nuevo archivo")
+
+
+if __name__ == "__main__":
+    main()
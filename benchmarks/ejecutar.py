@@ -0,0 +1,276 @@
+# benchmarks/ejecutar.py - Ejecuta dividir_pdf_optimizado sobre una rejilla de configuraciones
+"""
+Pruebas de rendimiento de la división de PDFs.
+
+Uso:
+    python -m benchmarks.ejecutar --paginas 1000 10000 --contenido texto imagenes \\
+        --workers 2 4 --zip sin_zip zip --salida resultados.jsonl
+
+Cada combinación se ejecuta en un proceso nuevo para que la memoria máxima
+medida sea solo suya. Los resultados se añaden en formato JSONL (una línea
+por ejecución) y se pueden comparar con `python -m benchmarks.comparar`.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import cpu_count
+from pathlib import Path
+
+from benchmarks.generador import TIPOS_CONTENIDO, obtener_pdf
+
+# Modos de salida: solo archivos sueltos, archivos y ZIP, solo ZIP
+MODOS_ZIP = {
+    "sin_zip": {'crear_zip': False, 'solo_zip': False},
+    "zip": {'crear_zip': True, 'solo_zip': False},
+    "solo_zip": {'crear_zip': True, 'solo_zip': True},
+}
+
+CARPETA_RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _memoria_maxima():
+    """Memoria residente máxima (bytes) del proceso y de sus hijos ya terminados"""
+    try:
+        import resource
+    except ImportError:
+        # Windows no tiene el módulo resource
+        return None, None
+
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    factor = 1 if sys.platform == "darwin" else 1024
+    propia = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * factor
+    return propia, hijos
+
+
+def _bytes_en_disco(ruta):
+    """Tamaño total de un archivo o del contenido de una carpeta"""
+    if not ruta or not os.path.exists(ruta):
+        return 0
+    if os.path.isfile(ruta):
+        return os.path.getsize(ruta)
+    return sum(entrada.stat().st_size for entrada in os.scandir(ruta) if entrada.is_file())
+
+
+def ejecutar_una(config):
+    """
+    Ejecuta una división con la configuración indicada y mide el resultado.
+
+    Se llama en un proceso propio (ver --interno).
+
+    Args:
+        config (dict): ruta_pdf, carpeta_salida, batch_size, max_workers, zip, motor, backend
+
+    Returns:
+        dict: Métricas de la ejecución
+    """
+    sys.path.insert(0, str(CARPETA_RAIZ))
+    from app.utils.pdf_processor import dividir_pdf_optimizado
+    from app.utils.pool_manager import pool_manager
+    from app.utils.progreso import FASE_CERRANDO_ZIP, FASE_PROCESANDO
+
+    # Instantes en los que empieza cada fase, según los eventos de progreso
+    fases = {}
+
+    def registrar_fase(evento):
+        fases.setdefault(evento.fase, time.perf_counter())
+
+    shutil.rmtree(config['carpeta_salida'], ignore_errors=True)
+    ruta_zip = config['carpeta_salida'] + ".zip"
+    if os.path.exists(ruta_zip):
+        os.remove(ruta_zip)
+
+    inicio = time.perf_counter()
+    cpu_inicio = time.process_time()
+    resultado = dividir_pdf_optimizado(
+        config['ruta_pdf'],
+        config['carpeta_salida'],
+        batch_size=config['batch_size'],
+        max_workers=config['max_workers'],
+        motor=config['motor'],
+        backend=config.get('backend', 'procesos'),
+        callback_eventos=registrar_fase,
+        # Cada ejecución mide la extracción, no lo que dejó en la caché la anterior
+        usar_cache=False,
+        **MODOS_ZIP[config['zip']]
+    )
+    fin = time.perf_counter()
+    cpu_padre = time.process_time() - cpu_inicio
+
+    # Cerrar el pool para que la memoria de los workers cuente en RUSAGE_CHILDREN
+    pool_manager.shutdown()
+    memoria_padre, memoria_workers = _memoria_maxima()
+
+    inicio_proceso = fases.get(FASE_PROCESANDO, inicio)
+    inicio_cierre = fases.get(FASE_CERRANDO_ZIP, fin)
+    segundos = fin - inicio
+    paginas = resultado['total_paginas']
+
+    metricas = {
+        'paginas': paginas,
+        'segundos': segundos,
+        'paginas_por_segundo': paginas / segundos if segundos else None,
+        # Con el motor crudo, el que se usó de verdad (PyPDF2 si no superó la comprobación)
+        # y las páginas que aun así se extrajeron con PyPDF2
+        'motor_usado': resultado.get('motor'),
+        'paginas_respaldo': resultado.get('paginas_respaldo', 0),
+        'fases': {
+            'preparacion': inicio_proceso - inicio,
+            'procesamiento': inicio_cierre - inicio_proceso,
+            'cierre_zip': fin - inicio_cierre,
+        },
+        'cpu_padre_segundos': cpu_padre,
+        'memoria_max_padre': memoria_padre,
+        'memoria_max_workers': memoria_workers,
+        'bytes_archivos': _bytes_en_disco(resultado['carpeta']),
+        'bytes_zip': _bytes_en_disco(resultado['zip']),
+    }
+    # Instrumentación propia de dividir_pdf_optimizado, si la devuelve
+    if resultado.get('metricas'):
+        metricas['internas'] = resultado['metricas']
+
+    shutil.rmtree(config['carpeta_salida'], ignore_errors=True)
+    if os.path.exists(ruta_zip):
+        os.remove(ruta_zip)
+    return metricas
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=CARPETA_RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _info_maquina():
+    return {
+        'sistema': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': cpu_count(),
+        'procesador': platform.processor() or platform.machine(),
+    }
+
+
+def _motor_crudo_valido(ruta_pdf, paginas):
+    """
+    Comprueba que el motor crudo acepta el PDF sintético (las páginas de tipo
+    imagenes tienen /Contents con varios streams). Si no, sus resultados
+    medirían PyPDF2 con la etiqueta "crudo".
+    """
+    from app.utils.pdf_processor import verificar_motor_crudo
+
+    try:
+        diferencias = verificar_motor_crudo(ruta_pdf, sorted({0, paginas // 2, paginas - 1}))
+    except Exception as e:
+        diferencias = [f"{type(e).__name__}: {e}"]
+    if diferencias:
+        print(f"    Error: el motor crudo no es válido para este PDF ({diferencias[0]})")
+    return not diferencias
+
+
+def clave_configuracion(config):
+    """Identifica una configuración para poder comparar la misma entre ejecuciones"""
+    # Los resultados anteriores a la opción de backend siempre usaban procesos
+    return (config['paginas'], config['contenido'], config['batch_size'],
+            config['max_workers'], config['zip'], config['motor'],
+            config.get('backend', 'procesos'))
+
+
+def ejecutar_rejilla(args):
+    """Genera los PDFs necesarios y ejecuta todas las combinaciones de la rejilla"""
+    carpeta_trabajo = args.carpeta or os.path.join(tempfile.gettempdir(), "sistemapdf_benchmarks")
+    commit = _commit_actual()
+    maquina = _info_maquina()
+
+    combinaciones = list(itertools.product(
+        args.paginas, args.contenido, args.batch_size, args.workers, args.zip, args.motor,
+        args.backend
+    ))
+
+    with open(args.salida, 'a', encoding='utf-8') as salida:
+        for numero, (paginas, contenido, batch_size, workers, modo_zip, motor,
+                     backend) in enumerate(combinaciones, 1):
+            print(f"[{numero}/{len(combinaciones)}] Generando PDF de {paginas:,} páginas ({contenido})...")
+            ruta_pdf = obtener_pdf(os.path.join(carpeta_trabajo, "pdfs"), paginas, contenido)
+            if motor == "crudo" and not _motor_crudo_valido(ruta_pdf, paginas):
+                continue
+
+            config = {
+                'paginas': paginas,
+                'contenido': contenido,
+                'batch_size': batch_size,
+                'max_workers': workers,
+                'zip': modo_zip,
+                'motor': motor,
+                'backend': backend,
+            }
+
+            for repeticion in range(args.repeticiones):
+                print(f"    batch_size={batch_size} workers={workers} zip={modo_zip} "
+                      f"motor={motor} backend={backend} (repetición {repeticion + 1})")
+
+                interno = dict(config, ruta_pdf=ruta_pdf,
+                               carpeta_salida=os.path.join(carpeta_trabajo, "salida"))
+                proceso = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.ejecutar", "--interno", json.dumps(interno)],
+                    cwd=CARPETA_RAIZ, capture_output=True, text=True
+                )
+                if proceso.returncode != 0:
+                    print(f"    Error: {proceso.stderr.strip().splitlines()[-1:]}")
+                    continue
+
+                metricas = json.loads(proceso.stdout.strip().splitlines()[-1])
+                if metricas.get('motor_usado') not in (None, motor):
+                    print(f"    Aviso: se pidió el motor {motor} y se usó {metricas['motor_usado']}")
+                elif metricas.get('paginas_respaldo'):
+                    print(f"    Aviso: {metricas['paginas_respaldo']:,} páginas se extrajeron con PyPDF2")
+                print(f"    {metricas['paginas_por_segundo']:,.1f} pág/s en {metricas['segundos']:.2f}s")
+
+                salida.write(json.dumps({
+                    'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    'commit': commit,
+                    'maquina': maquina,
+                    'config': config,
+                    'repeticion': repeticion,
+                    'metricas': metricas,
+                }, ensure_ascii=False) + "\n")
+                salida.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento de dividir_pdf_optimizado")
+    parser.add_argument("--paginas", type=int, nargs="+", default=[1000],
+                        help="Tamaños de PDF a generar (p. ej. 1000 10000 100000 400000)")
+    parser.add_argument("--contenido", nargs="+", choices=TIPOS_CONTENIDO, default=["texto"])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[max(1, cpu_count() - 1)])
+    parser.add_argument("--zip", nargs="+", choices=list(MODOS_ZIP), default=["zip"])
+    parser.add_argument("--motor", nargs="+", choices=["pypdf2", "crudo"], default=["pypdf2"])
+    parser.add_argument("--backend", nargs="+", choices=["auto", "procesos", "hilos", "secuencial"],
+                        default=["procesos"])
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--carpeta", help="Carpeta para los PDFs generados y la salida temporal")
+    parser.add_argument("--salida", default="resultados_benchmark.jsonl",
+                        help="Archivo JSONL donde se añaden los resultados")
+    parser.add_argument("--interno", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        print(json.dumps(ejecutar_una(json.loads(args.interno))))
+        return
+
+    ejecutar_rejilla(args)
+
+
+if __name__ == "__main__":
+    main()
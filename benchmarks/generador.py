@@ -0,0 +1,180 @@
+# benchmarks/generador.py - Generador de PDFs sintéticos grandes para las pruebas de rendimiento
+import os
+import random
+import zlib
+
+# Tipos de contenido disponibles
+CONTENIDO_TEXTO = "texto"
+CONTENIDO_FUENTES_COMPARTIDAS = "fuentes_compartidas"
+CONTENIDO_IMAGENES = "imagenes"
+
+TIPOS_CONTENIDO = (CONTENIDO_TEXTO, CONTENIDO_FUENTES_COMPARTIDAS, CONTENIDO_IMAGENES)
+
+# Hijos máximos por nodo del árbol de páginas (como los PDFs reales, no un único /Kids gigante)
+_HIJOS_POR_NODO = 256
+
+_FUENTES = (b'Helvetica', b'Times-Roman', b'Courier', b'Helvetica-Bold')
+
+_PALABRAS = (b'factura cliente importe total fecha concepto cantidad precio unitario '
+             b'subtotal impuesto referencia pedido pago vencimiento cuenta').split()
+
+
+class _EscritorPdf:
+    """Escribe objetos en orden y recuerda sus offsets para la tabla xref"""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.offsets = [0]
+        self.archivo.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def reservar(self):
+        """Reserva un número de objeto que se escribirá más tarde"""
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def escribir(self, num, valor, stream=None):
+        self.offsets[num] = self.archivo.tell()
+        if stream is None:
+            self.archivo.write(b'%d 0 obj\n%s\nendobj\n' % (num, valor))
+        else:
+            self.archivo.write(b'%d 0 obj\n%s\nstream\n' % (num, valor))
+            self.archivo.write(stream)
+            self.archivo.write(b'\nendstream\nendobj\n')
+
+    def nuevo(self, valor, stream=None):
+        num = self.reservar()
+        self.escribir(num, valor, stream)
+        return num
+
+    def cerrar(self, num_catalogo):
+        inicio_xref = self.archivo.tell()
+        total = len(self.offsets)
+        self.archivo.write(b'xref\n0 %d\n0000000000 65535 f \n' % total)
+        for offset in self.offsets[1:]:
+            self.archivo.write(b'%010d 00000 n \n' % offset)
+        self.archivo.write(b'trailer\n<</Size %d/Root %d 0 R>>\nstartxref\n%d\n%%%%EOF\n'
+                           % (total, num_catalogo, inicio_xref))
+
+
+def _contenido_texto(aleatorio, numero_pagina, fuentes, lineas):
+    """Operadores de texto de una página (varias líneas con las fuentes indicadas)"""
+    partes = [b'BT\n50 780 Td 14 TL\n']
+    for linea in range(lineas):
+        fuente = fuentes[linea % len(fuentes)]
+        texto = b' '.join(aleatorio.choice(_PALABRAS) for _ in range(8))
+        partes.append(b'/%s 10 Tf (%s %d) Tj T*\n' % (fuente, texto, numero_pagina))
+    partes.append(b'ET\n')
+    return zlib.compress(b''.join(partes))
+
+
+def generar_pdf(ruta, paginas, contenido=CONTENIDO_TEXTO, lineas_por_pagina=40,
+                lado_imagen=256, semilla=1234):
+    """
+    Genera un PDF sintético escribiéndolo en streaming (memoria constante).
+
+    Tipos de contenido:
+    - texto: cada página define sus propias fuentes (recursos no compartidos)
+    - fuentes_compartidas: todas las páginas usan el mismo diccionario de recursos
+    - imagenes: además del texto, cada página lleva una imagen propia sin comprimir
+      con ruido (no se puede comprimir, como una foto escaneada)
+
+    Args:
+        ruta (str): Ruta del PDF a generar
+        paginas (int): Número de páginas
+        contenido (str): Uno de TIPOS_CONTENIDO
+        lineas_por_pagina (int): Líneas de texto por página
+        lado_imagen (int): Lado en píxeles de las imágenes (tipo imagenes)
+        semilla (int): Semilla para que el archivo sea reproducible
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    if contenido not in TIPOS_CONTENIDO:
+        raise ValueError(f"Tipo de contenido no soportado: {contenido}")
+
+    aleatorio = random.Random(semilla)
+    nombres_fuentes = [b'F%d' % i for i in range(len(_FUENTES))]
+    temporal = ruta + ".tmp"
+
+    with open(temporal, 'wb') as archivo:
+        pdf = _EscritorPdf(archivo)
+        num_catalogo = pdf.reservar()
+        num_raiz = pdf.reservar()
+
+        recursos_compartidos = None
+        if contenido == CONTENIDO_FUENTES_COMPARTIDAS:
+            fuentes = [pdf.nuevo(b'<</Type/Font/Subtype/Type1/BaseFont/%s>>' % fuente)
+                       for fuente in _FUENTES]
+            recursos_compartidos = pdf.nuevo(b'<</Font<<%s>>>>' % b''.join(
+                b'/%s %d 0 R' % (nombre, num) for nombre, num in zip(nombres_fuentes, fuentes)))
+
+        # Páginas agrupadas en nodos intermedios de _HIJOS_POR_NODO hijos
+        nodos = []
+        for inicio_grupo in range(0, paginas, _HIJOS_POR_NODO):
+            num_nodo = pdf.reservar()
+            hijos = []
+            for numero_pagina in range(inicio_grupo, min(paginas, inicio_grupo + _HIJOS_POR_NODO)):
+                flujo = _contenido_texto(aleatorio, numero_pagina + 1, nombres_fuentes, lineas_por_pagina)
+                num_contenido = pdf.nuevo(b'<</Length %d/Filter/FlateDecode>>' % len(flujo), flujo)
+
+                if recursos_compartidos is not None:
+                    recursos = b'%d 0 R' % recursos_compartidos
+                else:
+                    fuentes = [pdf.nuevo(b'<</Type/Font/Subtype/Type1/BaseFont/%s>>' % fuente)
+                               for fuente in _FUENTES]
+                    entradas = b''.join(b'/%s %d 0 R' % (nombre, num)
+                                        for nombre, num in zip(nombres_fuentes, fuentes))
+                    recursos = b'<</Font<<%s>>' % entradas
+
+                    if contenido == CONTENIDO_IMAGENES:
+                        pixeles = aleatorio.randbytes(lado_imagen * lado_imagen * 3)
+                        num_imagen = pdf.nuevo(
+                            b'<</Type/XObject/Subtype/Image/Width %d/Height %d/ColorSpace/DeviceRGB'
+                            b'/BitsPerComponent 8/Length %d>>' % (lado_imagen, lado_imagen, len(pixeles)),
+                            pixeles
+                        )
+                        recursos += b'/XObject<</Im0 %d 0 R>>' % num_imagen
+                        dibujo = zlib.compress(b'q 200 0 0 200 200 300 cm /Im0 Do Q\n')
+                        num_dibujo = pdf.nuevo(b'<</Length %d/Filter/FlateDecode>>' % len(dibujo), dibujo)
+                        num_contenido = b'[%d 0 R %d 0 R]' % (num_contenido, num_dibujo)
+
+                    recursos += b'>>'
+
+                contenidos = num_contenido if isinstance(num_contenido, bytes) else b'%d 0 R' % num_contenido
+                hijos.append(pdf.nuevo(
+                    b'<</Type/Page/Parent %d 0 R/MediaBox[0 0 612 792]/Resources %s/Contents %s>>'
+                    % (num_nodo, recursos, contenidos)
+                ))
+
+            nodos.append((num_nodo, hijos))
+
+        for num_nodo, hijos in nodos:
+            pdf.escribir(num_nodo, b'<</Type/Pages/Parent %d 0 R/Kids[%s]/Count %d>>' % (
+                num_raiz, b' '.join(b'%d 0 R' % hijo for hijo in hijos), len(hijos)))
+
+        pdf.escribir(num_raiz, b'<</Type/Pages/Kids[%s]/Count %d>>' % (
+            b' '.join(b'%d 0 R' % num for num, _ in nodos), paginas))
+        pdf.escribir(num_catalogo, b'<</Type/Catalog/Pages %d 0 R>>' % num_raiz)
+        pdf.cerrar(num_catalogo)
+
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def obtener_pdf(carpeta, paginas, contenido=CONTENIDO_TEXTO):
+    """
+    Devuelve la ruta de un PDF sintético, generándolo solo si aún no existe.
+
+    Args:
+        carpeta (str): Carpeta donde se guardan los PDFs generados
+        paginas (int): Número de páginas
+        contenido (str): Uno de TIPOS_CONTENIDO
+
+    Returns:
+        str: Ruta del PDF
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, f"sintetico_{contenido}_{paginas}.pdf")
+    if not os.path.exists(ruta):
+        generar_pdf(ruta, paginas, contenido)
+    return ruta
@@ -1,6 +1,7 @@
 import flet as ft
 from app.components.layout import MainLayout
 from app.utils.config_manager import config_manager
+from app.utils.pool_manager import pool_manager
 
 
 def main(page: ft.Page):
@@ -28,8 +29,12 @@ def main(page: ft.Page):
         if e.data == "close":
             # Guardar configuración final antes de cerrar
             config_manager.save_config()
+            # Detener el pool de procesos compartido
+            pool_manager.shutdown()
+            page.window_destroy()
 
-    page.window_prevent_close = False
+    page.window_prevent_close = True
+    page.on_window_event = on_window_event
 
     # Aplicar configuración de interfaz
     if config_manager.get("ui", "show_tooltips", True):
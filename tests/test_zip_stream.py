@@ -0,0 +1,50 @@
+# tests/test_zip_stream.py - Las entradas comprimidas en los workers se leen con zipfile
+import os
+import tempfile
+import unittest
+import zipfile
+
+from app.utils.zip_stream import METODOS_ZIP, EscritorZipStream, comprimir_entrada
+
+
+class TestComprimirEntrada(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.ruta_zip = os.path.join(self.carpeta.name, "prueba.zip")
+        # Contenido repetitivo (se comprime) y otro sin repeticiones
+        self.contenidos = {
+            "texto.txt": b"Linea de prueba para comprimir\n" * 2000,
+            "aleatorio.bin": os.urandom(50000),
+            "vacio.txt": b"",
+        }
+
+    def tearDown(self):
+        self.carpeta.cleanup()
+
+    def test_ida_y_vuelta_con_cada_metodo(self):
+        for nombre_metodo, metodo in METODOS_ZIP.items():
+            with self.subTest(metodo=nombre_metodo):
+                with EscritorZipStream(self.ruta_zip) as escritor:
+                    for nombre, datos in self.contenidos.items():
+                        escritor.agregar_comprimido(nombre, *comprimir_entrada(datos, metodo, es_pdf=False))
+
+                with zipfile.ZipFile(self.ruta_zip) as archivo_zip:
+                    self.assertIsNone(archivo_zip.testzip())
+                    for nombre, datos in self.contenidos.items():
+                        self.assertEqual(archivo_zip.getinfo(nombre).compress_type, metodo)
+                        self.assertEqual(archivo_zip.read(nombre), datos)
+
+    def test_nivel_de_compresion(self):
+        datos = self.contenidos["texto.txt"]
+        rapido = comprimir_entrada(datos, zipfile.ZIP_DEFLATED, nivel=1, es_pdf=False)[0]
+        maximo = comprimir_entrada(datos, zipfile.ZIP_DEFLATED, nivel=9, es_pdf=False)[0]
+        self.assertLessEqual(len(maximo), len(rapido))
+
+    def test_metodo_no_soportado(self):
+        with self.assertRaises(ValueError):
+            comprimir_entrada(b"datos", 99, es_pdf=False)
+
+
+if __name__ == "__main__":
+    unittest.main()